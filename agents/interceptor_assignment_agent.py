@@ -1,43 +1,238 @@
 import random # Needed for placeholder examples
+import time
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+from data.sensor_data_generator import SensorDataGenerator
+from tools.pk_tables import COUNTERMEASURES, NOMINAL_CROSSING_DEG, crossing_angles, load_pk_tables, speeds_km_per_second
+from tools.track_clustering import NOISE, cluster_summaries, grid_dbscan
+
+# Seconds after detection: (window opens, window length, how late the window may still slip)
+ENGAGEMENT_TIMELINES = {
+    "ICBM": (300, 600, 900),
+    "Hypersonic": (60, 120, 60),
+    "DroneSwarm": (120, 600, 300),
+}
+DEFAULT_ENGAGEMENT_TIMELINE = (60, 120, 120)
+
+# Drone swarm layering: tight clusters go to area-effect assets, DBSCAN noise (stragglers)
+# to point defense. An EW suite covers a cluster that fits inside its effect radius; any
+# other cluster is handed to a laser, which has to dwell on each drone in turn.
+EW_SUITE = "Electronic Warfare Suite"
+AREA_LASER = "Anti-Drone Laser System"
+POINT_DEFENSE = "Micro-Missile Swarm"
+EW_EFFECT_RADIUS_KM = 1.0
+EW_MIN_DRONES = 8
+LASER_DWELL_SECONDS_PER_DRONE = 2.0
+LASER_SLEW_SECONDS = 0.5
+
+# quick_plan(): what is assigned before the full (slower) assignment has run
+QUICK_COUNTERMEASURES = {
+    "ICBM": "GBI Interceptor",
+    "Hypersonic": "Next-Gen Hypersonic Interceptor",
+    "DroneSwarm": EW_SUITE,
+}
+QUICK_PLAN_PK = 0.6
+
+
+def threat_epoch_seconds(threat_data):
+    # Generator threats carry epoch seconds; other feeds use ISO-8601 strings
+    timestamp = threat_data.get("timestamp")
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    if isinstance(timestamp, str):
+        try:
+            parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        except ValueError:
+            return time.time()
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    return time.time()
+
+
+def threat_heading(threat_data):
+    # Degrees the threat is flying towards, if the report has one
+    details = threat_data.get("details") or {}
+    heading = details.get("current_heading", details.get("primary_axis_of_advance"))
+    return None if heading is None else float(heading)
+
 
 class InterceptorAssignmentAgent:
-    def __init__(self, name="Interceptor Assignment Agent"):
+    # Countermeasures are scored from precomputed Pk tables (tools/pk_tables.py) against
+    # every candidate asset at once. `assets` is an optional launcher inventory of
+    # {"asset_id", "countermeasure", "latitude", "longitude"} dicts; without one, each
+    # countermeasure type is a candidate with a notional asset id and nominal geometry.
+    def __init__(self, name="Interceptor Assignment Agent", assets=None, pk_tables=None):
         self.name = name
+        self.assets = list(assets) if assets else None
+        self.pk_tables = pk_tables or load_pk_tables()
+
+    def _engagement_window(self, threat_data):
+        opens, length, slack = ENGAGEMENT_TIMELINES.get(threat_data.get("category"), DEFAULT_ENGAGEMENT_TIMELINE)
+        start = threat_epoch_seconds(threat_data) + opens
+        return {"start": start, "end": start + length, "latest_start": start + slack}
+
+    def _intercept_point(self, threat_data):
+        # Placeholder: the threat's reported position; None when only a region name is known
+        location = threat_data.get("location")
+        if not isinstance(location, dict) or location.get("latitude") is None or location.get("longitude") is None:
+            return None
+        return {
+            "latitude": location["latitude"],
+            "longitude": location["longitude"],
+            "altitude_km": threat_data.get("altitude") or 0.0,
+        }
+
+    def assign_drone_tracks(self, tracks, engagement_window, swarm_id="swarm", eps_km=0.3, min_samples=4,
+                            has_position=True):
+        # Re-clusters per-drone tracks (see SensorDataGenerator.expand_swarm_tracks) and returns one
+        # element plan per cluster (area effect) and per noise drone (point defense). Called once
+        # per tick; plan ids are only stable within a tick because clusters are recomputed.
+        positions = tracks["positions"]
+        labels = grid_dbscan(positions, eps=eps_km, min_samples=min_samples)
+        summaries = cluster_summaries(positions, labels)
+        noise = np.flatnonzero(labels == NOISE)
+        centres = np.array([summary["centroid"] for summary in summaries] + [positions[i] for i in noise]).reshape(-1, 3)
+        latitudes, longitudes = SensorDataGenerator.tracks_to_lat_lon(tracks["origin"], centres[:, 0], centres[:, 1])
+        # Pk of each layer's countermeasure against every element, from one table lookup
+        element_countermeasures = (EW_SUITE, AREA_LASER, POINT_DEFENSE)
+        velocities = tracks.get("velocities")
+        speed_km_s = float(np.median(np.linalg.norm(velocities, axis=1))) if velocities is not None and len(velocities) else 100.0 / 3600.0
+        element_pk = self.pk_tables.lookup(self.pk_tables.rows(["DroneSwarm"], element_countermeasures),
+                                           speed_km_s, centres[:, 2:3], NOMINAL_CROSSING_DEG["DroneSwarm"])
+
+        def element_plan(element_id, countermeasure, role, index, drone_count, window, **extra):
+            params = {
+                "engagement_mode": "Autonomous",
+                "engagement_role": role,
+                "estimated_pk": round(float(element_pk[index, element_countermeasures.index(countermeasure)]), 2),
+                "assigned_asset_id": f"{countermeasure.replace(' ', '_')}_{random.randint(100,999)}",
+                "notional_asset": True,
+                "drone_count": drone_count,
+                "engagement_group": swarm_id,  # StrategicCommandAgent does not airspace-deconflict a group internally
+                "engagement_window": window,
+                "intercept_point": {"latitude": float(latitudes[index]), "longitude": float(longitudes[index]),
+                                    "altitude_km": float(centres[index, 2])} if has_position else None,
+            }
+            params.update(extra)
+            return {"threat_id": f"{swarm_id}/{element_id}", "threat_category": "DroneSwarm",
+                    "assigned_interceptor_type": countermeasure, "targeting_parameters": params}
+
+        plans = []
+        for summary in summaries:
+            size, radius = summary["size"], round(summary["radius"], 3)
+            if size >= EW_MIN_DRONES and radius <= EW_EFFECT_RADIUS_KM:
+                plans.append(element_plan(f"cluster-{summary['cluster']}", EW_SUITE, "area_effect", summary["cluster"],
+                                          size, engagement_window, effect_radius_km=radius))
+            else:
+                dwell = size * LASER_DWELL_SECONDS_PER_DRONE + (size - 1) * LASER_SLEW_SECONDS
+                window = dict(engagement_window, end=engagement_window["start"] + dwell)
+                plans.append(element_plan(f"cluster-{summary['cluster']}", AREA_LASER, "area_effect", summary["cluster"],
+                                          size, window, effect_radius_km=radius, dwell_seconds=dwell))
+        for offset, drone in enumerate(noise.tolist()):
+            plans.append(element_plan(f"drone-{drone}", POINT_DEFENSE, "point_defense", len(summaries) + offset,
+                                      1, engagement_window))
+        return plans
+
+    @staticmethod
+    def swarm_track_seed(swarm_threat):
+        # Stable per report, so every plan for one swarm is made against the same expanded tracks
+        return zlib.crc32(f"{swarm_threat.get('id')}|{swarm_threat.get('timestamp')}".encode())
+
+    def assign_swarm(self, swarm_threat, eps_km=0.3, min_samples=4):
+        # Expands a swarm report into per-drone tracks unless the feed already supplied them
+        tracks = swarm_threat.get("drone_tracks")
+        if tracks is None:
+            swarm_report = swarm_threat
+            if "swarm_size" not in (swarm_threat.get("details") or {}):
+                details = dict(swarm_threat.get("details") or {}, swarm_size=swarm_threat.get("swarm_size", 1))
+                swarm_report = dict(swarm_threat, details=details)
+            rng = np.random.default_rng(self.swarm_track_seed(swarm_threat))
+            tracks = SensorDataGenerator().expand_swarm_tracks(swarm_report, rng=rng)
+        location = swarm_threat.get("location")
+        has_position = isinstance(location, dict) and location.get("latitude") is not None
+        return self.assign_drone_tracks(tracks, self._engagement_window(swarm_threat), swarm_id=swarm_threat.get("id", "swarm"),
+                                        eps_km=eps_km, min_samples=min_samples, has_position=has_position)
 
-    def _select_countermeasure(self, threat_category):
-        # TODO: Integrate AI-guided countermeasure selection logic here
-        # This would involve analyzing threat characteristics, available assets, rules of engagement, etc.
-        if threat_category == "ICBM":
-            return random.choice(["GBI Interceptor", "AEGIS BMD"])
-        elif threat_category == "Hypersonic":
-            return random.choice(["High-Energy Laser", "Directed Microwave System", "Next-Gen Hypersonic Interceptor"])
-        elif threat_category == "DroneSwarm":
-            return random.choice(["Electronic Warfare Suite", "Micro-Missile Swarm", "Anti-Drone Laser System"])
-        return "Standard Kinetic Interceptor" # Default
-
-    def _determine_targeting_parameters(self, threat_data, countermeasure):
-        # TODO: Implement autonomous targeting logic here
-        # This would calculate trajectory, probability of kill, engagement windows, deconfliction, etc.
-        # Consider factors like threat speed, altitude, maneuverability, and countermeasure capabilities.
+    def candidate_assets(self):
+        return self.assets or [{"asset_id": None, "countermeasure": countermeasure} for countermeasure in COUNTERMEASURES]
+
+    def score_assets(self, threats):
+        # -> (candidate assets, Pk array of shape (len(threats), len(assets))) from a single
+        # vectorized lookup over every threat-asset pair
+        assets = self.candidate_assets()
+        categories = [threat.get("category", "Unknown") for threat in threats]
+        speed = speeds_km_per_second(categories, [threat.get("speed") for threat in threats])
+        altitude = np.array([float(threat.get("altitude") or 0.0) for threat in threats])
+        crossing = np.array([NOMINAL_CROSSING_DEG.get(category, 0.0) for category in categories])[:, None]
+        if self.assets:
+            # Actual geometry where both the threat's heading/position and the asset's position are known
+            points = [self._intercept_point(threat) or {} for threat in threats]
+            headings = [threat_heading(threat) for threat in threats]
+            with np.errstate(invalid="ignore"):
+                geometry = crossing_angles(
+                    [point.get("latitude", np.nan) for point in points], [point.get("longitude", np.nan) for point in points],
+                    [np.nan if heading is None else heading for heading in headings],
+                    [asset.get("latitude", np.nan) for asset in assets], [asset.get("longitude", np.nan) for asset in assets])
+            crossing = np.where(np.isnan(geometry), crossing, geometry)
+        rows = self.pk_tables.rows(categories, [asset["countermeasure"] for asset in assets])
+        return assets, self.pk_tables.lookup(rows, speed[:, None], altitude[:, None], crossing)
+
+    def _determine_targeting_parameters(self, threat_data, countermeasure, estimated_pk, asset_id=None):
         return {
             "engagement_mode": "Autonomous",
             "lead_calculation_method": "Advanced Predictive Algorithm",
-            "estimated_pk": round(random.uniform(0.85, 0.99), 2), # Probability of Kill
-            "assigned_asset_id": f"{countermeasure.replace(' ', '_')}_{random.randint(100,999)}"
+            "estimated_pk": round(estimated_pk, 2), # Probability of Kill (tabulated, see tools/pk_tables.py)
+            "assigned_asset_id": asset_id or f"{countermeasure.replace(' ', '_')}_{random.randint(100,999)}",
+            # No inventory: the id above is a placeholder, not a launcher to deconflict on
+            "notional_asset": asset_id is None,
+            # Used by StrategicCommandAgent to deconflict launchers and airspace
+            "engagement_window": self._engagement_window(threat_data),
+            "intercept_point": self._intercept_point(threat_data),
         }
 
-    def run(self, detected_threats):
-        print(f"[{self.name}] Received detected threats: {detected_threats}")
+    def quick_plan(self, detected_threats):
+        # Constant-time fallback used by triage before a full plan is ready: the category's
+        # default countermeasure at a conservative Pk, with no swarm clustering
+        threat_category = detected_threats.get("category", "Unknown")
+        countermeasure = QUICK_COUNTERMEASURES.get(threat_category, "Standard Kinetic Interceptor")
+        targeting_params = self._determine_targeting_parameters(detected_threats, countermeasure, QUICK_PLAN_PK)
+        return {
+            "threat_id": detected_threats.get("id"),
+            "threat_category": threat_category,
+            "assigned_interceptor_type": countermeasure,
+            "targeting_parameters": targeting_params,
+            "rationale": "Default countermeasure pending full assignment (time budget).",
+            "rules_of_engagement_check": "PASSED (simulated)",
+            "planning_stage": "quick",
+        }
 
+    def plan(self, detected_threats, eps_km=0.3):
+        # Full assignment without console output (run() logs it); safe to call from worker threads.
+        # eps_km is the drone clustering radius for swarms (see assign_swarm).
+        return self.plan_many([detected_threats], eps_km=eps_km)[0]
+
+    def plan_many(self, threats, eps_km=0.3):
+        # Full assignments for a batch of threats, scored with one Pk lookup for the whole batch
+        if not threats:
+            return []
+        assets, pk = self.score_assets(threats)
+        best = pk.argmax(axis=1)
+        return [self._plan(threat, assets[choice], float(pk[n, choice]), eps_km)
+                for n, (threat, choice) in enumerate(zip(threats, best))]
+
+    def _plan(self, detected_threats, asset, estimated_pk, eps_km=0.3):
         threat_category = detected_threats.get("category", "Unknown")
-        
-        # 1. Select appropriate countermeasure (Placeholder for AI logic)
-        selected_countermeasure = self._select_countermeasure(threat_category)
-        print(f"[{self.name}] Selected countermeasure: {selected_countermeasure} for threat category: {threat_category}")
+
+        # 1. Countermeasure: the candidate asset with the highest tabulated Pk
+        selected_countermeasure = asset["countermeasure"]
 
         # 2. Determine targeting parameters (Placeholder for autonomous logic)
-        targeting_params = self._determine_targeting_parameters(detected_threats, selected_countermeasure)
-        print(f"[{self.name}] Determined targeting parameters: {targeting_params}")
+        targeting_params = self._determine_targeting_parameters(detected_threats, selected_countermeasure, estimated_pk,
+                                                                asset.get("asset_id"))
 
         # 3. Formulate interceptor plan
         interceptor_plan = {
@@ -45,10 +240,27 @@ class InterceptorAssignmentAgent:
             "threat_category": threat_category,
             "assigned_interceptor_type": selected_countermeasure,
             "targeting_parameters": targeting_params,
-            "rationale": "Automated selection based on threat profile and asset availability (simulated).",
-            "rules_of_engagement_check": "PASSED (simulated)"
+            "rationale": "Highest tabulated Pk for the threat's speed, altitude and crossing angle across candidate assets.",
+            "rules_of_engagement_check": "PASSED (simulated)",
+            "planning_stage": "full",
         }
-        
+
+        # 4. Swarms: layered plan over the current drone clusters (area effect) and stragglers (point defense)
+        if threat_category == "DroneSwarm":
+            interceptor_plan["element_plans"] = self.assign_swarm(detected_threats, eps_km=eps_km)
+        return interceptor_plan
+
+    def run(self, detected_threats):
+        print(f"[{self.name}] Received detected threats: {detected_threats}")
+        interceptor_plan = self.plan(detected_threats)
+        print(f"[{self.name}] Selected countermeasure: {interceptor_plan['assigned_interceptor_type']} "
+              f"for threat category: {interceptor_plan['threat_category']}")
+        print(f"[{self.name}] Determined targeting parameters: {interceptor_plan['targeting_parameters']}")
+        element_plans = interceptor_plan.get("element_plans")
+        if element_plans is not None:
+            area = sum(1 for plan in element_plans if plan["targeting_parameters"]["engagement_role"] == "area_effect")
+            print(f"[{self.name}] Swarm split into {area} area-effect engagements and "
+                  f"{len(element_plans) - area} point-defense engagements")
         print(f"[{self.name}] Formulated interceptor plan: {interceptor_plan}")
         return interceptor_plan
 
@@ -82,3 +294,20 @@ if __name__ == '__main__':
     agent.run(test_threat_hypersonic)
     print("\n--- Testing Drone Swarm ---")
     agent.run(test_threat_swarm)
+
+    # Per-tick cost of re-clustering and re-assigning a 10k-drone picture
+    generator = SensorDataGenerator()
+    tracks = generator.generate_drone_tracks(10000, seed=11)
+    window = agent._engagement_window({"category": "DroneSwarm", "timestamp": time.time()})
+    timings = []
+    for _ in range(20):
+        tracks = generator.advance_tracks(tracks, dt_seconds=1.0)
+        started = time.perf_counter()
+        element_plans = agent.assign_drone_tracks(tracks, window)
+        timings.append(time.perf_counter() - started)
+    roles = {}
+    for plan in element_plans:
+        role = plan["targeting_parameters"]["engagement_role"]
+        roles[role] = roles.get(role, 0) + 1
+    print(f"\n10000 drones: {np.median(timings) * 1000:.1f} ms/tick median ({max(timings) * 1000:.1f} max), "
+          f"{len(element_plans)} element plans {roles}")
@@ -1,10 +1,390 @@
+import heapq
+import itertools
+from collections import defaultdict
+
+import numpy as np
+
+from tools.interval_tree import IntervalTree
+from tools.spatial_grid import SpatialGrid, to_ecef_km
+
+# Higher ranks first: a launcher cannot fire twice at once, a second interceptor on the
+# same threat wastes an asset, and close intercept points are a fratricide/debris risk.
+CONFLICT_PRIORITY = {"shared_launcher": 3, "duplicate_target": 2, "airspace": 1}
+
+
+def rank_conflicts(conflicts):
+    return sorted(conflicts, key=lambda conflict: (-CONFLICT_PRIORITY[conflict["type"]],
+                                                   -conflict["overlap_seconds"],
+                                                   conflict.get("distance_km") or 0.0,
+                                                   conflict["engagement_id"]))
+
+
 class StrategicCommandAgent:
-    def __init__(self, name="Strategic Command Agent"):
+    # Deconflicts interceptor plans against the engagements already scheduled. Each plan's
+    # targeting_parameters carry an engagement_window {start, end, latest_start} and an
+    # intercept_point; a new plan conflicts with an active engagement when their windows
+    # overlap and they share a launcher (assigned_asset_id, padded by the reload time),
+    # target the same threat, or intercept within separation_km of each other. Notional
+    # asset ids (notional_asset, generated when the interceptor agent has no inventory)
+    # name no real launcher and are not launcher-deconflicted.
+    #
+    # Active engagements are indexed by an interval tree per launcher and per threat and a
+    # spatial grid over intercept points, so checking a plan costs O(log n + k) instead of
+    # a scan over every engagement. A conflicting plan is slid later, to when its blockers
+    # clear, as long as it still starts by latest_start; otherwise it is returned with its
+    # conflicts ranked and is not scheduled.
+    #
+    # With a coverage grid (tools.coverage_grid.CoverageGrid over the launcher inventory),
+    # intercept points are first checked against it: a plan whose launcher is not an
+    # available launcher covering its intercept point moves to the covering launcher with
+    # the best Pk for its threat category, and a plan that no launcher with a usable Pk
+    # (above coverage_grid.MIN_EFFECTIVE_PK) covers is left "uncovered". Each scheduled engagement holds a round of its launcher; releasing it
+    # returns the round and expiry (the engagement ran) expends it.
+    def __init__(self, name="Strategic Command Agent", separation_km=50.0, launcher_reload_seconds=30.0,
+                 retention_seconds=3600.0, max_reschedule_attempts=8, coverage=None):
         self.name = name
+        self.coverage = coverage
+        self.separation_km = separation_km
+        self.launcher_reload_seconds = launcher_reload_seconds
+        # Engagements that ended this long before a new plan's window are dropped
+        self.retention_seconds = retention_seconds
+        self.max_reschedule_attempts = max_reschedule_attempts
+        self.engagements = {}
+        self.launcher_index = defaultdict(IntervalTree)
+        self.threat_index = defaultdict(IntervalTree)
+        self.airspace_index = SpatialGrid(cell_km=separation_km)
+        self._owned = defaultdict(set)  # threat id or engagement group -> engagement ids
+        self._expiry = []
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    def _window(plan):
+        window = plan.get("targeting_parameters", {}).get("engagement_window")
+        if not window:
+            return None
+        return window["start"], window["end"], window.get("latest_start", window["start"])
+
+    @staticmethod
+    def _point(plan):
+        point = plan.get("targeting_parameters", {}).get("intercept_point")
+        if not point:
+            return None
+        return to_ecef_km(point["latitude"], point["longitude"], point.get("altitude_km", 0.0))
+
+    @staticmethod
+    def _launcher(plan):
+        params = plan.get("targeting_parameters", {})
+        return None if params.get("notional_asset") else params.get("assigned_asset_id")
+
+    @staticmethod
+    def _intercept_latlon(plan):
+        point = plan.get("targeting_parameters", {}).get("intercept_point")
+        if not point or point.get("latitude") is None:
+            return None
+        return point["latitude"], point["longitude"]
+
+    def apply_coverage(self, plans):
+        # -> (plans, uncovered positions). One raster lookup for every intercept point in the
+        # batch; plans without an intercept point (or without a coverage grid) pass unchanged.
+        if self.coverage is None:
+            return list(plans), []
+        located = [(n, point) for n, point in enumerate(map(self._intercept_latlon, plans)) if point is not None]
+        if not located:
+            return list(plans), []
+        latitudes = np.array([point[0] for _, point in located])
+        longitudes = np.array([point[1] for _, point in located])
+        categories = [plans[n].get("threat_category", "Unknown") for n, _ in located]
+        best = self.coverage.best_launchers(latitudes, longitudes, categories)
+        best_pk = self.coverage.best_pk_for(latitudes, longitudes, categories)
+        covered, uncovered = list(plans), []
+        for (n, (latitude, longitude)), choice, pk in zip(located, best.tolist(), best_pk.tolist()):
+            params = plans[n].get("targeting_parameters", {})
+            index = self.coverage.launcher_index(params.get("assigned_asset_id"))
+            if index is not None and self.coverage.covers(latitude, longitude, index):
+                continue
+            if choice < 0:
+                uncovered.append(n)
+                continue
+            launcher = self.coverage.launchers[choice]
+            covered[n] = dict(plans[n], assigned_interceptor_type=launcher["countermeasure"],
+                              targeting_parameters=dict(params, assigned_asset_id=launcher["asset_id"],
+                                                        estimated_pk=round(pk, 2), notional_asset=False,
+                                                        reassigned_from=params.get("assigned_asset_id")))
+        return covered, uncovered
+
+    def find_conflicts(self, plan, start, end, point=None):
+        # Conflicts of plan if it were engaged over [start, end], ranked most severe first.
+        # clear_at is the earliest start at which that particular engagement stops blocking;
+        # windows that only touch (one ends as the other starts) do not conflict.
+        conflicts = []
+        launcher = self._launcher(plan)
+        if launcher is not None and launcher in self.launcher_index:
+            reload = self.launcher_reload_seconds
+            for other_start, other_end, engagement_id, _ in self.launcher_index[launcher].overlap(start - reload, end + reload):
+                if other_end + reload == start or other_start - reload == end:
+                    continue
+                conflicts.append(self._conflict("shared_launcher", engagement_id, start, end, clear_at=other_end + reload))
+        threat_id = plan.get("threat_id")
+        if threat_id is not None and threat_id in self.threat_index:
+            for other_start, other_end, engagement_id, _ in self.threat_index[threat_id].overlap(start, end):
+                if other_end == start or other_start == end:
+                    continue
+                conflicts.append(self._conflict("duplicate_target", engagement_id, start, end, clear_at=other_end))
+        if point is not None:
+            group = plan.get("targeting_parameters", {}).get("engagement_group")
+            for distance, engagement_id, _ in self.airspace_index.within(point, self.separation_km):
+                other = self.engagements[engagement_id]
+                if group is not None and other["group"] == group:
+                    continue  # elements of one layered plan (e.g. a swarm) are coordinated together
+                if other["start"] < end and start < other["end"]:
+                    conflicts.append(self._conflict("airspace", engagement_id, start, end, clear_at=other["end"],
+                                                    distance_km=round(distance, 3)))
+        return rank_conflicts(conflicts)
+
+    def _conflict(self, conflict_type, engagement_id, start, end, clear_at, distance_km=None):
+        other = self.engagements[engagement_id]
+        conflict = {
+            "type": conflict_type,
+            "engagement_id": engagement_id,
+            "threat_id": other["threat_id"],
+            "launcher": other["launcher"],
+            "overlap_seconds": max(0.0, min(end, other["end"]) - max(start, other["start"])),
+            "clear_at": clear_at,
+        }
+        if distance_km is not None:
+            conflict["distance_km"] = distance_km
+        return conflict
+
+    def schedule(self, plan):
+        # -> {"status": "scheduled" | "rescheduled" | "conflicted" | "unscheduled", ...}
+        window = self._window(plan)
+        if window is None:
+            return {"status": "unscheduled", "reason": "Plan has no engagement window to deconflict.", "conflicts": []}
+        if self.coverage is not None:
+            # deconflict() has usually covered the batch already; this re-checks launchers a
+            # plan earlier in the batch used up
+            (plan,), uncovered = self.apply_coverage([plan])
+            if uncovered:
+                return {"status": "uncovered", "reason": "No available launcher effective against the threat covers the intercept point.",
+                        "conflicts": []}
+        start, end, latest_start = window
+        self.expire(start - self.retention_seconds)
+        point = self._point(plan)
+        conflicts = initial_conflicts = self.find_conflicts(plan, start, end, point)
+        attempts = 0
+        while conflicts and attempts < self.max_reschedule_attempts:
+            clear_at = max(conflict["clear_at"] for conflict in conflicts)
+            if clear_at > latest_start:
+                break
+            start, end = clear_at, end + (clear_at - start)
+            conflicts = self.find_conflicts(plan, start, end, point)
+            attempts += 1
+        if conflicts:
+            return {"status": "conflicted", "conflicts": conflicts, "earliest_clear_at": max(c["clear_at"] for c in conflicts)}
+        engagement = self._commit(plan, start, end, point)
+        return {
+            "status": "rescheduled" if initial_conflicts else "scheduled",
+            "engagement": engagement,
+            "delay_seconds": start - window[0],
+            "resolved_conflicts": initial_conflicts,
+            "conflicts": [],
+            "plan": plan,
+        }
+
+    def _commit(self, plan, start, end, point):
+        engagement_id = f"engagement-{next(self._ids)}"
+        launcher = self._launcher(plan)
+        engagement = {
+            "engagement_id": engagement_id,
+            "threat_id": plan.get("threat_id"),
+            "launcher": launcher,
+            "start": start,
+            "end": end,
+        }
+        self.engagements[engagement_id] = dict(engagement, point=point,
+                                               group=plan.get("targeting_parameters", {}).get("engagement_group"))
+        for index, key in ((self.launcher_index, launcher), (self.threat_index, plan.get("threat_id"))):
+            if key is not None:
+                index[key].insert(start, end, engagement_id)
+        if point is not None:
+            self.airspace_index.insert(engagement_id, point)
+        heapq.heappush(self._expiry, (end, engagement_id))
+        if self.coverage is not None and launcher is not None:
+            self.coverage.reserve(launcher)
+        self._owned[self.engagements[engagement_id]["group"] or engagement["threat_id"]].add(engagement_id)
+        return engagement
+
+    def release(self, engagement_id, expended=False):
+        # Frees an engagement's launcher, target and airspace (e.g. after a kill or an abort);
+        # expended=True when the interceptor was fired, so its round is not returned
+        engagement = self.engagements.pop(engagement_id, None)
+        if engagement is None:
+            return False
+        if self.coverage is not None and engagement["launcher"] is not None:
+            (self.coverage.expend if expended else self.coverage.unreserve)(engagement["launcher"])
+        for index, key in ((self.launcher_index, engagement["launcher"]), (self.threat_index, engagement["threat_id"])):
+            if key is None:
+                continue
+            index[key].remove(engagement["start"], engagement_id)
+            if not len(index[key]):
+                del index[key]
+        self.airspace_index.remove(engagement_id)
+        owner = engagement["group"] or engagement["threat_id"]
+        self._owned[owner].discard(engagement_id)
+        if not self._owned[owner]:
+            del self._owned[owner]
+        return True
+
+    def release_threat(self, threat_id):
+        # Frees everything scheduled for a threat, including the elements of a layered plan
+        return sum(self.release(engagement_id) for engagement_id in list(self._owned.get(threat_id, ())))
+
+    def release_action(self, coordinated_action):
+        # Frees everything run() scheduled for a coordinated action (e.g. when review rejects it)
+        result = (coordinated_action or {}).get("deconfliction") or {}
+        engagements = result.get("schedule") or ([result["engagement"]] if result.get("engagement") else [])
+        return sum(self.release(engagement["engagement_id"]) for engagement in engagements)
+
+    def expire(self, before):
+        # Drops engagements that ended before the given time; released ones are skipped lazily
+        expired = 0
+        while self._expiry and self._expiry[0][0] < before:
+            _, engagement_id = heapq.heappop(self._expiry)
+            expired += self.release(engagement_id, expended=True)
+        return expired
+
+    def deconflict(self, plans):
+        # Batch form: plans with the least slack are placed first. Returns the conflict-free
+        # schedule (ordered by start) and the plans that could not be placed, most severe first.
+        def slack(plan):
+            window = self._window(plan)
+            return (window[2] if window else float("inf"), str(plan.get("threat_id")))
+
+        # A revised plan (see simulation.triage) replaces whatever its threat had scheduled
+        for plan in plans:
+            if "supersedes_revision" in plan:
+                self.release_threat(plan.get("threat_id"))
+        plans = [element for plan in plans for element in (plan.get("element_plans") or [plan])]
+        plans, uncovered = self.apply_coverage(plans)
+        schedule = []
+        unresolved = [{"threat_id": plans[n].get("threat_id"), "status": "uncovered", "conflicts": []} for n in uncovered]
+        uncovered = set(uncovered)
+        plans = [plan for n, plan in enumerate(plans) if n not in uncovered]
+        for plan in sorted(plans, key=slack):
+            result = self.schedule(plan)
+            if result["status"] in ("scheduled", "rescheduled"):
+                schedule.append(dict(result["engagement"], delay_seconds=result["delay_seconds"]))
+            else:
+                unresolved.append({"threat_id": plan.get("threat_id"), "status": result["status"],
+                                   "conflicts": result["conflicts"]})
+        schedule.sort(key=lambda engagement: (engagement["start"], engagement["engagement_id"]))
+        unresolved.sort(key=lambda entry: (-max((CONFLICT_PRIORITY[c["type"]] for c in entry["conflicts"]), default=0),
+                                           -len(entry["conflicts"]), str(entry["threat_id"])))
+        return {"schedule": schedule, "conflicts": unresolved}
 
     def run(self, interceptor_plan):
         print(f"[{self.name}] Received interceptor plan: {interceptor_plan}")
-        # Placeholder for strategic coordination
-        coordinated_action = {"action": "Monitor Engagement", "details": interceptor_plan}
+        details = interceptor_plan
+        if interceptor_plan.get("element_plans"):
+            # Layered plan (swarm elements, or a triaged raid): the elements are what get scheduled
+            batch = self.deconflict(interceptor_plan["element_plans"])
+            result = dict(batch, status="conflicted" if batch["conflicts"] else "scheduled")
+        else:
+            result = self.schedule(interceptor_plan)
+        if "plan" in result:
+            # Report the shifted window / covering launcher without mutating the assignment agent's plan
+            engagement = result["engagement"]
+            details = result["plan"]
+            if result["status"] == "rescheduled":
+                params = dict(details.get("targeting_parameters", {}))
+                params["engagement_window"] = dict(params["engagement_window"], start=engagement["start"], end=engagement["end"])
+                details = dict(details, targeting_parameters=params)
+        action = "Deconfliction Required" if result["status"] == "conflicted" else "Monitor Engagement"
+        coordinated_action = {"action": action, "details": details, "deconfliction": result}
+        print(f"[{self.name}] Deconfliction: {result['status']} ({len(result['conflicts'])} open conflicts, "
+              f"{len(self.engagements)} active engagements)")
         print(f"[{self.name}] Coordinated action: {coordinated_action}")
         return coordinated_action
+
+
+if __name__ == "__main__":
+    # Conflict check cost against the number of active engagements, versus a linear scan
+    import random
+    import time
+
+    rng = random.Random(7)
+
+    def synthetic_plan(i, day_start=0.0):
+        start = day_start + rng.uniform(0, 86400)
+        return {
+            "threat_id": f"threat-{i}",
+            "targeting_parameters": {
+                "assigned_asset_id": f"launcher-{rng.randrange(2000)}",
+                "engagement_window": {"start": start, "end": start + rng.uniform(60, 600), "latest_start": start + 300},
+                "intercept_point": {"latitude": rng.uniform(20, 60), "longitude": rng.uniform(-130, -60),
+                                    "altitude_km": rng.uniform(0, 100)},
+            },
+        }
+
+    print(f"{'active':>8} {'indexed us/check':>17} {'scan us/check':>14} {'conflicts/check':>16}")
+    for active in (1000, 10000, 100000):
+        agent = StrategicCommandAgent(retention_seconds=float("inf"))
+        existing = [synthetic_plan(i) for i in range(active)]
+        for plan in existing:
+            window = plan["targeting_parameters"]["engagement_window"]
+            agent._commit(plan, window["start"], window["end"], agent._point(plan))
+        probes = [synthetic_plan(active + i) for i in range(1000)]
+
+        started = time.perf_counter()
+        found = sum(len(agent.find_conflicts(plan, *agent._window(plan)[:2], agent._point(plan))) for plan in probes)
+        indexed = (time.perf_counter() - started) / len(probes) * 1e6
+
+        engagements = list(agent.engagements.values())
+        started = time.perf_counter()
+        for plan in probes[:50]:
+            start, end, _ = agent._window(plan)
+            launcher = plan["targeting_parameters"]["assigned_asset_id"]
+            point = agent._point(plan)
+            sum(1 for other in engagements if other["start"] <= end and start <= other["end"] and
+                (other["launcher"] == launcher or (other["point"] and sum((a - b) ** 2 for a, b in zip(point, other["point"])) <= agent.separation_km ** 2)))
+        scan = (time.perf_counter() - started) / 50 * 1e6
+        print(f"{active:>8} {indexed:>17.1f} {scan:>14.1f} {found / len(probes):>16.2f}")
+
+    # Batch deconfliction of a dense raid: everything lands in the same few minutes
+    agent = StrategicCommandAgent()
+    raid = [synthetic_plan(i) for i in range(5000)]
+    for plan in raid:
+        window = plan["targeting_parameters"]["engagement_window"]
+        window["start"] %= 1800
+        window["end"] = window["start"] + 120
+        window["latest_start"] = window["start"] + 300
+    started = time.perf_counter()
+    result = agent.deconflict(raid)
+    elapsed = time.perf_counter() - started
+    delayed = sum(1 for engagement in result["schedule"] if engagement["delay_seconds"] > 0)
+    print(f"deconflicted {len(raid)} plans in {elapsed:.2f}s: {len(result['schedule'])} scheduled ({delayed} delayed), "
+          f"{len(result['conflicts'])} left with ranked conflicts")
+
+    # Coverage re-planning: the same raid against 200 launchers, with intercept points checked
+    # against the coverage raster and plans moved off launchers that do not reach them
+    from tools.coverage_grid import CoverageGrid
+    from tools.pk_tables import COUNTERMEASURES
+
+    launchers = [{"asset_id": f"launcher-{i}", "countermeasure": rng.choice(COUNTERMEASURES),
+                  "latitude": rng.uniform(20.0, 60.0), "longitude": rng.uniform(-130.0, -60.0),
+                  "rounds": rng.randint(2, 8)} for i in range(200)]
+    grid = CoverageGrid(launchers, latitude_range=(10.0, 70.0))
+    agent = StrategicCommandAgent(coverage=grid)
+    for plan in raid:
+        plan["threat_category"] = rng.choice(("ICBM", "Hypersonic", "DroneSwarm"))
+        plan["targeting_parameters"]["assigned_asset_id"] = f"launcher-{rng.randrange(200)}"
+    started = time.perf_counter()
+    covered, uncovered = agent.apply_coverage(raid)
+    lookup = time.perf_counter() - started
+    reassigned = sum(1 for plan in covered if "reassigned_from" in plan["targeting_parameters"])
+    started = time.perf_counter()
+    result = agent.deconflict(raid)
+    elapsed = time.perf_counter() - started
+    print(f"coverage check of {len(raid)} plans in {lookup * 1000:.1f} ms: {reassigned} reassigned, "
+          f"{len(uncovered)} uncovered; deconflicted with coverage in {elapsed:.2f}s, "
+          f"{len(result['schedule'])} scheduled, {int(grid.reserved.sum())} rounds reserved")
@@ -4,6 +4,7 @@ from .containment_agent import ContainmentAgent
 from .incident_narrator_agent import IncidentNarratorAgent
 from .human_review_board_crew import HumanReviewBoardCrew
 from .zero_trust_agent import ZeroTrustAgent # New import
+from .campaign_correlator_agent import CampaignCorrelatorAgent
 
 __all__ = [
     "ReconAgent",
@@ -12,4 +13,5 @@ __all__ = [
     "IncidentNarratorAgent",
     "HumanReviewBoardCrew",
     "ZeroTrustAgent", # New addition
+    "CampaignCorrelatorAgent",
 ]
@@ -0,0 +1,172 @@
+from collections import Counter, defaultdict
+
+from cyberdome.tools.event_time import event_epoch_seconds
+from cyberdome.tools.log_join import is_outbound_destination
+
+SEVERITY_ORDER = ["Low", "Medium", "High", "Critical"]
+
+
+def exploit_identifier(exploit):
+    # Same simplified id the SOC graph uses to key review decisions and containment plans
+    return exploit.get("original_anomaly", {}).get("log", {}).get("event_id", str(exploit))
+
+
+def kill_chain_stage(anomaly):
+    # Coarse kill chain stage for an anomaly, from the fields recon already extracts
+    log = anomaly.get("log") or {}
+    text = f"{anomaly.get('reason', '')} {log.get('payload', '')} {log.get('notes', '')}".lower()
+    action = log.get("action") or ""
+    if "exfiltration" in text:
+        return "exfiltration"
+    if "c2_beacon" in text:
+        return "command_and_control"
+    ioc_types = {match["type"] for match in anomaly.get("ioc_matches", ())}
+    if "hash" in ioc_types:
+        return "delivery"
+    if ioc_types:
+        return "command_and_control"
+    if "privilege_escalation" in action:
+        return "privilege_escalation"
+    if "sensitive" in str(log.get("resource_id") or log.get("resource_access") or "") or "sensitive data" in text:
+        return "collection"
+    if anomaly.get("type") == "Traffic Anomaly":
+        return "exploitation"
+    return "initial_access"
+
+
+class DisjointSet:
+    # Union-find with path halving and union by size
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+
+class CampaignCorrelatorAgent:
+    # Links classified exploits that share an entity (source IP, user, destination) within
+    # window_seconds of each other into campaigns. Each exploit is indexed under its
+    # entities; every entity's exploits are sorted by time once and only neighbours in that
+    # order are compared, so the pass is O(n log n) instead of pairwise. Chained links are
+    # transitive (A-B and B-C put A and C in one campaign even if they are further apart).
+    # Only outbound destinations link exploits: many unrelated attacks hit the same internal
+    # server, so a shared private/loopback destination is reported but not correlated on.
+    ENTITY_FIELDS = {
+        "source_ip": ("source_ip",),
+        "user_id": ("user_id",),
+        "destination": ("destination_ip", "dest_ip"),
+    }
+    IGNORED_VALUES = {"", "local", "unknown", "unknown_endpoint", "N/A"}
+    ENTITY_SAMPLE_LIMIT = 10
+
+    def __init__(self, name="Campaign Correlator Agent", window_seconds=900):
+        self.name = name
+        self.window_seconds = window_seconds
+
+    def _entities(self, log, linking=False):
+        for entity_type, fields in self.ENTITY_FIELDS.items():
+            for field in fields:
+                value = log.get(field)
+                if value is not None and value not in self.IGNORED_VALUES:
+                    if not (linking and entity_type == "destination" and not is_outbound_destination(value)):
+                        yield entity_type, value
+                    break
+
+    def correlate(self, classified_exploits, needs_review=None):
+        # needs_review: optional predicate over a single exploit; a campaign requires review
+        # if any member does, and the first such member is kept as its review exemplar.
+        print(f"\n[{self.name}] Correlating {len(classified_exploits)} exploits into campaigns...")
+        count = len(classified_exploits)
+        times = [None] * count
+        entity_index = defaultdict(list)
+        for i, exploit in enumerate(classified_exploits):
+            log = exploit.get("original_anomaly", {}).get("log")
+            if not isinstance(log, dict):
+                continue
+            times[i] = event_epoch_seconds(log)
+            for entity in self._entities(log, linking=True):
+                entity_index[entity].append(i)
+
+        components = DisjointSet(count)
+        for members in entity_index.values():
+            timed = sorted((times[i], i) for i in members if times[i] is not None)
+            for (previous_time, previous), (current_time, current) in zip(timed, timed[1:]):
+                if current_time - previous_time <= self.window_seconds:
+                    components.union(previous, current)
+            # Untimed events can only be placed by entity, so they join the entity's earliest event
+            anchor = timed[0][1] if timed else None
+            for i in members:
+                if times[i] is None:
+                    anchor = i if anchor is None else anchor
+                    components.union(anchor, i)
+
+        grouped = defaultdict(list)
+        for i in range(count):
+            grouped[components.find(i)].append(i)
+        campaigns = [self._summarize(members, classified_exploits, times, needs_review) for members in grouped.values()]
+        campaigns.sort(key=lambda campaign: (-SEVERITY_ORDER.index(campaign["severity"]), -campaign["size"], campaign["campaign_id"]))
+        multi_stage = sum(1 for campaign in campaigns if len(campaign["stages"]) > 1)
+        print(f"[{self.name}] {len(campaigns)} campaigns ({multi_stage} multi-stage) from {count} exploits.")
+        return campaigns
+
+    def _summarize(self, members, exploits, times, needs_review):
+        entities = defaultdict(set)
+        signatures = Counter()
+        stages = set()
+        severity_rank = 0
+        kill_chain = False
+        review_index = None
+        for i in members:
+            exploit = exploits[i]
+            anomaly = exploit.get("original_anomaly", {})
+            log = anomaly.get("log")
+            if isinstance(log, dict):
+                for entity_type, value in self._entities(log):
+                    entities[entity_type].add(value)
+            signatures[exploit.get("signature")] += 1
+            stages.add(kill_chain_stage(anomaly))
+            if exploit.get("severity") in SEVERITY_ORDER:
+                severity_rank = max(severity_rank, SEVERITY_ORDER.index(exploit["severity"]))
+            kill_chain = kill_chain or bool(exploit.get("kill_chain_interrupted_flag"))
+            if review_index is None and needs_review is not None and needs_review(exploit):
+                review_index = i
+        # Activity spanning several kill chain stages is treated as one progressing attack:
+        # escalate one severity level and flag it for the kill chain interceptor.
+        if len(stages) > 1:
+            severity_rank = min(severity_rank + 1, len(SEVERITY_ORDER) - 1)
+            kill_chain = True
+        timed = [times[i] for i in members if times[i] is not None]
+        first = min(members, key=lambda i: (times[i] is None, times[i] or 0.0, i))
+        return {
+            "campaign_id": f"campaign-{exploit_identifier(exploits[first])}",
+            "exploit_indices": members,
+            "exploit_ids": [exploit_identifier(exploits[i]) for i in members],
+            "size": len(members),
+            "start": min(timed) if timed else None,
+            "end": max(timed) if timed else None,
+            "entities": {entity_type: sorted(values)[:self.ENTITY_SAMPLE_LIMIT] for entity_type, values in entities.items()},
+            "signatures": dict(signatures),
+            "stages": sorted(stages),
+            "severity": SEVERITY_ORDER[severity_rank],
+            "kill_chain_interrupted_flag": kill_chain,
+            "requires_review": review_index is not None or SEVERITY_ORDER[severity_rank] == "Critical",
+            "review_exploit_index": review_index if review_index is not None else first,
+        }
+
+    def run(self, classified_exploits, needs_review=None):
+        return self.correlate(classified_exploits, needs_review)
@@ -1,30 +1,118 @@
+from cyberdome.data.records import ContainmentActionRecord
+from cyberdome.playbooks import PlaybookExecutor, load_playbooks, select_playbook
+from cyberdome.playbooks.engine import DEFAULT_PLAYBOOK_PATH, SUCCEEDED
+
+
 class ContainmentAgent:
-    def __init__(self, name="Containment Agent"):
+    # Planned actions are carried out by declarative playbooks (cyberdome/playbooks):
+    # each plan selects the first playbook matching its severity / kill chain flag, and
+    # every plan's playbook runs concurrently on the PlaybookExecutor.
+    def __init__(self, name="Containment Agent", playbook_path=DEFAULT_PLAYBOOK_PATH, default_step_timeout_seconds=5.0):
         self.name = name
+        self.playbook_path = playbook_path
+        self.executor = PlaybookExecutor(default_timeout_seconds=default_step_timeout_seconds, agent_name=name)
 
-    def isolate_endpoint(self, endpoint_id, reason):
-        # Placeholder for API calls to Crowdstrike, SentinelOne, etc.
-        print(f"[{self.name}] SIMULATING: Isolating endpoint '{endpoint_id}' due to: {reason}.")
-        print(f"[{self.name}] SIMULATING: API call to security tool (e.g., Crowdstrike) would happen here.")
-        return {"endpoint_id": endpoint_id, "status": "isolated_simulated", "reason": reason}
+    @staticmethod
+    def requires_containment(severity, kill_chain_flag):
+        return severity in ["High", "Critical"] or bool(kill_chain_flag)
 
-    def run(self, classified_exploits_data):
-        print(f"\n[{self.name}] Starting containment actions based on {len(classified_exploits_data)} classified exploits...")
-        containment_actions = []
+    @staticmethod
+    def _endpoint(log):
+        # Determine endpoint from anomaly data (simplified)
+        endpoint_to_isolate = log.get("source_ip", "unknown_endpoint")
+        if endpoint_to_isolate == "unknown_endpoint":
+             endpoint_to_isolate = log.get("user_id", "unknown_user_endpoint")
+        return endpoint_to_isolate
+
+    def plan_containment(self, classified_exploits_data):
+        # Decides which endpoints to isolate without side effects, so planning can run in
+        # shard workers and execution can wait for human review.
+        plans = []
         for exploit in classified_exploits_data:
-            if exploit.get("severity") in ["High", "Critical"] or exploit.get("kill_chain_interrupted_flag"):
-                # Determine endpoint from anomaly data (simplified)
-                endpoint_to_isolate = exploit.get("original_anomaly", {}).get("log", {}).get("source_ip", "unknown_endpoint")
-                if endpoint_to_isolate == "unknown_endpoint":
-                     endpoint_to_isolate = exploit.get("original_anomaly", {}).get("log", {}).get("user_id", "unknown_user_endpoint")
-
-                print(f"[{self.name}] High severity or kill chain exploit detected: {exploit.get('signature')}. Triggering containment for endpoint: {endpoint_to_isolate}")
-                action_result = self.isolate_endpoint(
-                    endpoint_id=endpoint_to_isolate,
-                    reason=f"Classified exploit: {exploit.get('signature')}, Severity: {exploit.get('severity')}"
-                )
-                containment_actions.append(action_result)
+            if self.requires_containment(exploit.get("severity"), exploit.get("kill_chain_interrupted_flag")):
+                log = exploit.get("original_anomaly", {}).get("log", {})
+                endpoint_to_isolate = self._endpoint(log)
+                plans.append({
+                    "endpoint_id": endpoint_to_isolate,
+                    "reason": f"Classified exploit: {exploit.get('signature')}, Severity: {exploit.get('severity')}",
+                    "exploit_id": log.get("event_id", str(exploit)),
+                    "signature": exploit.get("signature"),
+                    # Incident context for playbook selection and step targets
+                    "severity": exploit.get("severity"),
+                    "kill_chain": bool(exploit.get("kill_chain_interrupted_flag")),
+                    "source_ip": log.get("source_ip"),
+                    "user_id": log.get("user_id"),
+                })
+        return plans
+
+    def plan_campaign_containment(self, campaigns, classified_exploits_data):
+        # One action per distinct endpoint of every campaign whose own severity / kill chain
+        # flag calls for containment. Correlation can escalate a campaign above all of its
+        # members, so this does not depend on any member qualifying by itself. Plans are
+        # keyed by campaign_id so a single review decision covers the whole campaign.
+        plans = []
+        for campaign in campaigns:
+            if not self.requires_containment(campaign["severity"], campaign["kill_chain_interrupted_flag"]):
+                continue
+            endpoints = {}
+            for index in campaign["exploit_indices"]:
+                log = classified_exploits_data[index].get("original_anomaly", {}).get("log")
+                log = log if isinstance(log, dict) else {}
+                endpoints.setdefault(self._endpoint(log), log)
+            signature = max(campaign["signatures"], key=campaign["signatures"].get)
+            for endpoint_id, log in endpoints.items():
+                plans.append({
+                    "endpoint_id": endpoint_id,
+                    "reason": f"Campaign {campaign['campaign_id']}: {campaign['size']} correlated exploits, "
+                              f"stages {', '.join(campaign['stages'])}, Severity: {campaign['severity']}",
+                    "exploit_id": campaign["campaign_id"],
+                    "signature": signature,
+                    "severity": campaign["severity"],
+                    "kill_chain": bool(campaign["kill_chain_interrupted_flag"]),
+                    "source_ip": log.get("source_ip"),
+                    "user_id": log.get("user_id"),
+                })
+        return plans
+
+    def execute_plan(self, containment_plan):
+        print(f"\n[{self.name}] Starting containment actions based on {len(containment_plan)} planned actions...")
+        playbooks = load_playbooks(self.playbook_path)
+        runs, unmatched = [], []
+        for plan in containment_plan:
+            playbook = select_playbook(plan, playbooks)
+            if playbook is None:
+                # A custom playbook file without a catch-all entry; record the plan as not contained
+                print(f"[{self.name}] No playbook matches endpoint: {plan['endpoint_id']} "
+                      f"({plan.get('signature')}, Severity: {plan.get('severity')}); skipping.")
+                unmatched.append(ContainmentActionRecord(
+                    plan["endpoint_id"], "no_playbook", plan["reason"], plan.get("exploit_id")).to_dict())
+                continue
+            print(f"[{self.name}] Running playbook '{playbook.name}' for endpoint: {plan['endpoint_id']} "
+                  f"({plan.get('signature')}, Severity: {plan.get('severity')})")
+            runs.append((playbook, plan))
+        containment_actions = [self._action_record(plan, run)
+                               for (_, plan), run in zip(runs, self.executor.run_blocking(runs) if runs else [])]
+        containment_actions.extend(unmatched)
         if not containment_actions:
-            print(f"[{self.name}] No high severity exploits requiring immediate containment.")
+            print(f"[{self.name}] No planned actions requiring containment.")
         print(f"[{self.name}] Containment actions complete. Actions taken: {len(containment_actions)}")
         return containment_actions
+
+    @staticmethod
+    def _action_record(plan, run):
+        steps = run["steps"]
+        isolation = next((step for step in steps.values() if step["action"] == "isolate_endpoint"), None)
+        if isolation is not None:
+            status = "isolated_simulated" if isolation["status"] == SUCCEEDED else f"isolation_{isolation['status']}"
+        else:
+            status = "contained_simulated" if all(step["status"] == SUCCEEDED for step in steps.values()) else "partially_contained"
+        return ContainmentActionRecord(
+            plan["endpoint_id"], status, plan["reason"], plan.get("exploit_id"), run["playbook"],
+            {step_id: {key: step[key] for key in ("action", "status", "latency_seconds", "error") if key in step}
+             for step_id, step in steps.items()},
+            run["critical_path"], run["critical_path_seconds"], run["wall_seconds"],
+        ).to_dict()
+
+    def run(self, classified_exploits_data):
+        print(f"\n[{self.name}] Planning containment for {len(classified_exploits_data)} classified exploits...")
+        return self.execute_plan(self.plan_containment(classified_exploits_data))
@@ -1,8 +1,27 @@
+from cyberdome.data.records import ExploitRecord
+
+CLASSIFICATION_DETAILS = "LLM-based analysis placeholder"
+
+
+def _exploit_dict(anomaly, signature, severity, kill_chain_interrupted_flag, classification_details):
+    return {"original_anomaly": anomaly, "signature": signature, "severity": severity,
+            "kill_chain_interrupted_flag": kill_chain_interrupted_flag,
+            "classification_details": classification_details}
+
+
 class ExploitClassifierAgent:
     def __init__(self, name="Exploit Classifier Agent"):
         self.name = name
 
     def classify_exploits(self, anomalies):
+        # Graph state: exploit dicts whose original_anomaly is the anomaly itself, not a copy
+        return self._classify(anomalies, _exploit_dict)
+
+    def classify_records(self, anomalies):
+        # Shard workers: ExploitRecords, which stay compact until the worker packs them
+        return self._classify(anomalies, ExploitRecord)
+
+    def _classify(self, anomalies, build):
         print(f"\n[{self.name}] Classifying {len(anomalies)} anomalies/exploits...")
         classified_exploits = []
         for anomaly in anomalies:
@@ -18,20 +37,14 @@ class ExploitClassifierAgent:
             
             # Simulate kill chain interruption check
             kill_chain_interrupted = False
-                # THIS IS THE CONCEPTUAL "INTRUSION KILL CHAIN INTERCEPTOR" LOGIC (BASIC)
-                if "suspicious_pattern" in str(anomaly.get("log", "")).lower() or \
-                   "malware_signature" in str(anomaly.get("type", "")).lower() or \
-                   "c2_beacon_heartbeat" in str(anomaly.get("log", {}).get("payload", "")).lower():
+            # THIS IS THE CONCEPTUAL "INTRUSION KILL CHAIN INTERCEPTOR" LOGIC (BASIC)
+            if "suspicious_pattern" in str(anomaly.get("log", "")).lower() or \
+               "malware_signature" in str(anomaly.get("type", "")).lower() or \
+               "c2_beacon_heartbeat" in str(anomaly.get("log", {}).get("payload", "")).lower():
                 kill_chain_interrupted = True 
-                    print(f"[{self.name} - Kill Chain Interceptor] Predefined threat pattern detected. Flagging for immediate review/containment: {anomaly.get('type')} - {anomaly.get('log', {}).get('event_id', 'N/A')}")
-
-            classified_exploits.append({
-                "original_anomaly": anomaly,
-                "signature": signature,
-                "severity": severity,
-                "kill_chain_interrupted_flag": kill_chain_interrupted,
-                "classification_details": "LLM-based analysis placeholder"
-            })
+                print(f"[{self.name} - Kill Chain Interceptor] Predefined threat pattern detected. Flagging for immediate review/containment: {anomaly.get('type')} - {anomaly.get('log', {}).get('event_id', 'N/A')}")
+
+            classified_exploits.append(build(anomaly, signature, severity, kill_chain_interrupted, CLASSIFICATION_DETAILS))
         print(f"[{self.name}] Classification complete.")
         return classified_exploits
 
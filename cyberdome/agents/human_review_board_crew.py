@@ -1,7 +1,25 @@
+import threading
+import time
+
 from crewai import Agent, Task, Crew, Process
 
+from cyberdome.tools.precedent_store import AutoDecisionPolicy, PrecedentStore, action_features
+
 class HumanReviewBoardCrew:
-    def __init__(self):
+    # Reviewer decisions are recorded in a PrecedentStore keyed by action_features(); a
+    # later action with the same features is decided from the precedent, without a
+    # reviewer, when auto_decision_policy permits it. Pass precedent_store=False to send
+    # every action to review. reviewer_round_trip_seconds is the modeled wall-clock time of
+    # one real review, used to report the latency auto-decisions save.
+    def __init__(self, precedent_store=None, auto_decision_policy=None, reviewer_round_trip_seconds=600.0):
+        # An empty store is falsy (__len__), so False is checked for explicitly
+        self.precedent_store = PrecedentStore() if precedent_store is None else \
+            (None if precedent_store is False else precedent_store)
+        self.auto_decision_policy = auto_decision_policy or AutoDecisionPolicy()
+        self.reviewer_round_trip_seconds = reviewer_round_trip_seconds
+        self._stats_lock = threading.Lock()
+        self._stats = {"reviews": 0, "auto_decisions": 0, "escalations": 0, "escalated_review_seconds": 0.0}
+
         # Define the Policy Override Agent
         self.policy_override_agent = Agent(
             role='Policy Override Agent (CISO/Compliance Designate)',
@@ -32,9 +50,59 @@ class HumanReviewBoardCrew:
         )
 
 
+    def fresh(self):
+        # Same policy and reviewer model with an empty precedent store (one board per scenario)
+        store = self.precedent_store
+        precedent_store = PrecedentStore(store.ttl_seconds, store.max_entries, store.clock) if store is not None else False
+        return HumanReviewBoardCrew(precedent_store, self.auto_decision_policy, self.reviewer_round_trip_seconds)
+
     def review_proposed_action(self, proposed_action_details, requires_policy_override=False):
         print(f"\n[Human Review Board] Received action for review: {proposed_action_details}")
-        
+
+        features = action_features(proposed_action_details, requires_policy_override)
+        if self.precedent_store is not None:
+            precedent = self.precedent_store.lookup(features)
+            if precedent is not None and self.auto_decision_policy.permits(precedent, features):
+                return self._apply_precedent(precedent, requires_policy_override)
+
+        started = time.perf_counter()
+        result = self._escalate(proposed_action_details, requires_policy_override)
+        if self.precedent_store is not None:
+            self.precedent_store.record(features, result)
+        with self._stats_lock:
+            self._stats["reviews"] += 1
+            self._stats["escalations"] += 1
+            self._stats["escalated_review_seconds"] += time.perf_counter() - started
+        return result
+
+    def _apply_precedent(self, precedent, requires_policy_override):
+        age = self.precedent_store.clock() - precedent["decided_at"]
+        print(f"[Human Review Board] Auto-{precedent['decision']} from precedent "
+              f"({precedent['confirmations']} confirmation(s), {age:.0f}s old); no reviewer needed.")
+        with self._stats_lock:
+            self._stats["reviews"] += 1
+            self._stats["auto_decisions"] += 1
+        return {
+            "decision": precedent["decision"],
+            "justification": f"Auto-applied precedent: {precedent['justification']}",
+            "reviewer_role": f"Precedent ({precedent['reviewer_role']})",
+            "policy_agent_role": self.policy_override_agent.role if requires_policy_override else "N/A",
+            "auto_decided": True,
+            "precedent_age_seconds": age,
+            "precedent_confirmations": precedent["confirmations"],
+            "latency_saved_seconds": self.reviewer_round_trip_seconds,
+        }
+
+    def review_stats(self):
+        # Auto-decision hit rate and the reviewer time it saved
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["auto_decision_rate"] = stats["auto_decisions"] / stats["reviews"] if stats["reviews"] else 0.0
+        stats["latency_saved_seconds"] = stats["auto_decisions"] * self.reviewer_round_trip_seconds
+        stats["precedents"] = len(self.precedent_store) if self.precedent_store is not None else 0
+        return stats
+
+    def _escalate(self, proposed_action_details, requires_policy_override):
         review_agent = self.security_reviewer_agent
         if requires_policy_override:
             print("[Human Review Board] This action requires policy override level review.")
@@ -76,7 +144,8 @@ class HumanReviewBoardCrew:
             "decision": decision, 
             "justification": justification, 
             "reviewer_role": review_agent.role,
-            "policy_agent_role": self.policy_override_agent.role if requires_policy_override else "N/A"
+            "policy_agent_role": self.policy_override_agent.role if requires_policy_override else "N/A",
+            "auto_decided": False,
         }
 
 if __name__ == '__main__':
@@ -85,7 +154,9 @@ if __name__ == '__main__':
     action1 = {
         "action_summary": "Isolate compromised endpoint", 
         "details": "Endpoint IP: 192.168.1.101, User: bsimpson, Exploit: CVE-2023-12345",
-        "severity": "High"
+        "severity": "High",
+        "endpoint": "192.168.1.101",
+        "signature": "CVE-2023-12345",
     }
     print("\n--- Test Case 1: Standard Security Review ---")
     result1 = board.review_proposed_action(action1, requires_policy_override=False)
@@ -99,3 +170,39 @@ if __name__ == '__main__':
     print("\n--- Test Case 2: Policy Override Review ---")
     result2 = board.review_proposed_action(action2, requires_policy_override=True)
     print(f"Review Result: {result2}")
+
+    # Matched by endpoint class: another internal host, same signature and severity
+    action3 = dict(action1, details="Endpoint IP: 192.168.1.102, User: hsimpson, Exploit: CVE-2023-12345",
+                   endpoint="192.168.1.102")
+    print("\n--- Test Case 3: Same action on another internal host (precedent) ---")
+    result3 = board.review_proposed_action(action3, requires_policy_override=False)
+    print(f"Review Result: {result3}")
+
+    # An external host is a different endpoint class, so it goes to a reviewer
+    action4 = dict(action1, details="Endpoint IP: 8.8.4.4, Exploit: CVE-2023-12345", endpoint="8.8.4.4")
+    print("\n--- Test Case 4: Same action on an external host (no precedent) ---")
+    result4 = board.review_proposed_action(action4, requires_policy_override=False)
+    print(f"Review Result: {result4}")
+
+    # Hit rate over a stream of repeated action kinds
+    import contextlib
+    import io
+    import random
+
+    random.seed(7)
+    signatures = [f"CVE-2024-{n:05d}" for n in range(40)]
+    endpoints = ["10.0.0.5", "203.0.113.9", "vpn-gateway", "db-server-01", "jdoe"]
+    board = HumanReviewBoardCrew(reviewer_round_trip_seconds=600.0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(2000):
+            board.review_proposed_action({
+                "action_type": "contain_exploit",
+                "action_summary": "Contain exploit",
+                "signature": random.choice(signatures),
+                "severity": random.choice(["High", "Critical"]),
+                "endpoint": random.choice(endpoints),
+            }, requires_policy_override=random.random() < 0.1)
+    stats = board.review_stats()
+    print(f"\n2000 reviews: {stats['auto_decisions']} auto-decided ({stats['auto_decision_rate']:.1%}), "
+          f"{stats['escalations']} escalated, {stats['precedents']} precedents, "
+          f"~{stats['latency_saved_seconds'] / 3600:.0f} reviewer-hours saved")
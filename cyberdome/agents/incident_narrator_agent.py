@@ -1,56 +1,496 @@
+import io
+import json
+from collections import Counter
+
+from cyberdome.tools.sketches import SpaceSaving
+
+
+class IncidentAggregates:
+    # Running incident statistics, updated incrementally by each graph node so the
+    # final report never has to rescan the full anomaly/exploit lists.
+    SAMPLE_LIMIT = 2
+    CONTAINMENT_SAMPLE_LIMIT = 10
+    CAMPAIGN_SAMPLE_LIMIT = 5
+    TOP_K = 20
+
+    def __init__(self):
+        self.anomaly_count = 0
+        self.anomaly_types = Counter()
+        self.top_endpoints = SpaceSaving(self.TOP_K)
+        self.top_users = SpaceSaving(self.TOP_K)
+        self.anomaly_samples = []
+
+        self.exploit_count = 0
+        self.severity_histogram = Counter()
+        self.signatures = Counter()
+        self.kill_chain_count = 0
+        self.exploit_samples = []
+
+        self.campaign_count = 0
+        self.multi_stage_campaign_count = 0
+        self.campaign_samples = []
+
+        self.containment_count = 0
+        self.containment_statuses = Counter()
+        self.containment_samples = []
+        self.containment_playbooks = Counter()
+        self.critical_path_seconds_total = 0.0
+        self.critical_path_seconds_max = 0.0
+
+        self.review_count = 0
+        self.review_decisions = Counter()
+        self.auto_review_count = 0
+        self.review_latency_saved_seconds = 0.0
+        self.last_review = None
+
+        # Load shedding (see cyberdome/tools/load_shedding.py): records sampled out of routine
+        # traffic are represented by the sample_weight of the ones kept, so the estimated
+        # counts scale observed anomalies/exploits back up to the full stream
+        self.records_offered = 0
+        self.records_admitted = 0
+        self.shed_batches = 0
+        self.min_sample_rate = 1.0
+        self.estimated_anomaly_count = 0.0
+        self.estimated_exploit_count = 0.0
+
+    def add_load_shedding(self, report):
+        self.records_offered += report["offered"]
+        self.records_admitted += report["admitted"]
+        if report["sample_rate"] < 1.0:
+            self.shed_batches += 1
+            self.min_sample_rate = min(self.min_sample_rate, report["sample_rate"])
+
+    def add_anomalies(self, anomalies):
+        for anomaly in anomalies:
+            self.anomaly_count += 1
+            self.anomaly_types[anomaly.get("type")] += 1
+            log = anomaly.get("log")
+            self.estimated_anomaly_count += _sample_weight(log)
+            if isinstance(log, dict):
+                if log.get("source_ip") is not None:
+                    self.top_endpoints.add(log["source_ip"])
+                if log.get("user_id") is not None:
+                    self.top_users.add(log["user_id"])
+            if len(self.anomaly_samples) < self.SAMPLE_LIMIT:
+                self.anomaly_samples.append({"type": anomaly.get("type"), "details": _describe_log(log)})
+
+    def add_exploits(self, exploits):
+        for exploit in exploits:
+            self.exploit_count += 1
+            self.estimated_exploit_count += _sample_weight((exploit.get("original_anomaly") or {}).get("log"))
+            self.severity_histogram[exploit.get("severity")] += 1
+            self.signatures[exploit.get("signature")] += 1
+            kill_chain = bool(exploit.get("kill_chain_interrupted_flag"))
+            self.kill_chain_count += kill_chain
+            if len(self.exploit_samples) < self.SAMPLE_LIMIT:
+                self.exploit_samples.append({
+                    "signature": exploit.get("signature"),
+                    "severity": exploit.get("severity"),
+                    "kill_chain_interrupted_flag": kill_chain,
+                })
+
+    def add_campaigns(self, campaigns):
+        for campaign in campaigns:
+            self.campaign_count += 1
+            self.multi_stage_campaign_count += len(campaign["stages"]) > 1
+            if len(self.campaign_samples) < self.CAMPAIGN_SAMPLE_LIMIT:
+                self.campaign_samples.append({
+                    "campaign_id": campaign["campaign_id"],
+                    "size": campaign["size"],
+                    "severity": campaign["severity"],
+                    "stages": campaign["stages"],
+                })
+
+    def add_containment_actions(self, actions):
+        for action in actions:
+            self.containment_count += 1
+            self.containment_statuses[action.get("status")] += 1
+            if action.get("playbook"):
+                self.containment_playbooks[action["playbook"]] += 1
+                self.critical_path_seconds_total += action["critical_path_seconds"]
+                self.critical_path_seconds_max = max(self.critical_path_seconds_max, action["critical_path_seconds"])
+            if len(self.containment_samples) < self.CONTAINMENT_SAMPLE_LIMIT:
+                self.containment_samples.append({"endpoint_id": action.get("endpoint_id"), "status": action.get("status"),
+                                                 "playbook": action.get("playbook"),
+                                                 "critical_path_seconds": action.get("critical_path_seconds")})
+
+    def add_review(self, review_result):
+        self.review_count += 1
+        self.review_decisions[review_result.get("decision")] += 1
+        if review_result.get("auto_decided"):
+            self.auto_review_count += 1
+            self.review_latency_saved_seconds += review_result.get("latency_saved_seconds", 0.0)
+        self.last_review = {
+            "decision": review_result.get("decision"),
+            "justification": review_result.get("justification"),
+            "policy_agent_role": review_result.get("policy_agent_role", "N/A"),
+        }
+
+    def add_review_decisions(self, human_review):
+        # The SOC graph stores decisions as {exploit_id: review_result}; older callers pass a single result.
+        if not human_review:
+            return
+        if "decision" in human_review:
+            self.add_review(human_review)
+            return
+        for review_result in human_review.values():
+            if isinstance(review_result, dict) and "decision" in review_result:
+                self.add_review(review_result)
+
+    def merge(self, other):
+        # Combines aggregates computed over disjoint parts of an incident (e.g. log shards)
+        self.anomaly_count += other.anomaly_count
+        self.anomaly_types.update(other.anomaly_types)
+        self.top_endpoints.merge(other.top_endpoints)
+        self.top_users.merge(other.top_users)
+        self.anomaly_samples = (self.anomaly_samples + other.anomaly_samples)[:self.SAMPLE_LIMIT]
+        self.exploit_count += other.exploit_count
+        self.severity_histogram.update(other.severity_histogram)
+        self.signatures.update(other.signatures)
+        self.kill_chain_count += other.kill_chain_count
+        self.exploit_samples = (self.exploit_samples + other.exploit_samples)[:self.SAMPLE_LIMIT]
+        self.campaign_count += other.campaign_count
+        self.multi_stage_campaign_count += other.multi_stage_campaign_count
+        self.campaign_samples = (self.campaign_samples + other.campaign_samples)[:self.CAMPAIGN_SAMPLE_LIMIT]
+        self.containment_count += other.containment_count
+        self.containment_statuses.update(other.containment_statuses)
+        self.containment_samples = (self.containment_samples + other.containment_samples)[:self.CONTAINMENT_SAMPLE_LIMIT]
+        self.containment_playbooks.update(other.containment_playbooks)
+        self.critical_path_seconds_total += other.critical_path_seconds_total
+        self.critical_path_seconds_max = max(self.critical_path_seconds_max, other.critical_path_seconds_max)
+        self.review_count += other.review_count
+        self.review_decisions.update(other.review_decisions)
+        self.auto_review_count += other.auto_review_count
+        self.review_latency_saved_seconds += other.review_latency_saved_seconds
+        self.last_review = other.last_review or self.last_review
+        self.records_offered += other.records_offered
+        self.records_admitted += other.records_admitted
+        self.shed_batches += other.shed_batches
+        self.min_sample_rate = min(self.min_sample_rate, other.min_sample_rate)
+        self.estimated_anomaly_count += other.estimated_anomaly_count
+        self.estimated_exploit_count += other.estimated_exploit_count
+        return self
+
+    @classmethod
+    def from_state(cls, all_data_points):
+        # Fallback for callers that did not update aggregates while the graph ran.
+        aggregates = cls()
+        aggregates.add_anomalies(all_data_points.get("detected_anomalies") or [])
+        aggregates.add_exploits(all_data_points.get("classified_exploits") or [])
+        aggregates.add_campaigns(all_data_points.get("campaigns") or [])
+        aggregates.add_containment_actions(all_data_points.get("containment_actions") or [])
+        aggregates.add_review_decisions(all_data_points.get("human_review_decision"))
+        return aggregates
+
+    def to_dict(self):
+        return {
+            "anomaly_count": self.anomaly_count,
+            "anomaly_types": dict(self.anomaly_types),
+            "top_endpoints": self.top_endpoints.to_dict(),
+            "top_users": self.top_users.to_dict(),
+            "anomaly_samples": list(self.anomaly_samples),
+            "exploit_count": self.exploit_count,
+            "severity_histogram": dict(self.severity_histogram),
+            "signatures": dict(self.signatures),
+            "kill_chain_count": self.kill_chain_count,
+            "exploit_samples": list(self.exploit_samples),
+            "campaign_count": self.campaign_count,
+            "multi_stage_campaign_count": self.multi_stage_campaign_count,
+            "campaign_samples": list(self.campaign_samples),
+            "containment_count": self.containment_count,
+            "containment_statuses": dict(self.containment_statuses),
+            "containment_samples": list(self.containment_samples),
+            "containment_playbooks": dict(self.containment_playbooks),
+            "critical_path_seconds_total": self.critical_path_seconds_total,
+            "critical_path_seconds_max": self.critical_path_seconds_max,
+            "review_count": self.review_count,
+            "review_decisions": dict(self.review_decisions),
+            "auto_review_count": self.auto_review_count,
+            "review_latency_saved_seconds": self.review_latency_saved_seconds,
+            "last_review": self.last_review,
+            "records_offered": self.records_offered,
+            "records_admitted": self.records_admitted,
+            "shed_batches": self.shed_batches,
+            "min_sample_rate": self.min_sample_rate,
+            "estimated_anomaly_count": self.estimated_anomaly_count,
+            "estimated_exploit_count": self.estimated_exploit_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregates = cls()
+        if not data:
+            return aggregates
+        aggregates.anomaly_count = data["anomaly_count"]
+        aggregates.anomaly_types = Counter(data["anomaly_types"])
+        aggregates.top_endpoints = SpaceSaving.from_dict(data["top_endpoints"])
+        aggregates.top_users = SpaceSaving.from_dict(data["top_users"])
+        aggregates.anomaly_samples = list(data["anomaly_samples"])
+        aggregates.exploit_count = data["exploit_count"]
+        aggregates.severity_histogram = Counter(data["severity_histogram"])
+        aggregates.signatures = Counter(data["signatures"])
+        aggregates.kill_chain_count = data["kill_chain_count"]
+        aggregates.exploit_samples = list(data["exploit_samples"])
+        # Checkpoints written before campaign correlation existed have no campaign fields
+        aggregates.campaign_count = data.get("campaign_count", 0)
+        aggregates.multi_stage_campaign_count = data.get("multi_stage_campaign_count", 0)
+        aggregates.campaign_samples = list(data.get("campaign_samples", []))
+        aggregates.containment_count = data["containment_count"]
+        aggregates.containment_statuses = Counter(data["containment_statuses"])
+        aggregates.containment_samples = list(data["containment_samples"])
+        aggregates.containment_playbooks = Counter(data.get("containment_playbooks", {}))
+        aggregates.critical_path_seconds_total = data.get("critical_path_seconds_total", 0.0)
+        aggregates.critical_path_seconds_max = data.get("critical_path_seconds_max", 0.0)
+        aggregates.review_count = data["review_count"]
+        aggregates.review_decisions = Counter(data["review_decisions"])
+        aggregates.auto_review_count = data.get("auto_review_count", 0)
+        aggregates.review_latency_saved_seconds = data.get("review_latency_saved_seconds", 0.0)
+        aggregates.last_review = data["last_review"]
+        aggregates.records_offered = data.get("records_offered", 0)
+        aggregates.records_admitted = data.get("records_admitted", 0)
+        aggregates.shed_batches = data.get("shed_batches", 0)
+        aggregates.min_sample_rate = data.get("min_sample_rate", 1.0)
+        aggregates.estimated_anomaly_count = data.get("estimated_anomaly_count", aggregates.anomaly_count)
+        aggregates.estimated_exploit_count = data.get("estimated_exploit_count", aggregates.exploit_count)
+        return aggregates
+
+
+def _sample_weight(log):
+    return log.get("sample_weight", 1.0) if isinstance(log, dict) else 1.0
+
+
+def _describe_load_shedding(aggregates):
+    return (f"Load shedding: routine traffic sampled in {aggregates.shed_batches} batches (down to "
+            f"{aggregates.min_sample_rate:.0%}), {aggregates.records_admitted} of {aggregates.records_offered} records "
+            f"analysed; estimated ~{aggregates.estimated_anomaly_count:.0f} anomalies and "
+            f"~{aggregates.estimated_exploit_count:.0f} exploits in the full stream")
+
+
+def _describe_playbooks(aggregates):
+    runs = sum(aggregates.containment_playbooks.values())
+    return (f"Playbooks: {_format_counter(aggregates.containment_playbooks)}; critical path "
+            f"{aggregates.critical_path_seconds_total / runs * 1000:.0f} ms mean, "
+            f"{aggregates.critical_path_seconds_max * 1000:.0f} ms max")
+
+
+def _describe_auto_reviews(aggregates):
+    rate = aggregates.auto_review_count / aggregates.review_count
+    return (f"Auto-decided from precedent: {aggregates.auto_review_count} ({rate:.0%}), "
+            f"~{aggregates.review_latency_saved_seconds / 60:.0f} min of reviewer time saved")
+
+
+def _describe_log(log, limit=100):
+    if isinstance(log, dict):
+        text = ", ".join(f"{key}={value}" for key, value in log.items() if key not in ("event_id", "type", "sample_weight"))
+    else:
+        text = str(log if log is not None else "")
+    return text[:limit]
+
+
 class IncidentNarratorAgent:
+    OUTPUT_FORMATS = ("text", "markdown", "json")
+    TOP_N = 5
+
     def __init__(self, name="Incident Narrator Agent"):
         self.name = name
 
-    def summarize_incident(self, all_data_points):
+    def summarize_incident(self, all_data_points, output_format="text"):
         # all_data_points could be the final state from LangGraph, containing all collected info
         print(f"\n[{self.name}] Generating incident summary...")
-        
-        summary = "Incident Report:\n"
-        summary += "===============\n"
-        
-        recon_anomalies = all_data_points.get("detected_anomalies", [])
-        classified_exploits = all_data_points.get("classified_exploits", [])
-        containment_actions = all_data_points.get("containment_actions", [])
-        human_review = all_data_points.get("human_review_decision")
-
-        summary += f"1. Reconnaissance Phase:\n"
-        if recon_anomalies:
-            summary += f"   - Detected {len(recon_anomalies)} initial anomalies.\n"
-            for anomaly in recon_anomalies[:2]: # Show first 2
-                summary += f"     - Type: {anomaly.get('type')}, Details: {str(anomaly.get('log', '')[:100])}...\n"
+        if output_format not in self.OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported report format '{output_format}'. Expected one of {self.OUTPUT_FORMATS}.")
+
+        if all_data_points.get("incident_aggregates"):
+            aggregates = IncidentAggregates.from_dict(all_data_points["incident_aggregates"])
         else:
-            summary += "   - No anomalies detected in recon phase.\n"
-
-        summary += f"\n2. Classification Phase:\n"
-        if classified_exploits:
-            summary += f"   - Classified {len(classified_exploits)} exploits.\n"
-            for exploit in classified_exploits[:2]: # Show first 2
-                summary += f"     - Signature: {exploit.get('signature')}, Severity: {exploit.get('severity')}\n"
-                if exploit.get('kill_chain_interrupted_flag'):
-                    summary += f"     - Kill Chain Interruption: Attempted/Flagged\n"
+            aggregates = IncidentAggregates.from_state(all_data_points)
+
+        if output_format == "json":
+            summary = json.dumps(self._report_dict(aggregates), indent=2)
+        elif output_format == "markdown":
+            summary = self._render_markdown(aggregates)
         else:
-            summary += "   - No exploits classified.\n"
+            summary = self._render_text(aggregates)
 
-        if human_review:
-            summary += f"\n3. Human Review Board Decision:\n"
-            summary += f"   - Decision: {human_review.get('decision')}\n"
-            summary += f"   - Justification: {human_review.get('justification')}\n"
-            summary += f"   - Policy Override Agent: {human_review.get('policy_agent_role', 'N/A')}\n"
+        print(summary)
+        return summary
 
+    def _report_dict(self, aggregates):
+        return {
+            "reconnaissance": {
+                "anomaly_count": aggregates.anomaly_count,
+                "anomalies_by_type": dict(aggregates.anomaly_types),
+                "top_endpoints": [{"endpoint": item, "count": count, "error": error} for item, count, error in aggregates.top_endpoints.top(self.TOP_N)],
+                "top_users": [{"user_id": item, "count": count, "error": error} for item, count, error in aggregates.top_users.top(self.TOP_N)],
+                "samples": aggregates.anomaly_samples,
+                "estimated_anomaly_count": aggregates.estimated_anomaly_count,
+            },
+            "load_shedding": {
+                "records_offered": aggregates.records_offered,
+                "records_admitted": aggregates.records_admitted,
+                "shed_batches": aggregates.shed_batches,
+                "min_sample_rate": aggregates.min_sample_rate,
+            },
+            "classification": {
+                "exploit_count": aggregates.exploit_count,
+                "severity_histogram": dict(aggregates.severity_histogram),
+                "signatures": dict(aggregates.signatures.most_common(self.TOP_N)),
+                "kill_chain_interruptions": aggregates.kill_chain_count,
+                "samples": aggregates.exploit_samples,
+                "estimated_exploit_count": aggregates.estimated_exploit_count,
+            },
+            "correlation": {
+                "campaign_count": aggregates.campaign_count,
+                "multi_stage_campaigns": aggregates.multi_stage_campaign_count,
+                "samples": aggregates.campaign_samples,
+            },
+            "human_review": {
+                "review_count": aggregates.review_count,
+                "decisions": dict(aggregates.review_decisions),
+                "auto_decided": aggregates.auto_review_count,
+                "latency_saved_seconds": aggregates.review_latency_saved_seconds,
+                "last_review": aggregates.last_review,
+            },
+            "containment": {
+                "action_count": aggregates.containment_count,
+                "statuses": dict(aggregates.containment_statuses),
+                "playbooks": dict(aggregates.containment_playbooks),
+                "critical_path_seconds_max": aggregates.critical_path_seconds_max,
+                "samples": aggregates.containment_samples,
+            },
+        }
 
-        summary += f"\n4. Containment Phase:\n"
-        if containment_actions:
-            summary += f"   - Executed {len(containment_actions)} containment actions.\n"
-            for action in containment_actions:
-                summary += f"     - Endpoint: {action.get('endpoint_id')}, Status: {action.get('status')}\n"
+    def _render_text(self, aggregates):
+        out = io.StringIO()
+        write = out.write
+        write("Incident Report:\n")
+        write("===============\n")
+
+        write("1. Reconnaissance Phase:\n")
+        if aggregates.anomaly_count:
+            write(f"   - Detected {aggregates.anomaly_count} initial anomalies.\n")
+            for anomaly_type, count in aggregates.anomaly_types.most_common(self.TOP_N):
+                write(f"     - {anomaly_type}: {count}\n")
+            for sample in aggregates.anomaly_samples:
+                write(f"     - Type: {sample['type']}, Details: {sample['details']}...\n")
+            self._write_heavy_hitters(write, "Top endpoints", aggregates.top_endpoints, "     ")
+            self._write_heavy_hitters(write, "Top users", aggregates.top_users, "     ")
         else:
-            summary += "   - No containment actions taken.\n"
-        
-        summary += "\nEnd of Report.\n"
-        
-        print(summary)
-        return summary
+            write("   - No anomalies detected in recon phase.\n")
+        if aggregates.shed_batches:
+            write(f"   - {_describe_load_shedding(aggregates)}\n")
+
+        write("\n2. Classification Phase:\n")
+        if aggregates.exploit_count:
+            write(f"   - Classified {aggregates.exploit_count} exploits.\n")
+            write(f"   - Severity histogram: {_format_counter(aggregates.severity_histogram)}\n")
+            for sample in aggregates.exploit_samples:
+                write(f"     - Signature: {sample['signature']}, Severity: {sample['severity']}\n")
+            if aggregates.kill_chain_count:
+                write(f"     - Kill Chain Interruption: Attempted/Flagged ({aggregates.kill_chain_count} exploits)\n")
+            if aggregates.campaign_count:
+                write(f"   - Correlated into {aggregates.campaign_count} campaigns "
+                      f"({aggregates.multi_stage_campaign_count} spanning several kill chain stages).\n")
+                for campaign in aggregates.campaign_samples:
+                    write(f"     - {campaign['campaign_id']}: {campaign['size']} exploits, Severity: {campaign['severity']}, "
+                          f"Stages: {', '.join(campaign['stages'])}\n")
+        else:
+            write("   - No exploits classified.\n")
+
+        if aggregates.review_count:
+            review = aggregates.last_review
+            write("\n3. Human Review Board Decision:\n")
+            if aggregates.review_count > 1:
+                write(f"   - Reviews: {aggregates.review_count} ({_format_counter(aggregates.review_decisions)})\n")
+            if aggregates.auto_review_count:
+                write(f"   - {_describe_auto_reviews(aggregates)}\n")
+            write(f"   - Decision: {review['decision']}\n")
+            write(f"   - Justification: {review['justification']}\n")
+            write(f"   - Policy Override Agent: {review['policy_agent_role']}\n")
+
+        write("\n4. Containment Phase:\n")
+        if aggregates.containment_count:
+            write(f"   - Executed {aggregates.containment_count} containment actions.\n")
+            if aggregates.containment_playbooks:
+                write(f"   - {_describe_playbooks(aggregates)}\n")
+            for action in aggregates.containment_samples:
+                write(f"     - Endpoint: {action['endpoint_id']}, Status: {action['status']}\n")
+            remaining = aggregates.containment_count - len(aggregates.containment_samples)
+            if remaining > 0:
+                write(f"     - ... and {remaining} more ({_format_counter(aggregates.containment_statuses)})\n")
+        else:
+            write("   - No containment actions taken.\n")
+
+        write("\nEnd of Report.\n")
+        return out.getvalue()
+
+    def _render_markdown(self, aggregates):
+        out = io.StringIO()
+        write = out.write
+        write("# Incident Report\n\n")
+
+        write("## 1. Reconnaissance\n\n")
+        write(f"Detected **{aggregates.anomaly_count}** anomalies.\n\n")
+        if aggregates.anomaly_count:
+            write("| Anomaly type | Count |\n|---|---:|\n")
+            for anomaly_type, count in aggregates.anomaly_types.most_common(self.TOP_N):
+                write(f"| {anomaly_type} | {count} |\n")
+            write("\n")
+            self._write_markdown_hitters(write, "Endpoint", aggregates.top_endpoints)
+            self._write_markdown_hitters(write, "User", aggregates.top_users)
+        if aggregates.shed_batches:
+            write(f"{_describe_load_shedding(aggregates)}.\n\n")
+
+        write("## 2. Classification\n\n")
+        write(f"Classified **{aggregates.exploit_count}** exploits, "
+              f"{aggregates.kill_chain_count} flagged by the kill chain interceptor.\n\n")
+        if aggregates.exploit_count:
+            write("| Severity | Count |\n|---|---:|\n")
+            for severity, count in aggregates.severity_histogram.most_common():
+                write(f"| {severity} | {count} |\n")
+            write("\n")
+        if aggregates.campaign_count:
+            write(f"Correlated into **{aggregates.campaign_count}** campaigns, "
+                  f"{aggregates.multi_stage_campaign_count} spanning several kill chain stages.\n\n")
+            write("| Campaign | Exploits | Severity | Stages |\n|---|---:|---|---|\n")
+            for campaign in aggregates.campaign_samples:
+                write(f"| {campaign['campaign_id']} | {campaign['size']} | {campaign['severity']} | {', '.join(campaign['stages'])} |\n")
+            write("\n")
+
+        if aggregates.review_count:
+            review = aggregates.last_review
+            write("## 3. Human Review Board\n\n")
+            write(f"- Reviews: {aggregates.review_count} ({_format_counter(aggregates.review_decisions)})\n")
+            if aggregates.auto_review_count:
+                write(f"- {_describe_auto_reviews(aggregates)}\n")
+            write(f"- Last decision: **{review['decision']}** - {review['justification']}\n")
+            write(f"- Policy Override Agent: {review['policy_agent_role']}\n\n")
+
+        write("## 4. Containment\n\n")
+        write(f"Executed **{aggregates.containment_count}** containment actions.\n\n")
+        if aggregates.containment_playbooks:
+            write(f"{_describe_playbooks(aggregates)}\n\n")
+        for action in aggregates.containment_samples:
+            write(f"- `{action['endpoint_id']}`: {action['status']}\n")
+        return out.getvalue()
+
+    def _write_heavy_hitters(self, write, label, sketch, indent):
+        top = sketch.top(self.TOP_N)
+        if top:
+            write(f"{indent}- {label}: " + ", ".join(f"{item} ({count})" for item, count, _ in top) + "\n")
+
+    def _write_markdown_hitters(self, write, label, sketch):
+        top = sketch.top(self.TOP_N)
+        if not top:
+            return
+        write(f"| {label} | Count (upper bound) |\n|---|---:|\n")
+        for item, count, _ in top:
+            write(f"| {item} | {count} |\n")
+        write("\n")
+
+    def run(self, final_state_data, output_format="text"):
+        return self.summarize_incident(final_state_data, output_format=output_format)
+
 
-    def run(self, final_state_data):
-        return self.summarize_incident(final_state_data)
+def _format_counter(counter):
+    return ", ".join(f"{key}: {count}" for key, count in counter.most_common())
@@ -1,14 +1,41 @@
+from cyberdome.tools.behavior_baseline import BehavioralBaseline
+from cyberdome.tools.event_time import stamp_event_times
+from cyberdome.tools.exfiltration_detector import ExfiltrationDetector, alert_to_anomaly
+from cyberdome.tools.ioc_index import IOCStore
+from cyberdome.tools.log_join import WindowedLogJoin, matches_to_anomalies
+
+
 class ReconAgent:
-    def __init__(self, name="Reconnaissance Agent"):
+    def __init__(self, name="Reconnaissance Agent", behavioral_baseline=None, exfiltration_detector=None,
+                 log_join=None, join_logs=True, ioc_store=None):
         self.name = name
+        # Indicator feeds (default: cyberdome/data/ioc_feeds); call ioc_store.start_watching() for hot reload
+        self.ioc_store = ioc_store if ioc_store is not None else IOCStore()
+        # join_logs=False leaves the network/user join to the caller (e.g. when logs are sharded by different keys)
+        self.log_join = (log_join if log_join is not None else WindowedLogJoin()) if join_logs else None
+        self.exfiltration_detector = exfiltration_detector if exfiltration_detector is not None else ExfiltrationDetector()
+        # Learned across batches: the baseline is what makes per-user deviations detectable
+        self.behavioral_baseline = behavioral_baseline if behavioral_baseline is not None else BehavioralBaseline()
 
     def scan_network_traffic(self, traffic_logs):
         print(f"[{self.name}] Scanning network traffic logs...")
         # Placeholder for LLM-based anomaly detection in traffic
         anomalies = []
-        for log_entry in traffic_logs:
+        flagged = {}
+        for position, log_entry in enumerate(traffic_logs):
             if "suspicious_pattern" in log_entry.get("payload", "").lower(): # Simplified check
-                anomalies.append({"type": "Traffic Anomaly", "log": log_entry, "reason": "Suspicious pattern detected"})
+                flagged[position] = {"type": "Traffic Anomaly", "log": log_entry, "reason": "Suspicious pattern detected"}
+                anomalies.append(flagged[position])
+        # Known-bad endpoints and payload digests, checked for the whole batch against one index snapshot
+        for position, ioc_matches in self.ioc_store.index.match_logs(traffic_logs):
+            if position in flagged:
+                flagged[position]["ioc_matches"] = ioc_matches
+            else:
+                anomalies.append({"type": "Traffic Anomaly", "log": traffic_logs[position],
+                                  "reason": "Known indicator of compromise", "ioc_matches": ioc_matches})
+        # Each scan is treated as a complete batch, so open windows are flushed at the end
+        for alert in self.exfiltration_detector.scan_flows(traffic_logs, flush=True):
+            anomalies.append(alert_to_anomaly(alert))
         print(f"[{self.name}] Found {len(anomalies)} traffic anomalies.")
         return anomalies
 
@@ -17,16 +44,38 @@ class ReconAgent:
         # Placeholder for LLM-based behavioral anomaly detection
         anomalies = []
         for log_entry in user_logs:
+            baseline_result = self.behavioral_baseline.score_and_update(log_entry)
             if log_entry.get("action") == "unusual_login_time" or log_entry.get("resource_access") == "restricted_sensitive_data":
                  anomalies.append({"type": "Behavioral Anomaly", "log": log_entry, "reason": "Unusual user behavior detected"})
+            elif baseline_result["anomalous"]:
+                anomalies.append({
+                    "type": "Behavioral Anomaly",
+                    "log": log_entry,
+                    "reason": "Deviation from user behavioral baseline",
+                    "baseline_score": baseline_result["score"],
+                    "baseline_factors": baseline_result["factors"],
+                })
         print(f"[{self.name}] Found {len(anomalies)} behavioral anomalies.")
         return anomalies
 
+    def correlate_sessions(self, traffic_logs, user_logs):
+        print(f"[{self.name}] Joining network flows with user activity on source_ip...")
+        anomalies = matches_to_anomalies(self.log_join.process(traffic_logs, user_logs))
+        print(f"[{self.name}] Found {len(anomalies)} login-then-exfiltration sequences ({self.log_join.late_events} late events dropped so far).")
+        return anomalies
+
     def run(self, network_traffic_data, user_behavior_data):
         print(f"\n[{self.name}] Starting reconnaissance...")
+        network_traffic_data = network_traffic_data or []
+        user_behavior_data = user_behavior_data or []
+        # Ingestion: parse timestamps once into the integer event time column every later stage reads
+        network_traffic_data, _ = stamp_event_times(network_traffic_data)
+        user_behavior_data, _ = stamp_event_times(user_behavior_data)
         traffic_anomalies = self.scan_network_traffic(network_traffic_data)
         behavioral_anomalies = self.scan_behavioral_logs(user_behavior_data)
         
         all_anomalies = traffic_anomalies + behavioral_anomalies
+        if self.log_join is not None:
+            all_anomalies += self.correlate_sessions(network_traffic_data, user_behavior_data)
         print(f"[{self.name}] Reconnaissance complete. Total anomalies found: {len(all_anomalies)}")
         return all_anomalies
@@ -1,3 +1,7 @@
 from .log_generator import LogGenerator
+from .log_archive import open_log_archive, log_archive_writer
+from .log_ingest import LogIngestService, send_generated_logs
+from .records import ContainmentActionRecord, ExploitRecord
 
-__all__ = ["LogGenerator"]
+__all__ = ["LogGenerator", "open_log_archive", "log_archive_writer", "LogIngestService", "send_generated_logs",
+           "ExploitRecord", "ContainmentActionRecord"]
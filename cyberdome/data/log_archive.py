@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+import uuid
+
+import numpy as np
+
+from cyberdome.tools.event_time import EPOCH_FIELD
+from tools.record_archive import MISSING, RecordArchive, RecordArchiveWriter, uuid_bytes
+
+
+def _iso_to_epoch_us(timestamp):
+    # Same rules as event_time.parse_timestamp_ms at microsecond precision; a malformed
+    # timestamp is stored as MISSING rather than failing the whole archive write
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp * 1000000)
+    if not timestamp:
+        return MISSING
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return MISSING
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000000)
+
+
+def _epoch_us_to_iso(epoch_us):
+    if epoch_us == MISSING:
+        return None
+    seconds, micros = divmod(epoch_us, 1000000)
+    moment = datetime.fromtimestamp(seconds, tz=timezone.utc).replace(microsecond=micros, tzinfo=None)
+    return moment.isoformat() + "Z"
+
+
+def _int_or_missing(value):
+    return MISSING if value is None else int(value)
+
+
+class LogRecordSchema:
+    # Fixed-width record for LogGenerator network_traffic and user_activity logs.
+    # Categorical fields are int32 dictionary codes, UUID event ids are stored raw
+    # (other ids go through the dictionary), timestamps are epoch microseconds.
+    # Fields that are absent or None are not emitted when decoding. Decoded logs also
+    # carry the integer event time (EPOCH_FIELD) so consumers never re-parse the ISO string.
+    name = "cyberdome.log.v1"
+    time_field = "timestamp_us"
+    time_units_per_second = 1000000
+    string_fields = ("type", "source_ip", "destination_ip", "protocol", "payload", "notes", "user_id",
+                     "action", "resource_id", "target_resource", "status", "details")
+    dictionary_fields = ("event_id",) + string_fields
+    dtype = np.dtype(
+        [("event_uuid", "S16"), ("event_id", "<i4"), ("timestamp_us", "<i8"),
+         ("destination_port", "<i4"), ("payload_size_bytes", "<i8")]
+        + [(field, "<i4") for field in string_fields]
+    )
+
+    def encode(self, log, dictionaries):
+        event_id = log.get("event_id")
+        raw_uuid = uuid_bytes(event_id)
+        row = [
+            raw_uuid or b"",
+            MISSING if raw_uuid else dictionaries["event_id"].encode(event_id),
+            _iso_to_epoch_us(log.get("timestamp")),
+            _int_or_missing(log.get("destination_port")),
+            _int_or_missing(log.get("payload_size_bytes")),
+        ]
+        for field in self.string_fields:
+            value = log.get(field)
+            row.append(dictionaries[field].encode(None if value is None else str(value)))
+        return tuple(row)
+
+    def decode(self, records, dictionaries):
+        # Column-at-a-time decode: one tolist() per field instead of per-record field access
+        count = len(records)
+        columns = {}
+        event_codes = records["event_id"]
+        event_uuids = records["event_uuid"].tolist()
+        event_ids = dictionaries["event_id"].decode_column(event_codes)
+        columns["event_id"] = [
+            event_ids[i] if event_ids[i] is not None else str(uuid.UUID(bytes=event_uuids[i].ljust(16, b"\0")))
+            for i in range(count)
+        ]
+        timestamps_us = records["timestamp_us"]
+        columns["timestamp"] = [_epoch_us_to_iso(value) for value in timestamps_us.tolist()]
+        missing = (timestamps_us == MISSING).tolist()
+        columns[EPOCH_FIELD] = [None if gap else value for gap, value in zip(missing, (timestamps_us // 1000).tolist())]
+        for field in self.string_fields:
+            columns[field] = dictionaries[field].decode_column(records[field])
+        for field in ("destination_port", "payload_size_bytes"):
+            columns[field] = [None if value == MISSING else value for value in records[field].tolist()]
+
+        names = list(columns)
+        logs = []
+        for values in zip(*(columns[name] for name in names)):
+            logs.append({name: value for name, value in zip(names, values) if value is not None})
+        return logs
+
+
+LOG_SCHEMA = LogRecordSchema()
+
+
+def open_log_archive(path):
+    return RecordArchive(path, LOG_SCHEMA)
+
+
+def log_archive_writer(path, metadata=None):
+    return RecordArchiveWriter(path, LOG_SCHEMA, metadata=metadata)
+
+
+def split_log_batch(logs):
+    network_traffic_data = [log for log in logs if log.get("type") == "network_traffic"]
+    user_behavior_data = [log for log in logs if log.get("type") == "user_activity"]
+    return network_traffic_data, user_behavior_data
@@ -30,7 +30,7 @@ class LogGenerator:
         }
         if anomaly_type == "data_exfiltration":
             log["payload"] = f"sensitive_document_chunk_{random.randint(1,100)}.docx"
-            log["destination_ip"] = "suspicious_external_ip_1.2.3.4"
+            log["destination_ip"] = "exfil-drop.example.net"  # listed in ioc_feeds/sample_indicators.txt
             log["payload_size_bytes"] = random.randint(100000, 500000) # Larger payload
             log["notes"] = "Potential data exfiltration signature"
         elif anomaly_type == "malware_signature":
@@ -95,6 +95,22 @@ class LogGenerator:
         random.shuffle(logs)
         return logs
 
+    def write_archive(self, path, num_total_logs=10000, batch_size=10000):
+        # Persists a reproducible corpus in the binary log archive format (see log_archive.py),
+        # generated batch by batch so large corpora never sit in memory at once. Each batch is
+        # trimmed to size (generate_mock_logs always adds its anomalies) and written in time order.
+        from .log_archive import log_archive_writer
+
+        metadata = {"generator": "LogGenerator", "requested_logs": num_total_logs}
+        with log_archive_writer(path, metadata=metadata) as writer:
+            remaining = num_total_logs
+            while remaining > 0:
+                batch = min(batch_size, remaining)
+                logs = self.generate_mock_logs(num_network_logs=max(batch // 2, 2), num_user_logs=max(batch - batch // 2, 2))
+                writer.write(sorted(logs[:batch], key=lambda log: log["timestamp"]))
+                remaining -= batch
+        return writer.count
+
     def get_separate_logs(self, num_total_logs=20):
         all_logs = self.generate_mock_logs(num_network_logs=num_total_logs//2, num_user_logs=num_total_logs//2)
         network_traffic_data = [log for log in all_logs if log["type"] == "network_traffic"]
@@ -120,7 +136,6 @@ if __name__ == "__main__":
         print(json.dumps(log, indent=2))
         if i == 2 and len(user_logs) > 3: print("...")
 
-    # Example of saving to a file (optional)
-    # with open("cyberdome/data/mock_combined_logs.json", "w") as f:
-    #     json.dump(network_logs + user_logs, f, indent=2)
-    # print("\nSaved mock_combined_logs.json to cyberdome/data/ directory")
+    # Example of saving a binary archive for repeatable replay (optional)
+    # count = generator.write_archive("cyberdome/data/mock_logs.gdarch", num_total_logs=100000)
+    # print(f"\nSaved {count} logs to cyberdome/data/mock_logs.gdarch")
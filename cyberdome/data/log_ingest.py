@@ -0,0 +1,389 @@
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from .log_archive import split_log_batch
+from .log_generator import LogGenerator
+
+# <PRI>VERSION TIMESTAMP HOSTNAME APP-NAME PROCID MSGID STRUCTURED-DATA MSG (RFC 5424), MSG a JSON log
+SYSLOG_FACILITY_LOCAL0 = 16
+SYSLOG_SEVERITY_INFO = 6
+SYSLOG_APP_NAME = "cyberdome"
+
+
+def format_syslog_line(log, hostname="loadgen"):
+    priority = SYSLOG_FACILITY_LOCAL0 * 8 + SYSLOG_SEVERITY_INFO
+    stamp = log.get("timestamp") or datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    return f"<{priority}>1 {stamp} {hostname} {SYSLOG_APP_NAME} - - - {json.dumps(log, separators=(',', ':'))}"
+
+
+def parse_log_line(line):
+    # A syslog line whose message is a JSON log, or a bare JSON line (file tail). Raises
+    # ValueError for anything else.
+    start = line.find(b"{" if isinstance(line, bytes) else "{")
+    if start < 0:
+        raise ValueError("no JSON payload")
+    log = json.loads(line[start:])
+    if not isinstance(log, dict):
+        raise ValueError("payload is not a JSON object")
+    return log
+
+
+class IngestMetrics:
+    # Counters for the ingestion front end. rate() is over a sliding window of
+    # window_seconds, sampled once per flush interval.
+    def __init__(self, window_seconds=5.0):
+        self.window_seconds = window_seconds
+        self.received = 0
+        self.parsed = 0
+        self.parse_failures = 0
+        self.dropped = 0
+        self.batches = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.blocked_seconds = 0.0
+        self.started_at = time.perf_counter()
+        self._samples = deque([(self.started_at, 0)])
+
+    def sample(self):
+        now = time.perf_counter()
+        self._samples.append((now, self.parsed))
+        while len(self._samples) > 2 and now - self._samples[0][0] > self.window_seconds:
+            self._samples.popleft()
+
+    def rate(self):
+        (first_at, first_count), (last_at, last_count) = self._samples[0], self._samples[-1]
+        return (last_count - first_count) / (last_at - first_at) if last_at > first_at else 0.0
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "received": self.received,
+            "parsed": self.parsed,
+            "parse_failures": self.parse_failures,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "blocked_seconds": self.blocked_seconds,
+            "events_per_second": self.rate(),
+            "mean_events_per_second": self.parsed / elapsed if elapsed else 0.0,
+        }
+
+
+class _SyslogDatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, service):
+        self.service = service
+
+    def datagram_received(self, data, addr):
+        # Relays may pack several newline-separated messages into one datagram
+        self.service._accept_lines(data.split(b"\n"))
+
+
+class LogIngestService:
+    # Asyncio ingestion front end for the SOC graph. Sources (UDP and TCP syslog
+    # listeners, file tailers) parse records as they arrive and add them to the current
+    # micro-batch; a batch is cut when it reaches batch_size records or has been open for
+    # batch_interval_seconds, and is put on a queue holding at most max_queued_batches.
+    #
+    # Back-pressure: when the queue is full, TCP connections and file tailers stop
+    # reading until the consumer catches up (the kernel then pushes back on TCP senders).
+    # UDP cannot be paused, so batches cut from datagrams while the queue is full are
+    # dropped and counted in metrics.dropped. close() never waits on the consumer: open
+    # connections are cancelled, and if the queue is full the final partial batch is
+    # dropped and the oldest queued batch makes room for the end-of-stream marker.
+    def __init__(self, batch_size=2000, batch_interval_seconds=0.25, max_queued_batches=32):
+        self.batch_size = batch_size
+        self.batch_interval_seconds = batch_interval_seconds
+        self.queue = asyncio.Queue(maxsize=max_queued_batches)
+        self.metrics = IngestMetrics()
+        self._batch = []
+        self._batch_opened_at = None
+        self._servers = []
+        self._tasks = []
+        self._connections = set()
+        self._closed = False
+
+    # ---- sources ----
+
+    async def start_udp(self, host="127.0.0.1", port=5514, receive_buffer_bytes=32 << 20):
+        # A large socket buffer absorbs bursts while the loop is busy parsing; the kernel caps
+        # it at net.core.rmem_max. Datagrams that overflow it are lost before we see them.
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_bytes)
+        sock.bind((host, port))
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(lambda: _SyslogDatagramProtocol(self), sock=sock)
+        self._servers.append(transport)
+        self._ensure_flusher()
+        return transport.get_extra_info("sockname")
+
+    async def start_tcp(self, host="127.0.0.1", port=5514):
+        # Newline-framed syslog over TCP (RFC 6587 non-transparent framing)
+        server = await asyncio.start_server(self._handle_tcp, host, port, limit=1 << 20)
+        self._servers.append(server)
+        self._ensure_flusher()
+        return server.sockets[0].getsockname()
+
+    async def _handle_tcp(self, reader, writer):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        pending = b""
+        try:
+            while True:
+                chunk = await reader.read(1 << 16)
+                if not chunk:
+                    break
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                await self._add_lines(lines)
+            if pending:
+                await self._add_lines([pending])
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+
+    def tail_file(self, path, from_start=False, poll_interval_seconds=0.1):
+        # Follows path like `tail -F`: picks up appended lines, and reopens the file when it
+        # is rotated (a new inode at path) or truncated, after draining the old file.
+        task = asyncio.get_running_loop().create_task(self._tail(path, from_start, poll_interval_seconds))
+        self._tasks.append(task)
+        self._ensure_flusher()
+        return task
+
+    async def _tail(self, path, from_start, poll_interval_seconds):
+        handle, inode, pending = None, None, b""
+        while not self._closed:
+            if handle is None:
+                try:
+                    handle = open(path, "rb")
+                except FileNotFoundError:
+                    await asyncio.sleep(poll_interval_seconds)
+                    continue
+                inode = os.fstat(handle.fileno()).st_ino
+                if not from_start:
+                    handle.seek(0, os.SEEK_END)
+                from_start = True  # files that appear after rotation are read from the start
+            chunk = handle.read(1 << 20)
+            if chunk:
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                await self._add_lines(lines)
+                continue
+            try:
+                current = os.stat(path)
+            except FileNotFoundError:
+                current = None
+            if current is None or current.st_ino != inode or current.st_size < handle.tell():
+                if pending:
+                    await self._add_lines([pending])
+                    pending = b""
+                handle.close()
+                handle = None
+                continue
+            await asyncio.sleep(poll_interval_seconds)
+        if handle is not None:
+            handle.close()
+
+    # ---- batching ----
+
+    def _parse_into_batch(self, lines):
+        # Generator over the batches cut while parsing lines, so callers decide how to enqueue them
+        metrics = self.metrics
+        for line in lines:
+            if not line.strip():
+                continue
+            metrics.received += 1
+            try:
+                log = parse_log_line(line)
+            except ValueError:  # json.JSONDecodeError is a ValueError
+                metrics.parse_failures += 1
+                continue
+            metrics.parsed += 1
+            if not self._batch:
+                self._batch_opened_at = time.perf_counter()
+            self._batch.append(log)
+            if len(self._batch) >= self.batch_size:
+                yield self._cut()
+
+    def _cut(self):
+        batch, self._batch = self._batch, []
+        return batch
+
+    def _accept_lines(self, lines):
+        for batch in self._parse_into_batch(lines):
+            self._offer(batch)
+
+    async def _add_lines(self, lines):
+        for batch in self._parse_into_batch(lines):
+            await self._put(batch)
+
+    def _offer(self, batch):
+        try:
+            self.queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            self.metrics.dropped += len(batch)
+            return
+        self._enqueued()
+
+    async def _put(self, batch):
+        if self.queue.full():
+            blocked_at = time.perf_counter()
+            await self.queue.put(batch)
+            self.metrics.blocked_seconds += time.perf_counter() - blocked_at
+        else:
+            self.queue.put_nowait(batch)
+        self._enqueued()
+
+    def _enqueued(self):
+        self.metrics.batches += 1
+        self.metrics.queue_depth = self.queue.qsize()
+        self.metrics.max_queue_depth = max(self.metrics.max_queue_depth, self.metrics.queue_depth)
+
+    def _ensure_flusher(self):
+        if not any(getattr(task, "_ingest_flusher", False) for task in self._tasks):
+            task = asyncio.get_running_loop().create_task(self._flush_periodically())
+            task._ingest_flusher = True
+            self._tasks.append(task)
+
+    async def _flush_periodically(self):
+        while not self._closed:
+            await asyncio.sleep(self.batch_interval_seconds / 2)
+            self.metrics.sample()
+            self.metrics.queue_depth = self.queue.qsize()
+            if self._batch and time.perf_counter() - self._batch_opened_at >= self.batch_interval_seconds:
+                await self._put(self._cut())
+
+    # ---- consumption ----
+
+    async def batches(self):
+        # Async iterator over micro-batches; ends after close() once the queue is drained
+        while True:
+            batch = await self.queue.get()
+            self.metrics.queue_depth = self.queue.qsize()
+            if batch is None:
+                return
+            yield batch
+
+    async def feed(self, pipeline, max_batches=None):
+        # Runs pipeline(network_traffic_data, user_behavior_data) on each micro-batch in a
+        # worker thread, so the event loop keeps ingesting while the graph runs. One batch is
+        # processed at a time; the bounded queue absorbs bursts in the meantime.
+        results = []
+        async for batch in self.batches():
+            results.append(await asyncio.to_thread(pipeline, *split_log_batch(batch)))
+            if max_batches is not None and len(results) >= max_batches:
+                break
+        return results
+
+    async def close(self):
+        self._closed = True
+        for server in self._servers:
+            server.close()
+        tasks = self._tasks + list(self._connections)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._batch:
+            self._offer(self._cut())
+        if self.queue.full():
+            self.metrics.dropped += len(self.queue.get_nowait())
+        self.queue.put_nowait(None)
+
+
+async def send_generated_logs(host="127.0.0.1", port=5514, protocol="udp", events_per_second=100000,
+                              total_events=500000, pool_size=20000, lines_per_datagram=16, seed=None):
+    # LogGenerator-driven load: pool_size syslog lines are generated up front (generation
+    # is far slower than sending) and cycled at events_per_second, paced in 10 ms slots.
+    # -> {"sent", "seconds", "events_per_second"}
+    import random
+
+    if seed is not None:
+        random.seed(seed)
+    generator = LogGenerator()
+    pool = [format_syslog_line(log).encode() for log in
+            generator.generate_mock_logs(num_network_logs=pool_size // 2, num_user_logs=pool_size - pool_size // 2)]
+    loop = asyncio.get_running_loop()
+    if protocol == "udp":
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+        writer = None
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+
+    slot_seconds = 0.01
+    per_slot = max(1, int(events_per_second * slot_seconds))
+    sent, cursor = 0, 0
+    started = time.perf_counter()
+    try:
+        while sent < total_events:
+            count = min(per_slot, total_events - sent)
+            lines = [pool[(cursor + i) % len(pool)] for i in range(count)]
+            cursor += count
+            if writer is None:
+                for i in range(0, count, lines_per_datagram):
+                    transport.sendto(b"\n".join(lines[i:i + lines_per_datagram]))
+            else:
+                writer.write(b"\n".join(lines) + b"\n")
+                await writer.drain()  # TCP back-pressure from the ingest side
+            sent += count
+            ahead = started + sent / events_per_second - time.perf_counter()
+            await asyncio.sleep(max(ahead, 0))
+    finally:
+        if writer is None:
+            transport.close()
+        else:
+            writer.close()
+            await writer.wait_closed()
+    elapsed = time.perf_counter() - started
+    return {"sent": sent, "seconds": elapsed, "events_per_second": sent / elapsed if elapsed else 0.0}
+
+
+if __name__ == "__main__":
+    # Loopback load test: LogGenerator sender -> ingest service -> a consumer that only
+    # counts (set RUN_GRAPH=1 to feed every micro-batch through the SOC graph instead)
+    async def load_test(protocol, events_per_second, total_events):
+        service = LogIngestService()
+        if protocol == "udp":
+            address = await service.start_udp(port=0)
+        else:
+            address = await service.start_tcp(port=0)
+        consumed = []
+
+        async def consume():
+            if os.environ.get("RUN_GRAPH"):
+                import contextlib
+                import io
+
+                from cyberdome.simulation import AISocCoordinationNode
+
+                coordinator = AISocCoordinationNode()
+
+                def pipeline(network_traffic_data, user_behavior_data):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        coordinator.run_simulation(network_traffic_data, user_behavior_data, continue_stream=True)
+                    consumed.append(len(network_traffic_data) + len(user_behavior_data))
+
+                await service.feed(pipeline)
+            else:
+                async for batch in service.batches():
+                    consumed.append(len(batch))
+
+        consumer = asyncio.get_running_loop().create_task(consume())
+        sender = await send_generated_logs(address[0], address[1], protocol, events_per_second, total_events, seed=1)
+        await asyncio.sleep(service.batch_interval_seconds * 2)
+        metrics = service.metrics.snapshot()
+        await service.close()
+        await consumer
+        print(f"{protocol.upper()} at {events_per_second:,}/s target: sent {sender['sent']:,} in {sender['seconds']:.2f}s "
+              f"({sender['events_per_second']:,.0f}/s); ingested {metrics['parsed']:,} "
+              f"({sender['sent'] - metrics['received']:,} lost before the socket), {metrics['batches']} batches, "
+              f"{sum(consumed):,} consumed, parse failures {metrics['parse_failures']}, dropped {metrics['dropped']:,}, "
+              f"max queue depth {metrics['max_queue_depth']}, blocked {metrics['blocked_seconds']:.2f}s")
+
+    for protocol in ("tcp", "udp"):
+        for rate in (50000, 100000, 200000):
+            asyncio.run(load_test(protocol, rate, rate * 3))
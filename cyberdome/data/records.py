@@ -0,0 +1,144 @@
+from data.records import intern_field
+
+# Compact in-memory records for the SOC pipeline. They hold references instead of nested
+# copies (an exploit points at its anomaly dict) and intern the categorical strings. Like
+# the threat records in data/records.py they read like the dicts they replace (get, []),
+# and to_dict() produces the dict shape the graph state uses; the referenced anomaly dict
+# is passed through, not copied.
+
+
+class _Record:
+    __slots__ = ()
+    _KEYS = ()
+
+    def __getitem__(self, key):
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+    def keys(self):
+        return self._KEYS
+
+    def to_dict(self):
+        return {key: self[key] for key in self._KEYS if self[key] is not None}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class ExploitRecord(_Record):
+    # `anomaly` is the classified anomaly dict itself, not a copy
+    __slots__ = ("anomaly", "signature", "severity", "kill_chain_interrupted_flag", "classification_details")
+    _KEYS = ("original_anomaly", "signature", "severity", "kill_chain_interrupted_flag", "classification_details")
+
+    def __init__(self, anomaly, signature, severity, kill_chain_interrupted_flag=False, classification_details=None):
+        self.anomaly = anomaly
+        self.signature = intern_field(signature)
+        self.severity = intern_field(severity)
+        self.kill_chain_interrupted_flag = kill_chain_interrupted_flag
+        self.classification_details = intern_field(classification_details)
+
+    @classmethod
+    def from_dict(cls, exploit):
+        return cls(exploit.get("original_anomaly"), exploit.get("signature"), exploit.get("severity"),
+                   exploit.get("kill_chain_interrupted_flag", False), exploit.get("classification_details"))
+
+    def __getitem__(self, key):
+        if key == "original_anomaly":
+            return self.anomaly
+        return super().__getitem__(key)
+
+    def to_dict(self):
+        return {
+            "original_anomaly": self.anomaly,
+            "signature": self.signature,
+            "severity": self.severity,
+            "kill_chain_interrupted_flag": self.kill_chain_interrupted_flag,
+            "classification_details": self.classification_details,
+        }
+
+
+class ContainmentActionRecord(_Record):
+    __slots__ = ("endpoint_id", "status", "reason", "exploit_id", "playbook", "steps", "critical_path",
+                 "critical_path_seconds", "wall_seconds")
+    _KEYS = __slots__
+
+    def __init__(self, endpoint_id, status, reason=None, exploit_id=None, playbook=None, steps=None,
+                 critical_path=None, critical_path_seconds=None, wall_seconds=None):
+        self.endpoint_id = endpoint_id
+        self.status = intern_field(status)
+        self.reason = reason
+        self.exploit_id = exploit_id
+        self.playbook = intern_field(playbook)
+        self.steps = steps
+        self.critical_path = critical_path
+        self.critical_path_seconds = critical_path_seconds
+        self.wall_seconds = wall_seconds
+
+    @classmethod
+    def from_dict(cls, action):
+        return cls(**{key: action.get(key) for key in cls._KEYS})
+
+
+if __name__ == "__main__":
+    # Memory held by 1M classified exploits over their anomaly dicts, which reference a
+    # shared pool of raw logs: exploit dicts versus ExploitRecords. Each variant is built in
+    # a forked child and measured as the child's resident-set growth.
+    import gc
+    import json
+    import multiprocessing
+    import os
+    import time
+
+    from cyberdome.data.log_generator import LogGenerator
+
+    def resident_bytes():
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def as_dicts(log, reason, signature, severity):
+        anomaly = {"type": "Behavioral Anomaly", "log": log, "reason": reason}
+        return {"original_anomaly": anomaly, "signature": signature, "severity": severity,
+                "kill_chain_interrupted_flag": False, "classification_details": "LLM-based analysis placeholder"}
+
+    def as_records(log, reason, signature, severity):
+        anomaly = {"type": "Behavioral Anomaly", "log": log, "reason": reason}
+        return ExploitRecord(anomaly, signature, severity, False, "LLM-based analysis placeholder")
+
+    def measure(build, logs, count, results):
+        # Strings arrive as fresh objects per record, as they would from a parser
+        gc.collect()
+        before = resident_bytes()
+        started = time.perf_counter()
+        items = [build(logs[i % len(logs)], "".join(["Unusual user ", "behavior detected"]),
+                       "".join(["Potential Insider ", "Threat Signature"]), "".join(["Hi", "gh"]))
+                 for i in range(count)]
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        results.put((resident_bytes() - before, elapsed, len(items)))
+
+    count = 1000000
+    logs = [json.loads(json.dumps(log)) for log in LogGenerator().generate_mock_logs(10000, 10000)]
+    sample = as_records(logs[0], "r", "s", "High")
+    assert sample.to_dict() == as_dicts(logs[0], "r", "s", "High")
+    assert sample.to_dict()["original_anomaly"]["log"] is logs[0]
+
+    context = multiprocessing.get_context("fork")
+    for label, build in (("dicts", as_dicts), ("records", as_records)):
+        results = context.Queue()
+        child = context.Process(target=measure, args=(build, logs, count, results))
+        child.start()
+        grown, elapsed, built = results.get()
+        child.join()
+        print(f"{label:<8} {grown / 2 ** 20:8.1f} MiB for {built:,} anomalies + exploits "
+              f"({grown / built:6.1f} B per pair), built in {elapsed:.1f}s")
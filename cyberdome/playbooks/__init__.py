@@ -0,0 +1,3 @@
+from .engine import Playbook, PlaybookExecutor, load_playbooks, select_playbook
+
+__all__ = ["Playbook", "PlaybookExecutor", "load_playbooks", "select_playbook"]
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+
+from cyberdome.tools.response_actions import RESPONSE_ACTIONS
+
+DEFAULT_PLAYBOOK_PATH = os.path.join(os.path.dirname(__file__), "containment.json")
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+NOT_APPLICABLE = "not_applicable"  # the incident has no value for the step's target
+BLOCKED = "blocked"  # a dependency failed or timed out
+_SATISFIED = (SUCCEEDED, NOT_APPLICABLE)
+
+
+class Playbook:
+    # A declarative playbook compiled into a step DAG. Steps name an action from
+    # RESPONSE_ACTIONS, an optional target field of the incident context, the steps they
+    # run "after", a timeout and params. Raises ValueError for unknown actions or
+    # dependencies and for cycles.
+    def __init__(self, spec, actions=RESPONSE_ACTIONS):
+        self.name = spec["name"]
+        self.description = spec.get("description", "")
+        self.match = spec.get("match", {})
+        self.steps = {}
+        for step in spec["steps"]:
+            if step["id"] in self.steps:
+                raise ValueError(f"Playbook '{self.name}': duplicate step '{step['id']}'")
+            if step["action"] not in actions:
+                raise ValueError(f"Playbook '{self.name}': unknown action '{step['action']}'")
+            self.steps[step["id"]] = {
+                "id": step["id"],
+                "action": step["action"],
+                "target": step.get("target"),
+                "after": tuple(step.get("after", ())),
+                "timeout_seconds": step.get("timeout_seconds"),
+                "params": dict(step.get("params", {})),
+            }
+        for step in self.steps.values():
+            for dependency in step["after"]:
+                if dependency not in self.steps:
+                    raise ValueError(f"Playbook '{self.name}': step '{step['id']}' depends on unknown step '{dependency}'")
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        remaining = {step_id: set(step["after"]) for step_id, step in self.steps.items()}
+        order = []
+        while remaining:
+            ready = [step_id for step_id, dependencies in remaining.items() if not dependencies]
+            if not ready:
+                raise ValueError(f"Playbook '{self.name}': steps {sorted(remaining)} form a cycle")
+            for step_id in ready:
+                del remaining[step_id]
+                order.append(step_id)
+            for dependencies in remaining.values():
+                dependencies.difference_update(ready)
+        return order
+
+    def matches(self, context):
+        severities = self.match.get("severities")
+        if severities is not None and context.get("severity") not in severities:
+            return False
+        kill_chain = self.match.get("kill_chain")
+        if kill_chain is not None and bool(context.get("kill_chain")) != kill_chain:
+            return False
+        return True
+
+
+@lru_cache(maxsize=32)
+def _load_playbooks(path, modified_ns):
+    with open(path) as handle:
+        specs = json.load(handle)["playbooks"]
+    return tuple(Playbook(spec) for spec in specs)
+
+
+def load_playbooks(path=DEFAULT_PLAYBOOK_PATH):
+    # Parsed and compiled once per file version; later calls only stat the file
+    path = os.path.abspath(path)
+    return _load_playbooks(path, os.stat(path).st_mtime_ns)
+
+
+def select_playbook(context, playbooks=None):
+    # First playbook whose match clause fits the incident, in file order
+    for playbook in playbooks if playbooks is not None else load_playbooks():
+        if playbook.matches(context):
+            return playbook
+    return None
+
+
+def critical_path(playbook, step_results):
+    # Longest chain of measured step latencies through the DAG -> (step ids, seconds)
+    finish, previous = {}, {}
+    for step_id in playbook.order:
+        latency = step_results[step_id].get("latency_seconds", 0.0)
+        before = max(playbook.steps[step_id]["after"], key=lambda dependency: finish[dependency], default=None)
+        finish[step_id] = latency + (finish[before] if before is not None else 0.0)
+        previous[step_id] = before
+    if not finish:
+        return [], 0.0
+    step_id = max(finish, key=finish.get)
+    seconds = finish[step_id]
+    path = []
+    while step_id is not None:
+        path.append(step_id)
+        step_id = previous[step_id]
+    return path[::-1], seconds
+
+
+class PlaybookExecutor:
+    # Runs compiled playbooks on asyncio. A step starts as soon as every step it runs
+    # after has succeeded (or did not apply), so independent steps run concurrently; each
+    # step is bounded by its timeout_seconds (default_timeout_seconds otherwise). Steps
+    # downstream of a failure or timeout are marked blocked and never run.
+    def __init__(self, actions=RESPONSE_ACTIONS, default_timeout_seconds=5.0, agent_name="Containment Agent"):
+        self.actions = actions
+        self.default_timeout_seconds = default_timeout_seconds
+        self.agent_name = agent_name
+
+    async def _run_step(self, step, target, context):
+        timeout = step["timeout_seconds"] or self.default_timeout_seconds
+        started = time.perf_counter()
+        try:
+            output = await asyncio.wait_for(
+                self.actions[step["action"]](target, context, agent_name=self.agent_name, **step["params"]), timeout)
+            status, error = SUCCEEDED, None
+        except asyncio.TimeoutError:
+            output, status, error = None, TIMED_OUT, f"timed out after {timeout}s"
+        except Exception as exc:
+            output, status, error = None, FAILED, f"{type(exc).__name__}: {exc}"
+        result = {"action": step["action"], "target": target, "status": status,
+                  "latency_seconds": time.perf_counter() - started, "output": output}
+        if error:
+            result["error"] = error
+        return result
+
+    async def run(self, playbook, context):
+        # -> {"playbook", "steps": {step id: result}, "wall_seconds", "critical_path",
+        #     "critical_path_seconds", "serial_seconds"}
+        started = time.perf_counter()
+        results, running = {}, {}
+
+        def launch_ready():
+            for step_id in playbook.order:
+                if step_id in results or step_id in running.values():
+                    continue
+                step = playbook.steps[step_id]
+                if any(dependency not in results for dependency in step["after"]):
+                    continue
+                if any(results[dependency]["status"] not in _SATISFIED for dependency in step["after"]):
+                    results[step_id] = {"action": step["action"], "status": BLOCKED, "latency_seconds": 0.0}
+                    continue
+                target = context.get(step["target"]) if step["target"] else None
+                if step["target"] and target is None:
+                    results[step_id] = {"action": step["action"], "status": NOT_APPLICABLE, "latency_seconds": 0.0}
+                    continue
+                running[asyncio.ensure_future(self._run_step(step, target, context))] = step_id
+
+        while True:
+            resolved = len(results)
+            launch_ready()
+            if not running:
+                if len(results) == resolved:  # nothing newly blocked or skipped either
+                    break
+                continue
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                results[running.pop(task)] = task.result()
+
+        path, path_seconds = critical_path(playbook, results)
+        return {
+            "playbook": playbook.name,
+            "steps": results,
+            "wall_seconds": time.perf_counter() - started,
+            "critical_path": path,
+            "critical_path_seconds": path_seconds,
+            "serial_seconds": sum(result["latency_seconds"] for result in results.values()),
+        }
+
+    async def run_many(self, runs):
+        # runs: [(playbook, context)]; every incident's playbook runs concurrently
+        return await asyncio.gather(*(self.run(playbook, context) for playbook, context in runs))
+
+    def run_blocking(self, runs):
+        # For synchronous callers (graph nodes). Uses a private event loop, in a helper
+        # thread if this thread already runs one.
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.run_many(runs))
+        outcome = {}
+
+        def run_in_thread():
+            try:
+                outcome["result"] = asyncio.run(self.run_many(runs))
+            except BaseException as exc:
+                outcome["error"] = exc
+
+        thread = threading.Thread(target=run_in_thread)
+        thread.start()
+        thread.join()
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+
+if __name__ == "__main__":
+    # Wall-clock time per batch of incidents: steps one at a time versus the DAG executor
+    import contextlib
+    import io
+    import random
+
+    random.seed(3)
+    incidents = [{
+        "endpoint_id": f"10.0.{i // 250}.{i % 250}",
+        "source_ip": f"10.0.{i // 250}.{i % 250}",
+        "user_id": random.choice(["asmith", "bjones", None]),
+        "severity": random.choice(["Critical", "High", "Medium"]),
+        "kill_chain": random.random() < 0.3,
+        "exploit_id": f"exploit-{i}",
+        "reason": "benchmark",
+    } for i in range(200)]
+    executor = PlaybookExecutor()
+    runs = [(select_playbook(incident), incident) for incident in incidents]
+
+    async def one_step_at_a_time():
+        for playbook, incident in runs:
+            for step_id in playbook.order:
+                step = playbook.steps[step_id]
+                target = incident.get(step["target"]) if step["target"] else None
+                if not step["target"] or target is not None:
+                    await executor._run_step(step, target, incident)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        asyncio.run(one_step_at_a_time())
+        serial = time.perf_counter() - started
+        started = time.perf_counter()
+        results = executor.run_blocking(runs)
+        concurrent = time.perf_counter() - started
+    paths = sorted(result["critical_path_seconds"] for result in results)
+    print(f"{len(runs)} incidents: {serial:.2f}s one step at a time, {concurrent:.2f}s on the DAG executor")
+    print(f"per incident: critical path p50 {paths[len(paths) // 2] * 1000:.0f} ms, max {paths[-1] * 1000:.0f} ms; "
+          f"mean serial step time {sum(result['serial_seconds'] for result in results) / len(results) * 1000:.0f} ms")
+    started = time.perf_counter()
+    for _ in range(1000):
+        load_playbooks()
+    print(f"load_playbooks() after the first parse: {(time.perf_counter() - started) * 1000:.1f} us per call")
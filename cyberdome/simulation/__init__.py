@@ -1,3 +1,4 @@
 from .ai_soc_coordinator import AISocCoordinationNode
+from .sharded_runner import ShardedSocRunner
 
-__all__ = ["AISocCoordinationNode"]
+__all__ = ["AISocCoordinationNode", "ShardedSocRunner"]
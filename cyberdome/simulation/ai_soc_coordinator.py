@@ -1,6 +1,9 @@
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableConfig
 from typing import TypedDict, Annotated, List, Optional
 import operator
+import time
+import uuid
 
 from cyberdome.agents import (
     ReconAgent,
@@ -8,48 +11,96 @@ from cyberdome.agents import (
     ContainmentAgent,
     IncidentNarratorAgent,
     HumanReviewBoardCrew,
-    ZeroTrustAgent # Add this
+    ZeroTrustAgent, # Add this
+    CampaignCorrelatorAgent,
 )
+from cyberdome.agents.incident_narrator_agent import IncidentAggregates
+from cyberdome.data.log_archive import open_log_archive, split_log_batch
+from cyberdome.tools.load_shedding import OverloadController
 
 # Define the state for our CyberDome graph
 class CyberDomeState(TypedDict):
     raw_network_traffic_data: Optional[list]
     raw_user_behavior_data: Optional[list]
+    # What the overload controller admitted from this batch (sample rate, records kept per feature)
+    load_shedding: Optional[dict]
+    # When load shedding admitted this batch; narration reports the batch latency to the controller
+    batch_started_at: Optional[float]
     detected_anomalies: Annotated[Optional[List[dict]], operator.add]
     classified_exploits: Annotated[Optional[List[dict]], operator.add]
     zero_trust_evaluations: Optional[List[dict]] # Add this
+    # Exploits linked by shared entities within a time window; review and containment act per campaign
+    campaigns: Optional[List[dict]]
     # Flag to determine if human review is needed for a specific action/exploit
     human_review_needed_for_critical_action: bool 
     # Stores the details of the action requiring review
     action_requiring_review: Optional[dict]
     human_review_decision: Optional[dict]
     containment_actions: Annotated[Optional[List[dict]], operator.add]
+    # Per-campaign containment plans from the correlation node; otherwise planned in the containment node
+    containment_plan: Optional[List[dict]]
     incident_summary: Optional[str]
+    # Running report aggregates (see IncidentAggregates), updated by each node as the graph progresses
+    incident_aggregates: Optional[dict]
     # Control flow:
     current_critical_exploit_index: Optional[int] # If we iterate through critical exploits for review
     processed_exploit_ids: List[str] # To avoid reprocessing
     # Add other state fields here if needed during evolution
 
 class AISocCoordinationNode:
-    def __init__(self):
+    def __init__(self, checkpointer=None, overload_controller=None):
         self.recon_agent = ReconAgent()
+        # Sheds routine traffic in front of recon when batches run slow or the ingest queue lags
+        self.overload_controller = overload_controller if overload_controller is not None else \
+            OverloadController(ioc_store=self.recon_agent.ioc_store)
         self.exploit_classifier_agent = ExploitClassifierAgent()
         self.containment_agent = ContainmentAgent()
         self.narrator_agent = IncidentNarratorAgent()
         self.human_review_board = HumanReviewBoardCrew()
         self.zero_trust_agent = ZeroTrustAgent() # Add this
+        self.campaign_correlator_agent = CampaignCorrelatorAgent()
 
         self.workflow = StateGraph(CyberDomeState)
         self._build_graph()
-        self.app = self.workflow.compile()
+        # Pass a checkpointer (e.g. tools.checkpointing.SqliteCheckpointSaver) to make runs durable/resumable
+        self.checkpointer = checkpointer
+        self.app = self.workflow.compile(checkpointer=checkpointer)
+
+    def scenario_agents(self):
+        # Fresh recon state (behavioral baselines, exfiltration windows, log join buffers),
+        # overload control (sample rate, new-source tracker) and review precedents for
+        # scenarios that share this compiled graph (tools.ScenarioRunner); the read-only IOC
+        # store is shared so feeds are not reloaded per scenario
+        return {"recon_agent": ReconAgent(ioc_store=self.recon_agent.ioc_store),
+                "overload_controller": self.overload_controller.fresh(),
+                "human_review_board": self.human_review_board.fresh()}
+
+    def _scenario_agent(self, config, name):
+        agents = ((config or {}).get("configurable") or {}).get("scenario_agents") or {}
+        return agents[name] if name in agents else getattr(self, name)
 
     # Agent Nodes
-    def _run_reconnaissance(self, state: CyberDomeState):
+    def _run_load_shedding(self, state: CyberDomeState, config: RunnableConfig):
+        print("\n--- Node: Load Shedding ---")
+        started = time.time()
+        network_data, user_data, report = self._scenario_agent(config, "overload_controller").admit(
+            state.get("raw_network_traffic_data"), state.get("raw_user_behavior_data"))
+        if report["sample_rate"] < 1.0:
+            print(f"Overloaded: sampling routine traffic at {report['sample_rate']:.0%}, admitted "
+                  f"{report['admitted']}/{report['offered']} records ({report['high_value']} high-value)")
+        aggregates = IncidentAggregates.from_dict(state.get("incident_aggregates"))
+        aggregates.add_load_shedding(report)
+        return {"raw_network_traffic_data": network_data, "raw_user_behavior_data": user_data,
+                "load_shedding": report, "batch_started_at": started, "incident_aggregates": aggregates.to_dict()}
+
+    def _run_reconnaissance(self, state: CyberDomeState, config: RunnableConfig):
         print("\n--- Node: Reconnaissance ---")
         network_data = state.get("raw_network_traffic_data", [])
         user_data = state.get("raw_user_behavior_data", [])
-        anomalies = self.recon_agent.run(network_traffic_data=network_data, user_behavior_data=user_data)
-        return {"detected_anomalies": anomalies, "processed_exploit_ids": []}
+        anomalies = self._scenario_agent(config, "recon_agent").run(network_traffic_data=network_data, user_behavior_data=user_data)
+        aggregates = IncidentAggregates.from_dict(state.get("incident_aggregates"))
+        aggregates.add_anomalies(anomalies)
+        return {"detected_anomalies": anomalies, "processed_exploit_ids": [], "incident_aggregates": aggregates.to_dict()}
 
     def _run_classification(self, state: CyberDomeState):
         print("\n--- Node: Exploit Classification ---")
@@ -58,7 +109,25 @@ class AISocCoordinationNode:
             print("No anomalies to classify.")
             return {"classified_exploits": []}
         classified = self.exploit_classifier_agent.run(anomalies)
-        return {"classified_exploits": classified}
+        aggregates = IncidentAggregates.from_dict(state.get("incident_aggregates"))
+        aggregates.add_exploits(classified)
+        return {"classified_exploits": classified, "incident_aggregates": aggregates.to_dict()}
+
+    def _run_correlation(self, state: CyberDomeState):
+        print("\n--- Node: Campaign Correlation ---")
+        exploits = state.get("classified_exploits")
+        if not exploits:
+            print("No classified exploits to correlate.")
+            return {"campaigns": []}
+        campaigns = self.campaign_correlator_agent.run(exploits, needs_review=self._exploit_needs_review)
+        # Containment is planned per campaign (one action per endpoint)
+        aggregates = IncidentAggregates.from_dict(state.get("incident_aggregates"))
+        aggregates.add_campaigns(campaigns)
+        return {
+            "campaigns": campaigns,
+            "containment_plan": self.containment_agent.plan_campaign_containment(campaigns, exploits),
+            "incident_aggregates": aggregates.to_dict(),
+        }
 
     def _run_containment(self, state: CyberDomeState):
         print("\n--- Node: Containment ---")
@@ -67,9 +136,20 @@ class AISocCoordinationNode:
             print("No classified exploits for containment.")
             return {"containment_actions": []}
         
+        human_decision_map = state.get("human_review_decision", {})
+        if state.get("containment_plan") is not None:
+            # Plans were made upstream (per campaign after correlation); only drop the ones whose review did not approve
+            approved_plan = [
+                plan for plan in state["containment_plan"]
+                if plan["exploit_id"] not in human_decision_map or human_decision_map[plan["exploit_id"]].get("decision") == "APPROVE"
+            ]
+            actions = self.containment_agent.execute_plan(approved_plan)
+            aggregates = IncidentAggregates.from_dict(state.get("incident_aggregates"))
+            aggregates.add_containment_actions(actions)
+            return {"containment_actions": actions, "incident_aggregates": aggregates.to_dict()}
+
         # Filter exploits: only act on approved or non-critical ones not needing review
         exploits_for_containment = []
-        human_decision_map = state.get("human_review_decision", {})
         
         for exploit in exploits:
             exploit_id = exploit.get("original_anomaly", {}).get("log", {}).get("event_id", str(exploit)) # simplified ID
@@ -86,14 +166,70 @@ class AISocCoordinationNode:
             return {"containment_actions": []}
 
         actions = self.containment_agent.run(exploits_for_containment)
-        return {"containment_actions": actions}
+        aggregates = IncidentAggregates.from_dict(state.get("incident_aggregates"))
+        aggregates.add_containment_actions(actions)
+        return {"containment_actions": actions, "incident_aggregates": aggregates.to_dict()}
 
-    def _run_narration(self, state: CyberDomeState):
+    def _run_narration(self, state: CyberDomeState, config: RunnableConfig):
         print("\n--- Node: Incident Narration ---")
-        summary = self.narrator_agent.run(state) # Narrator can access the whole state
+        summary = self.narrator_agent.run(state) # Narrator renders from state["incident_aggregates"]
+        # Last node: feed the batch latency back to the overload controller (for every run
+        # path, including ScenarioRunner batches)
+        if state.get("batch_started_at") is not None:
+            self._scenario_agent(config, "overload_controller").record_batch(
+                time.time() - state["batch_started_at"], (state.get("load_shedding") or {}).get("offered"))
         return {"incident_summary": summary}
 
+    def _run_zero_trust_check(self, state: CyberDomeState):
+        print("\n--- Node: Zero Trust Check ---")
+        user_data = state.get("raw_user_behavior_data") or []
+        evaluations = []
+        for log_entry in user_data:
+            resource_id = log_entry.get("resource_id")
+            if resource_id not in self.zero_trust_agent.rules:
+                continue
+            evaluations.append(self.zero_trust_agent.run({
+                "user_id": log_entry.get("user_id"),
+                "resource_id": resource_id,
+                "user_role": log_entry.get("user_role"),
+                "user_department": log_entry.get("user_department"),
+                "mfa_status": log_entry.get("mfa_status", "not_verified"),
+            }))
+        return {"zero_trust_evaluations": evaluations}
+
     # Human Review Nodes & Logic
+    @staticmethod
+    def _exploit_needs_review(exploit):
+        return exploit.get("severity") == "Critical" or \
+               (exploit.get("severity") == "High" and "sensitive_data" in str(exploit.get("original_anomaly"))) # Example criteria
+
+    @staticmethod
+    def _exploit_endpoint(exploit):
+        log = exploit.get("original_anomaly", {}).get("log") or {}
+        return log.get("source_ip") or log.get("user_id")
+
+    def _next_campaign_for_review(self, state: CyberDomeState):
+        processed_ids = state.get("processed_exploit_ids", [])
+        for campaign in state.get("campaigns") or []:
+            if campaign["requires_review"] and campaign["campaign_id"] not in processed_ids:
+                return campaign
+        return None
+
+    def _campaign_review_details(self, state: CyberDomeState, campaign):
+        exemplar = state.get("classified_exploits", [])[campaign["review_exploit_index"]]
+        return {
+            "action_summary": f"Contain correlated campaign ({campaign['size']} exploits): {exemplar.get('signature')}",
+            "details": f"Campaign: {campaign['campaign_id']}, Stages: {', '.join(campaign['stages'])}, "
+                       f"Entities: {campaign['entities']}, Signatures: {campaign['signatures']}, "
+                       f"Exemplar anomaly: {exemplar.get('original_anomaly')}",
+            "severity": campaign["severity"],
+            "exploit_id": campaign["campaign_id"], # Decisions are keyed by campaign, matching the campaign containment plan
+            # Structured fields for the review board's precedent matching
+            "action_type": "contain_campaign_multi_stage" if len(campaign["stages"]) > 1 else "contain_campaign",
+            "signature": exemplar.get("signature"),
+            "endpoint": self._exploit_endpoint(exemplar),
+        }
+
     def _prepare_for_human_review(self, state: CyberDomeState):
         print("\n--- Node: Prepare for Human Review ---")
         exploits = state.get("classified_exploits", [])
@@ -103,6 +239,13 @@ class AISocCoordinationNode:
         critical_action_details = None
         requires_policy_level_review = False
 
+        if state.get("campaigns") is not None:
+            # Correlated runs review one action per campaign instead of one per exploit
+            campaign = self._next_campaign_for_review(state)
+            if campaign:
+                critical_action_details = self._campaign_review_details(state, campaign)
+            exploits = []
+
         # Identify if any exploit requires review (e.g., critical severity AND specific patterns)
         # This is a simplified check. A real system might have more complex criteria.
         for exploit in exploits:
@@ -111,14 +254,16 @@ class AISocCoordinationNode:
             if exploit_id in processed_ids: # Skip if already processed (e.g. reviewed)
                 continue
 
-            if exploit.get("severity") == "Critical" or \
-               (exploit.get("severity") == "High" and "sensitive_data" in str(exploit.get("original_anomaly"))): # Example criteria
+            if self._exploit_needs_review(exploit):
                 
                 critical_action_details = {
                     "action_summary": f"Contain suspected critical exploit: {exploit.get('signature')}",
                     "details": f"Exploit: {exploit.get('signature')}, Anomaly: {exploit.get('original_anomaly')}",
                     "severity": exploit.get('severity'),
-                    "exploit_id": exploit_id # Important for mapping decision back
+                    "exploit_id": exploit_id, # Important for mapping decision back
+                    "action_type": "contain_exploit",
+                    "signature": exploit.get("signature"),
+                    "endpoint": self._exploit_endpoint(exploit),
                 }
                 # Example: certain actions always require top-level review
                 if "critical_asset_compromise" in exploit.get("signature", "").lower(): 
@@ -139,7 +284,7 @@ class AISocCoordinationNode:
                 "action_requiring_review": None
             }
 
-    def _request_human_review(self, state: CyberDomeState):
+    def _request_human_review(self, state: CyberDomeState, config: RunnableConfig):
         print("\n--- Node: Request Human Review ---")
         action_to_review = state.get("action_requiring_review")
         if not action_to_review:
@@ -149,7 +294,7 @@ class AISocCoordinationNode:
         # Determine if policy override level is needed (e.g. based on action_to_review details)
         policy_level = "critical_asset" in action_to_review.get('details','').lower() # Simplified
         
-        review_result = self.human_review_board.review_proposed_action(
+        review_result = self._scenario_agent(config, "human_review_board").review_proposed_action(
             action_to_review, 
             requires_policy_override=policy_level
         )
@@ -161,7 +306,9 @@ class AISocCoordinationNode:
         processed_ids = state.get("processed_exploit_ids", [])
         processed_ids.append(exploit_id_reviewed)
 
-        return {"human_review_decision": current_decisions, "processed_exploit_ids": processed_ids}
+        aggregates = IncidentAggregates.from_dict(state.get("incident_aggregates"))
+        aggregates.add_review(review_result)
+        return {"human_review_decision": current_decisions, "processed_exploit_ids": processed_ids, "incident_aggregates": aggregates.to_dict()}
 
 
     # Conditional Edges
@@ -190,13 +337,15 @@ class AISocCoordinationNode:
         processed_ids = state.get("processed_exploit_ids", [])
         
         next_action_to_review = None
+        if state.get("campaigns") is not None:
+            next_action_to_review = self._next_campaign_for_review(state)
+            exploits = []
         for exploit in exploits:
             exploit_id = exploit.get("original_anomaly", {}).get("log", {}).get("event_id", str(exploit))
             if exploit_id in processed_ids: # Skip if already processed/reviewed
                 continue
 
-            if exploit.get("severity") == "Critical" or \
-               (exploit.get("severity") == "High" and "sensitive_data" in str(exploit.get("original_anomaly"))):
+            if self._exploit_needs_review(exploit):
                 # Found another unreviewed critical exploit
                 next_action_to_review = exploit 
                 break
@@ -210,6 +359,7 @@ class AISocCoordinationNode:
 
 
     def _build_graph(self):
+        self.workflow.add_node("load_shedding", self._run_load_shedding)
         self.workflow.add_node("reconnaissance", self._run_reconnaissance)
         self.workflow.add_node("classification", self._run_classification)
         self.workflow.add_node("prepare_for_human_review", self._prepare_for_human_review)
@@ -217,11 +367,14 @@ class AISocCoordinationNode:
         self.workflow.add_node("containment", self._run_containment)
         self.workflow.add_node("narration", self._run_narration)
         self.workflow.add_node("zero_trust_check", self._run_zero_trust_check) # Add this
+        self.workflow.add_node("correlation", self._run_correlation)
 
-        self.workflow.set_entry_point("reconnaissance")
+        self.workflow.set_entry_point("load_shedding")
+        self.workflow.add_edge("load_shedding", "reconnaissance")
         self.workflow.add_edge("reconnaissance", "classification")
         
-        self.workflow.add_edge("classification", "zero_trust_check") # Modified Edge
+        self.workflow.add_edge("classification", "correlation")
+        self.workflow.add_edge("correlation", "zero_trust_check")
         self.workflow.add_edge("zero_trust_check", "prepare_for_human_review") # New Edge
 
         self.workflow.add_conditional_edges(
@@ -246,25 +399,89 @@ class AISocCoordinationNode:
         self.workflow.add_edge("containment", "narration")
         self.workflow.add_edge("narration", END)
 
-    def run_simulation(self, initial_traffic_data, initial_user_data):
-        inputs = {
+    def _run_config(self, thread_id):
+        if self.checkpointer is None:
+            return None
+        return {"configurable": {"thread_id": thread_id or str(uuid.uuid4())}}
+
+    def build_inputs(self, initial_traffic_data, initial_user_data):
+        return {
             "raw_network_traffic_data": initial_traffic_data,
             "raw_user_behavior_data": initial_user_data,
             "human_review_decision": {} # Initialize empty map for decisions
         }
+
+    def run_simulation(self, initial_traffic_data, initial_user_data, thread_id=None, durability=None,
+                       continue_stream=False):
+        # With a checkpointer, thread_id identifies the run for resume(); durability is LangGraph's
+        # checkpoint frequency knob ("sync" / "async" per superstep, "exit" only at the end).
+        # Each run joins flows and logins on its own unless continue_stream marks it as the
+        # next micro-batch of the same stream (run_archive, run_ingest).
+        if not continue_stream and self.recon_agent.log_join is not None:
+            self.recon_agent.log_join.reset()
+        inputs = self.build_inputs(initial_traffic_data, initial_user_data)
+        config = self._run_config(thread_id)
         print("\n--- Starting CyberDome AI SOC Simulation ---")
-        final_state = self.app.invoke(inputs)
+        if config:
+            print(f"Checkpointing under thread_id: {config['configurable']['thread_id']}")
+        final_state = self.app.invoke(inputs, config=config, durability=durability)
+        return self._report_final_state(final_state)
+
+    def resume(self, thread_id, durability=None):
+        # Continues a checkpointed run from the last completed node instead of starting over
+        if self.checkpointer is None:
+            raise ValueError("resume() requires the coordinator to be built with a checkpointer.")
+        print(f"\n--- Resuming CyberDome AI SOC Simulation (thread_id: {thread_id}) ---")
+        final_state = self.app.invoke(None, config={"configurable": {"thread_id": thread_id}}, durability=durability)
+        return self._report_final_state(final_state)
+
+    def _report_final_state(self, final_state):
         print("\n--- CyberDome AI SOC Simulation Complete ---")
         print("Final State:")
         # Pretty print important parts of the final state
         print(f"  Detected Anomalies: {len(final_state.get('detected_anomalies', []))}")
         print(f"  Classified Exploits: {len(final_state.get('classified_exploits', []))}")
+        print(f"  Correlated Campaigns: {len(final_state.get('campaigns') or [])}")
         print(f"  Containment Actions: {len(final_state.get('containment_actions', []))}")
+        shedding = final_state.get("load_shedding")
+        if shedding and shedding["sample_rate"] < 1.0:
+            print(f"  Load Shedding: {shedding['admitted']}/{shedding['offered']} records admitted "
+                  f"(routine sampled at {shedding['sample_rate']:.0%})")
         if final_state.get('human_review_decision'):
              print(f"  Human Review Decisions: {final_state.get('human_review_decision')}")
+        review_stats = self.human_review_board.review_stats()
+        if review_stats["reviews"]:
+            print(f"  Review Board: {review_stats['auto_decisions']}/{review_stats['reviews']} auto-decided from precedent "
+                  f"({review_stats['auto_decision_rate']:.0%}), ~{review_stats['latency_saved_seconds'] / 60:.0f} min reviewer time saved")
         print(f"  Incident Summary:\n{final_state.get('incident_summary', 'Not generated.')}")
         return final_state
 
+    def run_archive(self, archive_path, batch_size=1000, replay_speed=None):
+        # Replays a binary log archive (see cyberdome/data/log_archive.py) through the graph,
+        # one micro-batch per run. replay_speed=None replays as fast as possible.
+        archive = open_log_archive(archive_path)
+        print(f"\n--- Replaying {len(archive)} archived logs from {archive_path} ---")
+        final_states = []
+        for logs in archive.replay(batch_size=batch_size, speed=replay_speed):
+            network_traffic_data, user_behavior_data = split_log_batch(logs)
+            final_states.append(self.run_simulation(network_traffic_data, user_behavior_data,
+                                                    continue_stream=bool(final_states)))
+        return final_states
+
+    async def run_ingest(self, ingest_service, max_batches=None):
+        # Runs the graph on each micro-batch from a LogIngestService (see
+        # cyberdome/data/log_ingest.py) until the service is closed or max_batches have run.
+        # The batches still queued feed the overload controller's lag estimate.
+        batches_run = [0]
+
+        def pipeline(network_traffic_data, user_behavior_data):
+            self.overload_controller.record_backlog(ingest_service.queue.qsize() * ingest_service.batch_size)
+            batches_run[0] += 1
+            return self.run_simulation(network_traffic_data, user_behavior_data, continue_stream=batches_run[0] > 1)
+
+        return await ingest_service.feed(pipeline, max_batches=max_batches)
+
+
 if __name__ == '__main__':
     # Example Usage (for testing this module directly)
     coordinator = AISocCoordinationNode()
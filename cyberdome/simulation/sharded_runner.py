@@ -0,0 +1,266 @@
+import contextlib
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from langgraph.checkpoint.memory import InMemorySaver
+
+from cyberdome.agents import ReconAgent, ExploitClassifierAgent
+from cyberdome.agents.incident_narrator_agent import IncidentAggregates
+from cyberdome.data.log_archive import LOG_SCHEMA, open_log_archive, split_log_batch
+from cyberdome.tools.log_join import WindowedLogJoin, matches_to_anomalies
+from cyberdome.tools.sketches import hash64
+from tools.record_archive import StringDictionary, encode_records
+
+from .ai_soc_coordinator import AISocCoordinationNode
+
+
+def assign_shards(records, dictionaries, num_shards):
+    # Stable shard key per record: user_id for user activity (keeps each user's behavioral
+    # baseline in one shard), source_ip otherwise (keeps (source, destination) flow pairs
+    # together for the exfiltration detector). Hashing the strings rather than the codes
+    # makes the assignment independent of dictionary order.
+    def shard_table(field):
+        values = dictionaries[field].values
+        # The trailing 0 is selected by the MISSING (-1) code
+        return np.array([hash64(value) % num_shards for value in values] + [0], dtype=np.int64)
+
+    user_codes = records["user_id"]
+    return np.where(user_codes >= 0, shard_table("user_id")[user_codes], shard_table("source_ip")[records["source_ip"]])
+
+
+def join_candidate_rows(records, dictionaries, min_flow_bytes):
+    # Loose columnar prefilter for the network/user join (login-like user activity and large
+    # network flows); WindowedLogJoin applies its exact predicates to the decoded rows.
+    def code_mask(field, predicate):
+        return np.array([predicate(value) for value in dictionaries[field].values] + [False])[records[field]]
+
+    login_like = code_mask("action", lambda action: action.startswith("login") or action == "unusual_login_time")
+    login_like |= code_mask("details", lambda details: "working hours" in details.lower())
+    user_rows = code_mask("type", lambda log_type: log_type == "user_activity") & login_like
+    flow_rows = code_mask("type", lambda log_type: log_type == "network_traffic") & (records["payload_size_bytes"] >= min_flow_bytes)
+    return np.flatnonzero(flow_rows), np.flatnonzero(user_rows)
+
+
+def _process_shard(shard_id, records_bytes, dictionary_values, quiet=True):
+    # Runs recon and classification for one shard. Anomalies and exploits go back as tuples
+    # that reference shard-local record positions instead of carrying copies of the logs.
+    started = time.perf_counter()
+    records = np.frombuffer(records_bytes, dtype=LOG_SCHEMA.dtype)
+    dictionaries = {name: StringDictionary(values) for name, values in dictionary_values.items()}
+    logs = LOG_SCHEMA.decode(records, dictionaries)
+    positions = {id(log): position for position, log in enumerate(logs)}
+    network_traffic_data, user_behavior_data = split_log_batch(logs)
+
+    with open(os.devnull, "w") as sink, (contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext()):
+        # Shards split user and network logs by different keys, so the join runs in the parent
+        anomalies = ReconAgent(join_logs=False).run(network_traffic_data=network_traffic_data, user_behavior_data=user_behavior_data)
+        # ExploitRecords until packed below; nothing in the worker needs them as dicts
+        exploits = ExploitClassifierAgent().classify_records(anomalies) if anomalies else []
+
+    aggregates = IncidentAggregates()
+    aggregates.add_anomalies(anomalies)
+    aggregates.add_exploits(exploits)
+
+    packed_anomalies = []
+    for anomaly, exploit in zip(anomalies, exploits):
+        position = positions.get(id(anomaly["log"]), -1)
+        # Synthetic anomalies (e.g. windowed exfiltration alerts) have no source record and keep their log
+        meta = {key: value for key, value in anomaly.items() if key != "log" or position < 0}
+        packed_anomalies.append((position, meta, exploit["signature"], exploit["severity"],
+                                 exploit["kill_chain_interrupted_flag"], exploit.get("classification_details")))
+    return {
+        "shard_id": shard_id,
+        "records": len(records),
+        "anomalies": packed_anomalies,
+        "aggregates": aggregates.to_dict(),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def _process_archive_shard(shard_id, archive_path, indices_bytes, quiet=True):
+    # Archive variant: workers memory-map the archive themselves, so only the index list crosses processes
+    archive = open_log_archive(archive_path)
+    records = archive.records[np.frombuffer(indices_bytes, dtype=np.int64)]
+    values = {name: dictionary.values for name, dictionary in archive.dictionaries.items()}
+    return _process_shard(shard_id, np.ascontiguousarray(records).tobytes(), values, quiet)
+
+
+class ShardedSocRunner:
+    # Runs the CPU-heavy front of the SOC pipeline (recon -> classification) on a process
+    # pool, one task per shard, then merges the results in a deterministic order and hands
+    # them to the regular graph for correlation (which plans containment per campaign),
+    # zero-trust checks, human review, containment and narration.
+    def __init__(self, num_workers=None, num_shards=None, quiet_workers=True):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.num_shards = num_shards or self.num_workers
+        self.quiet_workers = quiet_workers
+        self.coordinator = AISocCoordinationNode(checkpointer=InMemorySaver())
+        self.log_join = WindowedLogJoin()
+        self._executor = None
+        self.last_timings = {}
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def run(self, logs):
+        # logs: mixed network_traffic / user_activity dicts, e.g. from LogGenerator.generate_mock_logs
+        started = time.perf_counter()
+        dictionaries = {name: StringDictionary() for name in LOG_SCHEMA.dictionary_fields}
+        records = encode_records(LOG_SCHEMA, logs, dictionaries)
+        shard_of = assign_shards(records, dictionaries, self.num_shards)
+        shard_indices = [np.flatnonzero(shard_of == shard_id) for shard_id in range(self.num_shards)]
+        dictionary_values = {name: dictionary.values for name, dictionary in dictionaries.items()}
+        encoded = time.perf_counter()
+
+        futures = [
+            self._pool().submit(_process_shard, shard_id, records[indices].tobytes(), dictionary_values, self.quiet_workers)
+            for shard_id, indices in enumerate(shard_indices) if len(indices)
+        ]
+        results = [future.result() for future in futures]
+        sharded = time.perf_counter()
+
+        flow_rows, login_rows = join_candidate_rows(records, dictionaries, self.log_join.min_flow_bytes)
+        joined = self._join([logs[i] for i in flow_rows], [logs[i] for i in login_rows])
+        user_behavior_data = [log for log in logs if log.get("type") == "user_activity"]
+        final_state = self._finish(results, shard_indices, logs.__getitem__, user_behavior_data, joined)
+        self._record_timings(started, encoded, sharded, results, len(logs))
+        return final_state
+
+    def run_archive(self, archive_path):
+        # Partitioning works on the memory-mapped code columns, so the parent never decodes the corpus
+        started = time.perf_counter()
+        archive = open_log_archive(archive_path)
+        shard_of = assign_shards(archive.records, archive.dictionaries, self.num_shards)
+        shard_indices = [np.flatnonzero(shard_of == shard_id) for shard_id in range(self.num_shards)]
+        encoded = time.perf_counter()
+
+        futures = [
+            self._pool().submit(_process_archive_shard, shard_id, archive_path, indices.astype(np.int64).tobytes(), self.quiet_workers)
+            for shard_id, indices in enumerate(shard_indices) if len(indices)
+        ]
+        results = [future.result() for future in futures]
+        sharded = time.perf_counter()
+
+        # Only decode what the tail of the graph needs: anomalous records and zero-trust resources
+        needed = sorted({int(shard_indices[result["shard_id"]][position])
+                         for result in results for position, *_ in result["anomalies"] if position >= 0})
+        decoded = dict(zip(needed, archive.decode(archive.records[needed]))) if needed else {}
+        zero_trust_codes = [archive.dictionaries["resource_id"].codes[resource]
+                            for resource in self.coordinator.zero_trust_agent.rules
+                            if resource in archive.dictionaries["resource_id"].codes]
+        zero_trust_rows = np.flatnonzero(np.isin(archive.records["resource_id"], zero_trust_codes))
+        user_behavior_data = archive.decode(archive.records[zero_trust_rows]) if len(zero_trust_rows) else []
+
+        flow_rows, login_rows = join_candidate_rows(archive.records, archive.dictionaries, self.log_join.min_flow_bytes)
+        joined = self._join(archive.decode(archive.records[flow_rows]), archive.decode(archive.records[login_rows]))
+        final_state = self._finish(results, shard_indices, decoded.__getitem__, user_behavior_data, joined)
+        self._record_timings(started, encoded, sharded, results, len(archive))
+        return final_state
+
+    def _join(self, traffic_logs, user_logs):
+        # Joined sequences are synthetic anomalies; classify them here so they merge like shard output
+        with open(os.devnull, "w") as sink, (contextlib.redirect_stdout(sink) if self.quiet_workers else contextlib.nullcontext()):
+            anomalies = matches_to_anomalies(self.log_join.process(traffic_logs, user_logs))
+            exploits = ExploitClassifierAgent().classify_records(anomalies) if anomalies else []
+        return list(zip(anomalies, exploits))
+
+    def _finish(self, results, shard_indices, resolve_log, user_behavior_data, joined=()):
+        merge_started = time.perf_counter()
+        # Deterministic merge: order by global record index (synthetic anomalies last, by event id),
+        # independent of which worker finished first
+        merged = []
+        aggregates = IncidentAggregates()
+        aggregates.add_anomalies([anomaly for anomaly, _ in joined])
+        aggregates.add_exploits([exploit for _, exploit in joined])
+        for anomaly, exploit in joined:
+            merged.append((None, anomaly, exploit["signature"], exploit["severity"],
+                           exploit["kill_chain_interrupted_flag"], exploit.get("classification_details")))
+        for result in sorted(results, key=lambda result: result["shard_id"]):
+            indices = shard_indices[result["shard_id"]]
+            for position, meta, signature, severity, kill_chain, details in result["anomalies"]:
+                global_index = int(indices[position]) if position >= 0 else None
+                merged.append((global_index, meta, signature, severity, kill_chain, details))
+            aggregates.merge(IncidentAggregates.from_dict(result["aggregates"]))
+        merged.sort(key=lambda item: (item[0] is None, item[0] if item[0] is not None else 0,
+                                      item[1].get("log", {}).get("event_id", "")))
+
+        detected_anomalies, classified_exploits = [], []
+        for global_index, meta, signature, severity, kill_chain, details in merged:
+            anomaly = dict(meta)
+            if global_index is not None:
+                anomaly["log"] = resolve_log(global_index)
+            detected_anomalies.append(anomaly)
+            classified_exploits.append({
+                "original_anomaly": anomaly,
+                "signature": signature,
+                "severity": severity,
+                "kill_chain_interrupted_flag": kill_chain,
+                "classification_details": details,
+            })
+        values = {
+            "raw_network_traffic_data": None,
+            "raw_user_behavior_data": user_behavior_data,
+            "detected_anomalies": detected_anomalies,
+            "classified_exploits": classified_exploits,
+            "incident_aggregates": aggregates.to_dict(),
+            "human_review_decision": {},
+            "processed_exploit_ids": [],
+        }
+        self.last_timings["merge_seconds"] = time.perf_counter() - merge_started
+
+        # Resume the regular graph right after classification with the merged state
+        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+        tail_started = time.perf_counter()
+        self.coordinator.app.update_state(config, values, as_node="classification")
+        final_state = self.coordinator.app.invoke(None, config=config, durability="exit")
+        self.last_timings["graph_tail_seconds"] = time.perf_counter() - tail_started
+        return final_state
+
+    def _record_timings(self, started, encoded, sharded, results, record_count):
+        self.last_timings.update({
+            "records": record_count,
+            "shards": len(results),
+            "workers": self.num_workers,
+            "partition_seconds": encoded - started,
+            "shard_phase_seconds": sharded - encoded,
+            "max_shard_seconds": max((result["seconds"] for result in results), default=0.0),
+            "total_seconds": time.perf_counter() - started,
+        })
+
+
+if __name__ == "__main__":
+    # Scaling benchmark: the same archived corpus processed with 1..16 workers
+    import io
+    import tempfile
+
+    from cyberdome.data import LogGenerator
+
+    num_logs = 200000
+    archive_path = os.path.join(tempfile.gettempdir(), "cyberdome_sharding_benchmark.gdarch")
+    LogGenerator().write_archive(archive_path, num_total_logs=num_logs)
+    print(f"cpu_count={os.cpu_count()}, corpus={num_logs} logs")
+    print(f"{'workers':>8} {'shard phase s':>14} {'total s':>9} {'speedup':>8} {'anomalies':>10}")
+    baseline_seconds = None
+    for workers in (1, 2, 4, 8, 16):
+        with ShardedSocRunner(num_workers=workers) as runner, contextlib.redirect_stdout(io.StringIO()):
+            final_state = runner.run_archive(archive_path)
+        timings = runner.last_timings
+        baseline_seconds = baseline_seconds or timings["shard_phase_seconds"]
+        print(f"{workers:>8} {timings['shard_phase_seconds']:>14.2f} {timings['total_seconds']:>9.2f} "
+              f"{baseline_seconds / timings['shard_phase_seconds']:>7.2f}x {len(final_state['detected_anomalies']):>10}")
@@ -0,0 +1,8 @@
+from .sketches import SpaceSaving, CountMinSketch, HyperLogLog
+from .behavior_baseline import BehavioralBaseline
+from .precedent_store import AutoDecisionPolicy, PrecedentStore
+from .response_actions import RESPONSE_ACTIONS
+from .load_shedding import OverloadController
+
+__all__ = ["SpaceSaving", "CountMinSketch", "HyperLogLog", "BehavioralBaseline", "AutoDecisionPolicy", "PrecedentStore", "RESPONSE_ACTIONS",
+           "OverloadController"]
@@ -0,0 +1,140 @@
+import math
+
+from cyberdome.tools.event_time import event_epoch_seconds
+from cyberdome.tools.sketches import CountMinSketch, HyperLogLog
+
+
+class BehavioralBaseline:
+    # Per-user behavioral baseline held entirely in fixed-size streaming sketches,
+    # so memory stays flat no matter how many users are observed:
+    #   - decayed event totals and login-hour histograms (count-min, keyed user / user+hour)
+    #   - resource-access frequency (count-min, keyed user+resource)
+    #   - source-IP novelty (count-min, keyed user+ip) and distinct IPs (HyperLogLog bank)
+    # Each event is scored against the baseline and then folded into it, O(1) per event.
+    FACTOR_WEIGHTS = {"login_hour": 0.45, "resource": 0.25, "source_ip": 0.30}
+
+    def __init__(self, width=2**16, depth=4, half_life_days=7.0, hll_sketches=2**15, hll_precision=5,
+                 min_history=20, anomaly_threshold=0.6):
+        half_life_seconds = half_life_days * 86400
+        self.user_totals = CountMinSketch(width, depth, half_life_seconds)
+        self.login_hours = CountMinSketch(width, depth, half_life_seconds)
+        self.resource_access = CountMinSketch(width, depth, half_life_seconds)
+        self.source_ips = CountMinSketch(width, depth, half_life_seconds)
+        self.distinct_ips = HyperLogLog(precision=hll_precision, num_sketches=hll_sketches)
+        self.min_history = min_history
+        self.anomaly_threshold = anomaly_threshold
+        self.events_observed = 0
+
+    def _sketch_keys(self, log_entry, timestamp):
+        # Hash every sketch key once per event; score() and update() share the indexes
+        user_id = log_entry["user_id"]
+        keys = {"user": self.user_totals.indexes(user_id)}
+        if timestamp is not None and str(log_entry.get("action", "")).startswith("login"):
+            hour = int(timestamp // 3600) % 24
+            keys["login_hour"] = self.login_hours.indexes(f"{user_id}\x1f{hour}")
+        resource_id = log_entry.get("resource_id")
+        if resource_id:
+            keys["resource"] = self.resource_access.indexes(f"{user_id}\x1f{resource_id}")
+        source_ip = log_entry.get("source_ip")
+        if source_ip:
+            keys["source_ip"] = self.source_ips.indexes(f"{user_id}\x1f{source_ip}")
+            keys["ip_sketch"] = self.distinct_ips.sketch_index(user_id)
+        return keys
+
+    def score(self, log_entry, timestamp=None, keys=None):
+        if log_entry.get("user_id") is None:
+            return {"score": 0.0, "factors": {}, "learning": True}
+        if timestamp is None:
+            timestamp = event_epoch_seconds(log_entry)
+        if keys is None:
+            keys = self._sketch_keys(log_entry, timestamp)
+        total = self.user_totals.estimate(None, timestamp, keys["user"])
+        if total < self.min_history:
+            return {"score": 0.0, "factors": {}, "learning": True}
+
+        factors = {}
+        if "login_hour" in keys:
+            hour_share = self.login_hours.estimate(None, timestamp, keys["login_hour"]) / total
+            # 0 when this hour is at least as common as a uniform spread would make it
+            factors["login_hour"] = max(0.0, 1.0 - hour_share * 24)
+        if "resource" in keys:
+            seen = self.resource_access.estimate(None, timestamp, keys["resource"])
+            factors["resource"] = 1.0 / (1.0 + seen)
+        if "source_ip" in keys:
+            seen = self.source_ips.estimate(None, timestamp, keys["source_ip"])
+            if seen < 0.5:
+                # A new IP is less surprising for users who already roam across many
+                distinct = self.distinct_ips.estimate(keys["ip_sketch"])
+                factors["source_ip"] = 1.0 / (1.0 + math.log1p(distinct))
+            else:
+                factors["source_ip"] = 0.0
+
+        if not factors:
+            return {"score": 0.0, "factors": factors, "learning": False}
+        weight_sum = sum(self.FACTOR_WEIGHTS[name] for name in factors)
+        score = sum(self.FACTOR_WEIGHTS[name] * value for name, value in factors.items()) / weight_sum
+        return {"score": round(score, 4), "factors": factors, "learning": False}
+
+    def update(self, log_entry, timestamp=None, keys=None):
+        if log_entry.get("user_id") is None:
+            return
+        if timestamp is None:
+            timestamp = event_epoch_seconds(log_entry)
+        if keys is None:
+            keys = self._sketch_keys(log_entry, timestamp)
+        self.events_observed += 1
+        self.user_totals.add(None, timestamp=timestamp, indexes=keys["user"])
+        if "login_hour" in keys:
+            self.login_hours.add(None, timestamp=timestamp, indexes=keys["login_hour"])
+        if "resource" in keys:
+            self.resource_access.add(None, timestamp=timestamp, indexes=keys["resource"])
+        if "source_ip" in keys:
+            self.source_ips.add(None, timestamp=timestamp, indexes=keys["source_ip"])
+            self.distinct_ips.add(log_entry["source_ip"], keys["ip_sketch"])
+
+    def score_and_update(self, log_entry):
+        if log_entry.get("user_id") is None:
+            return {"score": 0.0, "factors": {}, "learning": True, "anomalous": False}
+        timestamp = event_epoch_seconds(log_entry)
+        keys = self._sketch_keys(log_entry, timestamp)
+        result = self.score(log_entry, timestamp, keys)
+        self.update(log_entry, timestamp, keys)
+        result["anomalous"] = result["score"] >= self.anomaly_threshold
+        return result
+
+    @property
+    def memory_bytes(self):
+        return (self.user_totals.memory_bytes + self.login_hours.memory_bytes + self.resource_access.memory_bytes
+                + self.source_ips.memory_bytes + self.distinct_ips.memory_bytes)
+
+
+if __name__ == "__main__":
+    # Benchmark: stream LogGenerator user activity through the baseline, spreading
+    # events across an increasing user population to show memory stays flat.
+    import time
+    import tracemalloc
+
+    from cyberdome.data import LogGenerator
+
+    generator = LogGenerator()
+    num_events = 200000
+    print(f"{'users':>10} {'events/s':>12} {'sketch MB':>10} {'traced peak MB':>15} {'flagged':>8}")
+    for num_users in (1000, 100000, 1000000):
+        logs = [generator.generate_user_activity_log() for _ in range(num_events)]
+        for i, log in enumerate(logs):
+            log["user_id"] = f"user_{(i * 7919) % num_users}"
+
+        baseline = BehavioralBaseline()
+        started = time.perf_counter()
+        flagged = sum(baseline.score_and_update(log)["anomalous"] for log in logs)
+        elapsed = time.perf_counter() - started
+
+        # Second pass under tracemalloc: sketch memory must not grow with the user population
+        tracemalloc.start()
+        traced = BehavioralBaseline()
+        for log in logs[:20000]:
+            traced.score_and_update(log)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{num_users:>10} {num_events / elapsed:>12,.0f} {baseline.memory_bytes / 2**20:>10.1f} "
+              f"{peak / 2**20:>15.1f} {flagged:>8}")
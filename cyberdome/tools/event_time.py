@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Integer event time attached to each log at ingestion, so downstream stages
+# (baseline, exfiltration windows, joins, correlation) never re-parse ISO strings.
+EPOCH_FIELD = "timestamp_epoch_ms"
+NO_TIME = np.iinfo(np.int64).min
+
+
+def parse_timestamp_ms(timestamp):
+    # ISO-8601 strings (naive values are UTC, "Z" accepted) or numeric epoch seconds
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp * 1000)
+    if not timestamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def stamp_event_times(logs):
+    # Parses each log's timestamp once -> (logs, event times as an int64 column, NO_TIME
+    # where the timestamp is missing or invalid). Logs that gain EPOCH_FIELD are returned
+    # as copies, so the caller's logs are never modified; already stamped logs pass through.
+    column = np.full(len(logs), NO_TIME, dtype=np.int64)
+    stamped = list(logs)
+    for i, log_entry in enumerate(stamped):
+        epoch_ms = log_entry.get(EPOCH_FIELD)
+        if epoch_ms is None:
+            epoch_ms = parse_timestamp_ms(log_entry.get("timestamp"))
+            if epoch_ms is None:
+                continue
+            stamped[i] = dict(log_entry, **{EPOCH_FIELD: epoch_ms})
+        column[i] = epoch_ms
+    return stamped, column
+
+
+def event_epoch_seconds(log_entry):
+    epoch_ms = log_entry.get(EPOCH_FIELD)
+    if epoch_ms is not None:
+        return epoch_ms / 1000.0
+    epoch_ms = parse_timestamp_ms(log_entry.get("timestamp"))
+    return None if epoch_ms is None else epoch_ms / 1000.0
@@ -0,0 +1,191 @@
+import random
+import threading
+
+# Admission control in front of reconnaissance. Every record that carries a high-value
+# feature is kept; the rest ("routine" traffic) is sampled at a rate the controller
+# adjusts additively-up / multiplicatively-down from the latency of recent batches and
+# the estimated lag of the ingest queue. A kept routine record is passed on as a copy
+# stamped with sample_weight = 1 / rate (the caller's dicts are left untouched), so
+# downstream counts (IncidentAggregates) and exfiltration byte volumes can be scaled back
+# up to estimates for the full stream.
+
+PRIVILEGED_ACTIONS = frozenset({"privilege_escalation_attempt", "role_change", "sudo", "admin_login"})
+PRIVILEGED_RESOURCE_MARKERS = ("admin", "root", "critical_asset", "finances", "restricted")
+# The rule-based checks ReconAgent applies per record; records they would flag are never sampled out
+RECON_PAYLOAD_MARKERS = ("suspicious_pattern",)
+RECON_ACTIONS = frozenset({"unusual_login_time"})
+# Exfiltration windows sum bytes per flow, so large transfers are always kept
+LARGE_TRANSFER_BYTES = 50000
+
+
+class OverloadController:
+    def __init__(self, ioc_store=None, target_batch_seconds=1.0, max_lag_seconds=5.0, min_sample_rate=0.02,
+                 increase_step=0.05, decrease_factor=0.5, max_tracked_sources=100000, seed=None):
+        self.ioc_store = ioc_store
+        self.target_batch_seconds = target_batch_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.min_sample_rate = min_sample_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.max_tracked_sources = max_tracked_sources
+        self.sample_rate = 1.0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sources = {}  # source_ip -> None, insertion ordered; oldest evicted first
+        self._records_per_second = None
+        self.last_batch_seconds = 0.0
+        self.last_lag_seconds = 0.0
+        self.adjustments = 0
+
+    def fresh(self):
+        # Same settings and IOC store, fresh control and new-source state (one per scenario)
+        return OverloadController(self.ioc_store, self.target_batch_seconds, self.max_lag_seconds, self.min_sample_rate,
+                                  self.increase_step, self.decrease_factor, self.max_tracked_sources)
+
+    # ---- control loop ----
+
+    def record_batch(self, batch_seconds, records=None):
+        # Feed back how long the pipeline took for the last admitted batch
+        with self._lock:
+            self.last_batch_seconds = batch_seconds
+            if records and batch_seconds > 0:
+                rate = records / batch_seconds
+                self._records_per_second = rate if self._records_per_second is None else \
+                    0.8 * self._records_per_second + 0.2 * rate
+            self._adjust()
+
+    def record_backlog(self, queued_records):
+        # Queue lag: how long the records waiting in front of the pipeline will take to drain
+        with self._lock:
+            if self._records_per_second:
+                self.last_lag_seconds = queued_records / self._records_per_second
+            self._adjust()
+
+    @property
+    def overloaded(self):
+        return self.last_batch_seconds > self.target_batch_seconds or self.last_lag_seconds > self.max_lag_seconds
+
+    def _adjust(self):
+        if self.overloaded:
+            rate = max(self.min_sample_rate, self.sample_rate * self.decrease_factor)
+        else:
+            rate = min(1.0, self.sample_rate + self.increase_step)
+        self.adjustments += rate != self.sample_rate
+        self.sample_rate = rate
+
+    # ---- admission ----
+
+    def _new_source(self, source_ip):
+        if not source_ip or source_ip in self._sources:
+            return False
+        self._sources[source_ip] = None
+        if len(self._sources) > self.max_tracked_sources:
+            del self._sources[next(iter(self._sources))]
+        return True
+
+    @staticmethod
+    def high_value_feature(log_entry):
+        # -> the name of the first high-value feature the record has, or None (IOC and
+        # new-source checks need controller state and are done in admit())
+        action = log_entry.get("action")
+        if action in PRIVILEGED_ACTIONS:
+            return "privileged_action"
+        resource = str(log_entry.get("resource_id") or log_entry.get("target_resource") or "").lower()
+        if resource and any(marker in resource for marker in PRIVILEGED_RESOURCE_MARKERS):
+            return "privileged_resource"
+        if action in RECON_ACTIONS or log_entry.get("resource_access") == "restricted_sensitive_data":
+            return "recon_rule"
+        payload = str(log_entry.get("payload") or "").lower()
+        if payload and any(marker in payload for marker in RECON_PAYLOAD_MARKERS):
+            return "recon_rule"
+        if (log_entry.get("payload_size_bytes") or 0) >= LARGE_TRANSFER_BYTES:
+            return "large_transfer"
+        return None
+
+    def admit(self, network_logs, user_logs):
+        # -> (kept network logs, kept user logs, report). At sample rate 1 everything is kept
+        # and only the source tracker is updated.
+        network_logs, user_logs = network_logs or [], user_logs or []
+        with self._lock:
+            rate = self.sample_rate
+            new_sources = [self._new_source(log_entry.get("source_ip")) for log_entry in network_logs + user_logs]
+        report = {"sample_rate": rate, "offered": len(network_logs) + len(user_logs), "high_value": 0,
+                  "routine_offered": 0, "routine_kept": 0, "features": {}}
+        if rate >= 1.0:
+            report["admitted"] = report["offered"]
+            return network_logs, user_logs, report
+
+        ioc_positions = set()
+        if self.ioc_store is not None:
+            ioc_positions = {position for position, _ in self.ioc_store.index.match_logs(network_logs)}
+        weight = 1.0 / rate
+        features = report["features"]
+        kept = ([], [])
+        for target, logs, offset in ((kept[0], network_logs, 0), (kept[1], user_logs, len(network_logs))):
+            for index, log_entry in enumerate(logs):
+                feature = "known_ioc" if offset == 0 and index in ioc_positions else None
+                feature = feature or ("new_source" if new_sources[offset + index] else self.high_value_feature(log_entry))
+                if feature is not None:
+                    features[feature] = features.get(feature, 0) + 1
+                    target.append(log_entry)
+                    continue
+                report["routine_offered"] += 1
+                if self._rng.random() < rate:
+                    target.append(dict(log_entry, sample_weight=weight))
+                    report["routine_kept"] += 1
+        report["high_value"] = sum(features.values())
+        report["admitted"] = len(kept[0]) + len(kept[1])
+        return kept[0], kept[1], report
+
+    def snapshot(self):
+        return {
+            "sample_rate": self.sample_rate,
+            "overloaded": self.overloaded,
+            "last_batch_seconds": self.last_batch_seconds,
+            "last_lag_seconds": self.last_lag_seconds,
+            "records_per_second": self._records_per_second,
+            "adjustments": self.adjustments,
+            "tracked_sources": len(self._sources),
+        }
+
+
+if __name__ == "__main__":
+    # A log flood against the SOC graph: batches arrive faster than the graph can run them
+    # unshed. Prints per-batch latency and sample rate, and the narrator's estimated counts
+    # against what an unshed run of the same batches found.
+    import contextlib
+    import io
+    import time
+
+    from cyberdome.agents.incident_narrator_agent import IncidentAggregates
+    from cyberdome.data.log_archive import split_log_batch
+    from cyberdome.data.log_generator import LogGenerator
+    from cyberdome.simulation import AISocCoordinationNode
+
+    generator = LogGenerator()
+    batches = [split_log_batch(generator.generate_mock_logs(10000, 10000)) for _ in range(12)]
+
+    def run(target_batch_seconds):
+        controller = OverloadController(target_batch_seconds=target_batch_seconds, seed=3)
+        coordinator = AISocCoordinationNode(overload_controller=controller)
+        controller.ioc_store = coordinator.recon_agent.ioc_store
+        totals, rows = IncidentAggregates(), []
+        for network, user in batches:
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                final_state = coordinator.run_simulation(network, user)
+            totals.merge(IncidentAggregates.from_dict(final_state["incident_aggregates"]))
+            rows.append((time.perf_counter() - started, final_state["load_shedding"]))
+        return totals, rows
+
+    baseline, baseline_rows = run(float("inf"))
+    shed, shed_rows = run(0.5)
+    print(f"{'batch':>5} {'unshed s':>9} {'shed s':>7} {'rate':>6} {'admitted':>9} {'high-value':>10}")
+    for index, ((plain_seconds, _), (seconds, report)) in enumerate(zip(baseline_rows, shed_rows)):
+        print(f"{index:>5} {plain_seconds:>9.2f} {seconds:>7.2f} {report['sample_rate']:>6.0%} "
+              f"{report['admitted']:>9,} {report['high_value']:>10,}")
+    print(f"unshed: {baseline.anomaly_count} anomalies, {baseline.exploit_count} exploits in "
+          f"{sum(seconds for seconds, _ in baseline_rows):.1f}s")
+    print(f"shed:   {shed.anomaly_count} anomalies observed, ~{shed.estimated_anomaly_count:.0f} estimated; "
+          f"{shed.exploit_count} exploits observed, ~{shed.estimated_exploit_count:.0f} estimated in "
+          f"{sum(seconds for seconds, _ in shed_rows):.1f}s")
@@ -0,0 +1,121 @@
+import ipaddress
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+_COUNTS = re.compile(r"\(\d+ [a-z]+\)|\d+")
+
+
+@lru_cache(maxsize=4096)
+def endpoint_class(endpoint):
+    # Coarse class of the endpoint an action targets, so that precedents generalize across
+    # hosts of the same kind instead of matching one IP or user at a time
+    text = str(endpoint).strip().lower() if endpoint else ""
+    if not text:
+        return "unknown"
+    if "critical" in text:
+        return "critical_asset"
+    try:
+        address = ipaddress.ip_address(text.split()[0])
+    except ValueError:
+        if "vpn" in text:
+            return "remote_vpn"
+        if "remote" in text:
+            return "remote"
+        if "server" in text or "srv" in text:
+            return "server"
+        if text == "local":
+            return "internal_host"
+        return "user_account" if "." not in text else "named_host"
+    return "internal_host" if address.is_private or address.is_loopback else "external_host"
+
+
+def action_features(proposed_action, requires_policy_override=False):
+    # Feature key for a proposed action: what is being done, to what kind of endpoint, for
+    # which signature and severity. Counts in summaries ("(12 exploits)") are dropped so
+    # the same kind of action matches regardless of campaign size.
+    summary = proposed_action.get("action_summary") or ""
+    action_type = proposed_action.get("action_type") or _COUNTS.sub("#", summary.split(":")[0]).strip().lower()
+    signature = proposed_action.get("signature")
+    if signature is None and ":" in summary:
+        signature = summary.split(":", 1)[1].strip()
+    return (
+        action_type,
+        signature or "unknown",
+        proposed_action.get("severity") or "unknown",
+        endpoint_class(proposed_action.get("endpoint")),
+        bool(requires_policy_override),
+    )
+
+
+class AutoDecisionPolicy:
+    # Which precedents may be applied without a reviewer. By default only approvals are
+    # reused, never for actions that need the policy override agent, and a precedent must
+    # have been confirmed by min_confirmations consistent reviews.
+    def __init__(self, auto_decisions=("APPROVE",), severities=("Low", "Medium", "High", "Critical"),
+                 allow_policy_override=False, min_confirmations=1):
+        self.auto_decisions = set(auto_decisions)
+        self.severities = set(severities)
+        self.allow_policy_override = allow_policy_override
+        self.min_confirmations = min_confirmations
+
+    def permits(self, precedent, features):
+        _, _, severity, _, policy_override = features
+        if policy_override and not self.allow_policy_override:
+            return False
+        return precedent["decision"] in self.auto_decisions and severity in self.severities and \
+            precedent["confirmations"] >= self.min_confirmations
+
+
+class PrecedentStore:
+    # Prior review decisions keyed by action_features(), each valid for ttl_seconds after
+    # the review that last confirmed it. A review with a different decision replaces the
+    # precedent and resets its confirmations. Bounded to max_entries, least recently
+    # used first; safe to share between threads.
+    def __init__(self, ttl_seconds=1800.0, max_entries=10000, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self._precedents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._precedents)
+
+    def lookup(self, features):
+        with self._lock:
+            precedent = self._precedents.get(features)
+            if precedent is None:
+                return None
+            if precedent["expires_at"] <= self.clock():
+                del self._precedents[features]
+                return None
+            self._precedents.move_to_end(features)
+            return dict(precedent)
+
+    def record(self, features, review_result):
+        now = self.clock()
+        decision = review_result.get("decision")
+        with self._lock:
+            previous = self._precedents.pop(features, None)
+            confirmations = 1
+            if previous is not None and previous["decision"] == decision and previous["expires_at"] > now:
+                confirmations = previous["confirmations"] + 1
+            self._precedents[features] = {
+                "decision": decision,
+                "justification": review_result.get("justification"),
+                "reviewer_role": review_result.get("reviewer_role"),
+                "decided_at": now,
+                "expires_at": now + self.ttl_seconds,
+                "confirmations": confirmations,
+            }
+            while len(self._precedents) > self.max_entries:
+                self._precedents.popitem(last=False)
+
+    def purge_expired(self):
+        now = self.clock()
+        with self._lock:
+            for features in [key for key, precedent in self._precedents.items() if precedent["expires_at"] <= now]:
+                del self._precedents[features]
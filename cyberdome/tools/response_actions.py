@@ -0,0 +1,52 @@
+import asyncio
+
+# Simulated API round trip per action, standing in for EDR / firewall / IdP / notification calls
+SIMULATED_LATENCY_SECONDS = {
+    "isolate_endpoint": 0.05,
+    "block_ip": 0.02,
+    "disable_user": 0.03,
+    "snapshot_host": 0.08,
+    "notify": 0.01,
+}
+
+
+# Each action is a coroutine taking the step's target value, the incident context and the
+# step's params, and returning a result dict. They are placeholders for real API calls.
+
+async def isolate_endpoint(target, context, agent_name="Containment Agent", latency_seconds=None, **params):
+    print(f"[{agent_name}] SIMULATING: Isolating endpoint '{target}' due to: {context.get('reason')}.")
+    await asyncio.sleep(SIMULATED_LATENCY_SECONDS["isolate_endpoint"] if latency_seconds is None else latency_seconds)
+    return {"endpoint_id": target, "status": "isolated_simulated"}
+
+
+async def block_ip(target, context, agent_name="Containment Agent", latency_seconds=None, direction="both", **params):
+    print(f"[{agent_name}] SIMULATING: Blocking {direction} traffic for IP '{target}' at the perimeter firewall.")
+    await asyncio.sleep(SIMULATED_LATENCY_SECONDS["block_ip"] if latency_seconds is None else latency_seconds)
+    return {"ip": target, "status": "blocked_simulated", "direction": direction}
+
+
+async def disable_user(target, context, agent_name="Containment Agent", latency_seconds=None, **params):
+    print(f"[{agent_name}] SIMULATING: Disabling account '{target}' and revoking its sessions.")
+    await asyncio.sleep(SIMULATED_LATENCY_SECONDS["disable_user"] if latency_seconds is None else latency_seconds)
+    return {"user_id": target, "status": "disabled_simulated"}
+
+
+async def snapshot_host(target, context, agent_name="Containment Agent", latency_seconds=None, include_memory=True, **params):
+    print(f"[{agent_name}] SIMULATING: Capturing forensic snapshot of '{target}' (memory: {include_memory}).")
+    await asyncio.sleep(SIMULATED_LATENCY_SECONDS["snapshot_host"] if latency_seconds is None else latency_seconds)
+    return {"endpoint_id": target, "status": "snapshot_simulated", "include_memory": include_memory}
+
+
+async def notify(target, context, agent_name="Containment Agent", latency_seconds=None, channel="soc-alerts", **params):
+    print(f"[{agent_name}] SIMULATING: Notifying #{channel} about {context.get('exploit_id')} ({context.get('severity')}).")
+    await asyncio.sleep(SIMULATED_LATENCY_SECONDS["notify"] if latency_seconds is None else latency_seconds)
+    return {"channel": channel, "status": "notified_simulated"}
+
+
+RESPONSE_ACTIONS = {
+    "isolate_endpoint": isolate_endpoint,
+    "block_ip": block_ip,
+    "disable_user": disable_user,
+    "snapshot_host": snapshot_host,
+    "notify": notify,
+}
@@ -0,0 +1,208 @@
+import hashlib
+import heapq
+import math
+from array import array
+
+
+class SpaceSaving:
+    # Heavy-hitter sketch (Metwally et al.): tracks at most `capacity` items and
+    # guarantees that any item seen more than N / capacity times is retained.
+    # Each tracked item carries (count, error) where error bounds the overestimate.
+    def __init__(self, capacity=20):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        self._heap = []  # (count, item) entries, lazily invalidated
+
+    def add(self, item, weight=1):
+        self.total += weight
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+        else:
+            victim, victim_count = self._pop_min()
+            del self.counts[victim]
+            del self.errors[victim]
+            self.counts[item] = victim_count + weight
+            self.errors[item] = victim_count
+        heapq.heappush(self._heap, (self.counts[item], item))
+        if len(self._heap) > 4 * self.capacity + 64:
+            self._rebuild_heap()
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return item, count
+
+    def _rebuild_heap(self):
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def merge(self, other):
+        # Mergeable-summary combine: add counts/errors over the union of tracked items, then
+        # keep the `capacity` largest. Items missing from one side may be undercounted by at
+        # most that side's minimum count, which is folded into their error bound.
+        own_floor = min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+        other_floor = min(other.counts.values()) if len(other.counts) >= other.capacity else 0
+        counts, errors = {}, {}
+        for item in set(self.counts) | set(other.counts):
+            counts[item] = self.counts.get(item, own_floor) + other.counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, own_floor) + other.errors.get(item, other_floor)
+        kept = sorted(counts, key=lambda item: (-counts[item], str(item)))[:self.capacity]
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+        self.total += other.total
+        self._rebuild_heap()
+        return self
+
+    def top(self, n=None):
+        ranked = sorted(self.counts.items(), key=lambda kv: (-kv[1], str(kv[0])))
+        ranked = ranked[:n] if n is not None else ranked
+        return [(item, count, self.errors[item]) for item, count in ranked]
+
+    def __len__(self):
+        return len(self.counts)
+
+    def to_dict(self):
+        return {
+            "capacity": self.capacity,
+            "total": self.total,
+            "items": [[item, count, self.errors[item]] for item, count in self.counts.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(capacity=data.get("capacity", 20))
+        sketch.total = data.get("total", 0)
+        for item, count, error in data.get("items", []):
+            sketch.counts[item] = count
+            sketch.errors[item] = error
+        sketch._rebuild_heap()
+        return sketch
+
+
+def hash64(key):
+    # Stable 64-bit hash (Python's hash() is salted per process, which would make
+    # sketches non-reproducible across runs and workers).
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class CountMinSketch:
+    # Count-min sketch with optional exponential time decay. Decay uses forward
+    # decay: updates are weighted by exp(rate * (t - landmark)) and estimates are
+    # scaled back by the same factor, so aging is O(1) per event instead of
+    # touching every counter. The table is rescaled only when the weights would
+    # otherwise overflow.
+    RENORMALIZE_EXPONENT = 50.0
+
+    def __init__(self, width=2**16, depth=4, half_life_seconds=None):
+        self.width = width
+        self.depth = depth
+        self.table = array("d", bytes(8 * width * depth))
+        self.decay_rate = math.log(2) / half_life_seconds if half_life_seconds else 0.0
+        self.landmark = None
+        self._weight_timestamp = None
+        self._weight = 1.0
+
+    def indexes(self, key):
+        # Exposed so callers that both score and update a key hash it only once
+        h = hash64(key)
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def _forward_weight(self, timestamp):
+        if not self.decay_rate or timestamp is None:
+            return 1.0
+        if timestamp == self._weight_timestamp:
+            return self._weight
+        if self.landmark is None:
+            self.landmark = timestamp
+        exponent = self.decay_rate * (timestamp - self.landmark)
+        if exponent > self.RENORMALIZE_EXPONENT:
+            self._renormalize(timestamp)
+            exponent = 0.0
+        self._weight_timestamp = timestamp
+        self._weight = math.exp(exponent)
+        return self._weight
+
+    def _renormalize(self, timestamp):
+        factor = math.exp(-self.decay_rate * (timestamp - self.landmark))
+        table = self.table
+        for i in range(len(table)):
+            table[i] *= factor
+        self.landmark = timestamp
+        self._weight_timestamp = None
+
+    def add(self, key, weight=1.0, timestamp=None, indexes=None):
+        scaled = weight * self._forward_weight(timestamp)
+        table = self.table
+        for index in (indexes or self.indexes(key)):
+            table[index] += scaled
+
+    def estimate(self, key, timestamp=None, indexes=None):
+        table = self.table
+        raw = min([table[index] for index in (indexes or self.indexes(key))])
+        if not raw:
+            return 0.0
+        return raw / self._forward_weight(timestamp)
+
+    @property
+    def memory_bytes(self):
+        return self.table.itemsize * len(self.table)
+
+
+class HyperLogLog:
+    # A bank of `num_sketches` HyperLogLog sketches sharing one register array.
+    # Callers pick a sketch (e.g. by hashing a user id into the bank), which keeps
+    # memory fixed regardless of how many distinct keys use the bank; keys that
+    # collide on a sketch share it, so per-key estimates become upper bounds.
+    def __init__(self, precision=6, num_sketches=1):
+        self.precision = precision
+        self.m = 1 << precision
+        self.num_sketches = num_sketches
+        self.registers = bytearray(self.m * num_sketches)
+        if self.m == 16:
+            self.alpha = 0.673
+        elif self.m == 32:
+            self.alpha = 0.697
+        elif self.m == 64:
+            self.alpha = 0.709
+        else:
+            self.alpha = 0.7213 / (1 + 1.079 / self.m)
+
+    def sketch_index(self, owner):
+        return hash64(owner) % self.num_sketches
+
+    def add(self, value, sketch=0):
+        h = hash64(value)
+        remaining_bits = 64 - self.precision
+        register = h >> remaining_bits
+        remainder = h & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - remainder.bit_length() + 1
+        offset = sketch * self.m + register
+        if rank > self.registers[offset]:
+            self.registers[offset] = rank
+
+    def estimate(self, sketch=0):
+        start = sketch * self.m
+        registers = self.registers[start:start + self.m]
+        harmonic = sum(2.0 ** -r for r in registers)
+        raw = self.alpha * self.m * self.m / harmonic
+        zeros = registers.count(0)
+        if raw <= 2.5 * self.m and zeros:
+            return self.m * math.log(self.m / zeros)  # linear counting for small cardinalities
+        return raw
+
+    @property
+    def memory_bytes(self):
+        return len(self.registers)
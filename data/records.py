@@ -0,0 +1,160 @@
+import sys
+
+# Compact in-memory threat reports. A ThreatRecord holds the fields of a
+# SensorDataGenerator report in __slots__ instead of three nested dicts and a list;
+# categorical strings are interned and signature lists become shared tuples, so a
+# million reports from a handful of sources/regions hold one copy of each string.
+# Records read like the dicts (get, []), and to_dict() rebuilds the nested dict
+# wherever a plain dict is needed (graph state, JSON, checkpoints).
+
+_SIGNATURE_TUPLES = {}
+
+
+def intern_field(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def intern_signatures(signatures):
+    key = tuple(intern_field(signature) for signature in signatures or ())
+    return _SIGNATURE_TUPLES.setdefault(key, key)
+
+
+class ThreatRecord:
+    __slots__ = ("id", "category", "source", "timestamp", "region", "latitude", "longitude", "speed", "altitude",
+                 "signatures", "confidence", "trajectory_type", "estimated_impact_zone", "maneuvering_capability",
+                 "current_heading", "swarm_size", "primary_axis_of_advance")
+    _DETAIL_FIELDS = ("trajectory_type", "estimated_impact_zone", "maneuvering_capability", "current_heading",
+                      "swarm_size", "primary_axis_of_advance")
+    _KEYS = ("id", "category", "source", "timestamp", "location", "speed", "altitude", "signatures", "confidence",
+             "details")
+
+    def __init__(self, id, category, source=None, timestamp=None, region=None, latitude=None, longitude=None,
+                 speed=None, altitude=None, signatures=(), confidence=None, trajectory_type=None,
+                 estimated_impact_zone=None, maneuvering_capability=None, current_heading=None, swarm_size=None,
+                 primary_axis_of_advance=None):
+        self.id = id
+        self.category = intern_field(category)
+        self.source = intern_field(source)
+        self.timestamp = timestamp
+        self.region = intern_field(region)
+        self.latitude = latitude
+        self.longitude = longitude
+        self.speed = speed
+        self.altitude = altitude
+        self.signatures = intern_signatures(signatures)
+        self.confidence = confidence
+        self.trajectory_type = intern_field(trajectory_type)
+        self.estimated_impact_zone = intern_field(estimated_impact_zone)
+        self.maneuvering_capability = maneuvering_capability
+        self.current_heading = current_heading
+        self.swarm_size = swarm_size
+        self.primary_axis_of_advance = primary_axis_of_advance
+
+    @classmethod
+    def from_dict(cls, threat):
+        location = threat.get("location")
+        location = location if isinstance(location, dict) else {"region": location}
+        details = threat.get("details") or {}
+        return cls(
+            threat.get("id"), threat.get("category"), threat.get("source"), threat.get("timestamp"),
+            location.get("region"), location.get("latitude"), location.get("longitude"),
+            threat.get("speed"), threat.get("altitude"), threat.get("signatures"), threat.get("confidence"),
+            **{field: details.get(field) for field in cls._DETAIL_FIELDS},
+        )
+
+    def location(self):
+        location = {"region": self.region}
+        if self.latitude is not None:
+            location["latitude"] = self.latitude
+            location["longitude"] = self.longitude
+        return location
+
+    def details(self):
+        return {field: getattr(self, field) for field in self._DETAIL_FIELDS if getattr(self, field) is not None}
+
+    def __getitem__(self, key):
+        if key == "location":
+            return self.location()
+        if key == "details":
+            return self.details()
+        if key == "signatures":
+            return list(self.signatures)
+        if key in self._KEYS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            value = self[key]
+        except KeyError:
+            return default
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return key in self._KEYS
+
+    def keys(self):
+        return self._KEYS
+
+    def to_dict(self):
+        threat = {key: self[key] for key in self._KEYS if key != "details"}
+        details = self.details()
+        if details:
+            threat["details"] = details
+        return threat
+
+    def __eq__(self, other):
+        if not isinstance(other, ThreatRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return f"ThreatRecord({self.to_dict()!r})"
+
+
+def to_dicts(records):
+    # Graph-boundary conversion: records become plain dicts, anything else passes through
+    return [record.to_dict() if hasattr(record, "to_dict") else record for record in records]
+
+
+if __name__ == "__main__":
+    # Memory held by 1M threat reports: generator dicts versus ThreatRecords, built from
+    # the same JSON round trip so neither side benefits from the generator reusing its
+    # own string objects. Each variant is built in a forked child and measured as the
+    # child's resident-set growth.
+    import gc
+    import json
+    import multiprocessing
+    import os
+    import time
+
+    from data.sensor_data_generator import SensorDataGenerator
+
+    def resident_bytes():
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def measure(build, pool, count, results):
+        gc.collect()
+        before = resident_bytes()
+        started = time.perf_counter()
+        items = [build(json.loads(pool[i % len(pool)])) for i in range(count)]
+        elapsed = time.perf_counter() - started
+        gc.collect()
+        results.put((resident_bytes() - before, elapsed, len(items)))
+
+    count = 1000000
+    generator = SensorDataGenerator()
+    pool = [json.dumps(threat) for threat in generator.generate_multiple_threats(20000)]
+    sample = json.loads(pool[0])
+    assert ThreatRecord.from_dict(sample).to_dict() == sample
+
+    context = multiprocessing.get_context("fork")
+    for label, build in (("dicts", lambda threat: threat), ("ThreatRecord", ThreatRecord.from_dict)):
+        results = context.Queue()
+        child = context.Process(target=measure, args=(build, pool, count, results))
+        child.start()
+        grown, elapsed, built = results.get()
+        child.join()
+        print(f"{label:<14} {grown / 2 ** 20:8.1f} MiB for {built:,} reports ({grown / built:6.1f} B each), "
+              f"built in {elapsed:.1f}s")
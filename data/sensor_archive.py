@@ -0,0 +1,114 @@
+import math
+import uuid
+
+import numpy as np
+
+from tools.record_archive import MISSING, RecordArchive, RecordArchiveWriter, uuid_bytes
+
+
+class SensorRecordSchema:
+    # Fixed-width record for SensorDataGenerator threat reports. The nested
+    # location/details dicts are flattened into columns, categorical strings are
+    # int32 dictionary codes and the signature list is a bitmask over the
+    # "signatures" dictionary (up to 32 distinct signatures per archive), so
+    # signatures decode in dictionary order rather than report order.
+    name = "goldendome.sensor.v1"
+    time_field = "timestamp"
+    time_units_per_second = 1.0
+    dictionary_fields = ("id", "category", "source", "region", "signatures", "trajectory_type", "estimated_impact_zone")
+    dtype = np.dtype([
+        ("threat_uuid", "S16"), ("id", "<i4"), ("category", "<i4"), ("source", "<i4"), ("timestamp", "<f8"),
+        ("region", "<i4"), ("latitude", "<f8"), ("longitude", "<f8"),
+        ("speed", "<f8"), ("altitude", "<f8"), ("confidence", "<f8"), ("signature_mask", "<u4"),
+        ("trajectory_type", "<i4"), ("estimated_impact_zone", "<i4"), ("maneuvering_capability", "i1"),
+        ("current_heading", "<f8"), ("swarm_size", "<i4"), ("primary_axis_of_advance", "<f8"),
+    ])
+
+    def encode(self, threat, dictionaries):
+        threat_id = threat.get("id")
+        raw_uuid = uuid_bytes(threat_id)
+        location = threat.get("location") or {}
+        details = threat.get("details") or {}
+        signature_mask = 0
+        for signature in threat.get("signatures", []):
+            code = dictionaries["signatures"].encode(signature)
+            if code >= 32:
+                raise ValueError("Sensor archives support at most 32 distinct signatures.")
+            signature_mask |= 1 << code
+        maneuvering = details.get("maneuvering_capability")
+        return (
+            raw_uuid or b"",
+            MISSING if raw_uuid else dictionaries["id"].encode(threat_id),
+            dictionaries["category"].encode(threat.get("category")),
+            dictionaries["source"].encode(threat.get("source")),
+            threat.get("timestamp", math.nan),
+            dictionaries["region"].encode(location.get("region")),
+            location.get("latitude", math.nan),
+            location.get("longitude", math.nan),
+            threat.get("speed", math.nan),
+            threat.get("altitude", math.nan),
+            threat.get("confidence", math.nan),
+            signature_mask,
+            dictionaries["trajectory_type"].encode(details.get("trajectory_type")),
+            dictionaries["estimated_impact_zone"].encode(details.get("estimated_impact_zone")),
+            MISSING if maneuvering is None else int(maneuvering),
+            details.get("current_heading", math.nan),
+            details.get("swarm_size", MISSING),
+            details.get("primary_axis_of_advance", math.nan),
+        )
+
+    def decode(self, records, dictionaries):
+        columns = {name: records[name].tolist() for name in self.dtype.names}
+        for name in ("id", "category", "source", "region", "trajectory_type", "estimated_impact_zone"):
+            columns[name] = dictionaries[name].decode_column(records[name])
+        signature_names = dictionaries["signatures"].values
+
+        threats = []
+        for i in range(len(records)):
+            threat_id = columns["id"][i]
+            if threat_id is None:
+                threat_id = str(uuid.UUID(bytes=columns["threat_uuid"][i].ljust(16, b"\0")))
+            mask = columns["signature_mask"][i]
+            threat = {
+                "id": threat_id,
+                "category": columns["category"][i],
+                "source": columns["source"][i],
+                "timestamp": columns["timestamp"][i],
+                "location": {
+                    "region": columns["region"][i],
+                    "latitude": columns["latitude"][i],
+                    "longitude": columns["longitude"][i],
+                },
+                "speed": columns["speed"][i],
+                "altitude": columns["altitude"][i],
+                "signatures": [name for bit, name in enumerate(signature_names) if mask >> bit & 1],
+                "confidence": columns["confidence"][i],
+            }
+            details = {}
+            if columns["trajectory_type"][i] is not None:
+                details["trajectory_type"] = columns["trajectory_type"][i]
+            if columns["estimated_impact_zone"][i] is not None:
+                details["estimated_impact_zone"] = columns["estimated_impact_zone"][i]
+            if columns["maneuvering_capability"][i] != MISSING:
+                details["maneuvering_capability"] = bool(columns["maneuvering_capability"][i])
+            if not math.isnan(columns["current_heading"][i]):
+                details["current_heading"] = columns["current_heading"][i]
+            if columns["swarm_size"][i] != MISSING:
+                details["swarm_size"] = columns["swarm_size"][i]
+            if not math.isnan(columns["primary_axis_of_advance"][i]):
+                details["primary_axis_of_advance"] = columns["primary_axis_of_advance"][i]
+            if details:
+                threat["details"] = details
+            threats.append(threat)
+        return threats
+
+
+SENSOR_SCHEMA = SensorRecordSchema()
+
+
+def open_sensor_archive(path):
+    return RecordArchive(path, SENSOR_SCHEMA)
+
+
+def sensor_archive_writer(path, metadata=None):
+    return RecordArchiveWriter(path, SENSOR_SCHEMA, metadata=metadata)
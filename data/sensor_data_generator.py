@@ -1,8 +1,14 @@
 import json
+import math
 import random
 import time
 import uuid
 
+import numpy as np
+
+KM_PER_DEGREE_LATITUDE = 110.574
+KM_PER_DEGREE_LONGITUDE_AT_EQUATOR = 111.320
+
 class SensorDataGenerator:
     def __init__(self):
         self.threat_types = {
@@ -80,6 +86,99 @@ class SensorDataGenerator:
     def generate_multiple_threats(self, count=1):
         return [self.generate_random_threat() for _ in range(count)]
 
+    def generate_threat_records(self, count=1):
+        # Same reports as compact ThreatRecords (see records.py), for large raids held in memory
+        from .records import ThreatRecord
+
+        return [ThreatRecord.from_dict(self.generate_random_threat()) for _ in range(count)]
+
+    def expand_swarm_tracks(self, swarm_threat, origin=None, rng=None, formation_spread_km=0.15,
+                            straggler_fraction=0.1):
+        # Per-drone tracks for one swarm report: drones fly in 1-3 tight formations with a few
+        # stragglers, all moving along primary_axis_of_advance at the reported speed.
+        # Positions are east/north/up km from origin (defaults to the swarm's own location);
+        # see tracks_to_lat_lon for the inverse.
+        rng = rng or np.random.default_rng()
+        location = swarm_threat.get("location")
+        location = location if isinstance(location, dict) else {}
+        details = swarm_threat.get("details") or {}
+        size = int(details.get("swarm_size", 1))
+        latitude, longitude = location.get("latitude", 0.0), location.get("longitude", 0.0)
+        origin = origin or {"latitude": latitude, "longitude": longitude}
+        centre = np.array([
+            (longitude - origin["longitude"]) * KM_PER_DEGREE_LONGITUDE_AT_EQUATOR * math.cos(math.radians(origin["latitude"])),
+            (latitude - origin["latitude"]) * KM_PER_DEGREE_LATITUDE,
+            swarm_threat.get("altitude", 1.0),
+        ])
+        formations = centre + rng.uniform(-1.5, 1.5, size=(rng.integers(1, 4), 3)) * (1.0, 1.0, 0.1)
+        positions = formations[rng.integers(0, len(formations), size)] + rng.normal(0.0, formation_spread_km, (size, 3))
+        stragglers = rng.random(size) < straggler_fraction
+        positions[stragglers] = centre + rng.uniform(-5.0, 5.0, (int(stragglers.sum()), 3)) * (1.0, 1.0, 0.1)
+        positions[:, 2] = np.maximum(positions[:, 2], 0.05)
+
+        heading = math.radians(details.get("primary_axis_of_advance", 0.0))
+        speed_km_s = swarm_threat.get("speed", 100.0) / 3600.0
+        velocities = np.tile([speed_km_s * math.sin(heading), speed_km_s * math.cos(heading), 0.0], (size, 1))
+        velocities += rng.normal(0.0, speed_km_s * 0.05, (size, 3)) * (1.0, 1.0, 0.1)
+        return {
+            "origin": origin,
+            "positions": positions,
+            "velocities": velocities,
+            "swarm_index": np.zeros(size, dtype=np.int32),
+            "swarm_ids": [swarm_threat.get("id")],
+        }
+
+    def generate_drone_tracks(self, num_drones, seed=None, area_km=200.0):
+        # A tick's worth of drone tracks from as many swarms as needed, scattered over an
+        # area_km square around a common origin
+        rng = np.random.default_rng(seed)
+        origin = {"latitude": round(random.uniform(-60, 60), 6), "longitude": round(random.uniform(-180, 180), 6)}
+        parts, total = [], 0
+        while total < num_drones:
+            swarm = self.generate_drone_swarm_sighting()
+            swarm["details"]["swarm_size"] = min(swarm["details"]["swarm_size"], num_drones - total)
+            offset_km = rng.uniform(-area_km / 2, area_km / 2, 2)
+            swarm["location"]["latitude"] = origin["latitude"] + offset_km[1] / KM_PER_DEGREE_LATITUDE
+            swarm["location"]["longitude"] = origin["longitude"] + offset_km[0] / (
+                KM_PER_DEGREE_LONGITUDE_AT_EQUATOR * math.cos(math.radians(origin["latitude"])))
+            parts.append(self.expand_swarm_tracks(swarm, origin=origin, rng=rng))
+            total += swarm["details"]["swarm_size"]
+        return {
+            "origin": origin,
+            "positions": np.concatenate([part["positions"] for part in parts]),
+            "velocities": np.concatenate([part["velocities"] for part in parts]),
+            "swarm_index": np.concatenate([part["swarm_index"] + i for i, part in enumerate(parts)]).astype(np.int32),
+            "swarm_ids": [part["swarm_ids"][0] for part in parts],
+        }
+
+    @staticmethod
+    def advance_tracks(tracks, dt_seconds, rng=None, jitter_km=0.01):
+        # Moves every drone by its velocity plus a little random jitter; returns new tracks
+        rng = rng or np.random.default_rng()
+        positions = tracks["positions"] + tracks["velocities"] * dt_seconds
+        positions += rng.normal(0.0, jitter_km, positions.shape)
+        positions[:, 2] = np.maximum(positions[:, 2], 0.05)
+        return dict(tracks, positions=positions)
+
+    @staticmethod
+    def tracks_to_lat_lon(origin, east_km, north_km):
+        latitude = origin["latitude"] + np.asarray(north_km) / KM_PER_DEGREE_LATITUDE
+        longitude = origin["longitude"] + np.asarray(east_km) / (
+            KM_PER_DEGREE_LONGITUDE_AT_EQUATOR * math.cos(math.radians(origin["latitude"])))
+        return latitude, longitude
+
+    def write_archive(self, path, count=10000, batch_size=10000):
+        # Persists a reproducible raid in the binary sensor archive format (see sensor_archive.py)
+        from .sensor_archive import sensor_archive_writer
+
+        with sensor_archive_writer(path, metadata={"generator": "SensorDataGenerator"}) as writer:
+            remaining = count
+            while remaining > 0:
+                batch = min(batch_size, remaining)
+                writer.write(self.generate_multiple_threats(batch))
+                remaining -= batch
+        return writer.count
+
 
 if __name__ == "__main__":
     generator = SensorDataGenerator()
@@ -100,7 +199,6 @@ if __name__ == "__main__":
     mixed_threats = generator.generate_multiple_threats(3)
     print(json.dumps(mixed_threats, indent=2))
 
-    # Example of saving to a file
-    # with open("data/mock_sensor_feed.json", "w") as f:
-    #     json.dump(mixed_threats, f, indent=2)
-    # print("\nSaved mock_sensor_feed.json to data/ directory")
+    # Example of saving a binary archive for repeatable replay
+    # count = generator.write_archive("data/mock_sensor_feed.gdarch", count=100000)
+    # print(f"\nSaved {count} threats to data/mock_sensor_feed.gdarch")
@@ -0,0 +1,443 @@
+import asyncio
+import math
+import struct
+import time
+import uuid
+from collections import deque
+from collections.abc import Mapping
+
+import numpy as np
+
+# Wire format (little endian). A frame is a fixed header followed by record_count
+# fixed-width records of FRAME_RECORD_DTYPE:
+#   magic "GDSF", version u2, header bytes u2, sequence u4, sent_at f8 (epoch seconds),
+#   record_count u4, payload bytes u4
+# Categorical fields are u1 codes into the fixed tables below (CODE_OTHER for values
+# outside them), so frames decode without any per-stream dictionary. Over UDP each
+# datagram carries one frame; over TCP frames are sent back to back.
+FRAME_MAGIC = b"GDSF"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<4sHHIdII")
+MAX_DATAGRAM_BYTES = 65507
+CODE_OTHER = 255
+
+CATEGORIES = ("ICBM", "Hypersonic", "DroneSwarm")
+SOURCES = ("Satellite Network Alpha", "Radar Array Sentinel", "Space Surveillance System Omega")
+REGIONS = ("Region A", "Region B", "Northern Sector", "Coastal Area X", "High Altitude Zone 5")
+SIGNATURES = ("High thermal signature", "Ballistic trajectory", "Maneuverable flight path", "Plasma sheath",
+              "Multiple small radar cross-sections", "Coordinated movement")
+TRAJECTORY_TYPES = ("Ballistic",)
+
+FRAME_RECORD_DTYPE = np.dtype([
+    ("threat_uuid", "S16"),
+    ("category", "u1"), ("source", "u1"), ("region", "u1"), ("estimated_impact_zone", "u1"),
+    ("trajectory_type", "u1"), ("signature_mask", "u1"), ("maneuvering_capability", "i1"), ("reserved", "u1"),
+    ("timestamp", "<f8"), ("latitude", "<f8"), ("longitude", "<f8"),
+    ("speed", "<f4"), ("altitude", "<f4"), ("confidence", "<f4"),  # ~7 significant digits on the wire
+    ("current_heading", "<f4"), ("primary_axis_of_advance", "<f4"), ("swarm_size", "<i4"),
+])  # 72 bytes, no implicit padding
+MAX_RECORDS_PER_DATAGRAM = (MAX_DATAGRAM_BYTES - FRAME_HEADER.size) // FRAME_RECORD_DTYPE.itemsize
+
+_CODES = {
+    field: {value: code for code, value in enumerate(table)}
+    for field, table in (("category", CATEGORIES), ("source", SOURCES), ("region", REGIONS),
+                         ("estimated_impact_zone", REGIONS), ("trajectory_type", TRAJECTORY_TYPES))
+}
+_TABLES = {"category": CATEGORIES, "source": SOURCES, "region": REGIONS,
+           "estimated_impact_zone": REGIONS, "trajectory_type": TRAJECTORY_TYPES}
+_SIGNATURE_BITS = {signature: 1 << bit for bit, signature in enumerate(SIGNATURES)}
+
+
+def _code(field, value):
+    return CODE_OTHER if value is None else _CODES[field].get(value, CODE_OTHER)
+
+
+def encode_frame(threats, sequence=0, sent_at=None):
+    # SensorDataGenerator-style threat dicts -> one frame (bytearray, so the sender can
+    # re-stamp sequence/sent_at in place). Ids must be canonical UUID strings.
+    records = np.zeros(len(threats), dtype=FRAME_RECORD_DTYPE)
+    for i, threat in enumerate(threats):
+        location = threat.get("location") or {}
+        details = threat.get("details") or {}
+        maneuvering = details.get("maneuvering_capability")
+        signature_mask = 0
+        for signature in threat.get("signatures", []):
+            signature_mask |= _SIGNATURE_BITS.get(signature, 0)
+        records[i] = (
+            uuid.UUID(threat["id"]).bytes,
+            _code("category", threat.get("category")), _code("source", threat.get("source")),
+            _code("region", location.get("region")), _code("estimated_impact_zone", details.get("estimated_impact_zone")),
+            _code("trajectory_type", details.get("trajectory_type")), signature_mask,
+            -1 if maneuvering is None else int(maneuvering), 0,
+            threat.get("timestamp", math.nan), location.get("latitude", math.nan), location.get("longitude", math.nan),
+            threat.get("speed", math.nan), threat.get("altitude", math.nan), threat.get("confidence", math.nan),
+            details.get("current_heading", math.nan), details.get("primary_axis_of_advance", math.nan),
+            details.get("swarm_size", -1),
+        )
+    payload = records.tobytes()
+    frame = bytearray(FRAME_HEADER.size + len(payload))
+    FRAME_HEADER.pack_into(frame, 0, FRAME_MAGIC, FRAME_VERSION, FRAME_HEADER.size, sequence,
+                           time.time() if sent_at is None else sent_at, len(records), len(payload))
+    frame[FRAME_HEADER.size:] = payload
+    return frame
+
+
+def stamp_frame(frame, sequence, sent_at=None):
+    # Rewrites sequence and sent_at of an encoded frame in place
+    struct.pack_into("<Id", frame, 8, sequence, time.time() if sent_at is None else sent_at)
+
+
+def read_frame_header(buffer):
+    # -> (sequence, sent_at, record_count, payload_bytes, header_bytes); ValueError if malformed
+    if len(buffer) < FRAME_HEADER.size:
+        raise ValueError("truncated frame header")
+    magic, version, header_bytes, sequence, sent_at, record_count, payload_bytes = FRAME_HEADER.unpack_from(buffer)
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        raise ValueError(f"not a version {FRAME_VERSION} sensor frame")
+    if payload_bytes != record_count * FRAME_RECORD_DTYPE.itemsize:
+        raise ValueError("payload size does not match record count")
+    return sequence, sent_at, record_count, payload_bytes, header_bytes
+
+
+def decode_frame(buffer, payload=None):
+    # Zero-copy decode: the returned TrackBatch's records are a view of buffer's memory.
+    # Stream readers that receive the header and the rest separately pass the rest
+    # (header extension + records) as payload, so the two are never concatenated.
+    view = memoryview(buffer)
+    sequence, sent_at, record_count, payload_bytes, header_bytes = read_frame_header(view)
+    if payload is None:
+        payload, offset = view, header_bytes
+    else:
+        payload, offset = memoryview(payload), header_bytes - FRAME_HEADER.size
+    if len(payload) < offset + payload_bytes:
+        raise ValueError("truncated frame payload")
+    records = np.frombuffer(payload, dtype=FRAME_RECORD_DTYPE, count=record_count, offset=offset)
+    return TrackBatch(records, sequence=sequence, sent_at=sent_at)
+
+
+class TrackView(Mapping):
+    # Read-only threat report backed by one record of a TrackBatch. Behaves like the
+    # generator's dict (get, [], keys, dict(view)); fields are decoded on access, so
+    # reports that are never looked at cost nothing beyond the frame itself.
+    __slots__ = ("_records", "_index")
+
+    _KEYS = ("id", "category", "source", "timestamp", "location", "speed", "altitude", "signatures",
+             "confidence", "details")
+
+    def __init__(self, records, index):
+        self._records = records
+        self._index = index
+
+    def __getitem__(self, key):
+        record = self._records[self._index]
+        if key == "id":
+            return str(uuid.UUID(bytes=record["threat_uuid"].ljust(16, b"\0")))  # "S16" drops trailing NULs
+        if key in ("category", "source"):
+            return _decode_code(key, record[key])
+        if key in ("timestamp", "speed", "altitude", "confidence"):
+            return float(record[key])
+        if key == "location":
+            return {"region": _decode_code("region", record["region"]),
+                    "latitude": float(record["latitude"]), "longitude": float(record["longitude"])}
+        if key == "signatures":
+            mask = int(record["signature_mask"])
+            return [signature for bit, signature in enumerate(SIGNATURES) if mask >> bit & 1]
+        if key == "details":
+            return _decode_details(record)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __repr__(self):
+        return f"TrackView({dict(self)!r})"
+
+
+def _decode_code(field, code):
+    table = _TABLES[field]
+    return table[code] if code < len(table) else None
+
+
+def _decode_details(record):
+    details = {}
+    if record["trajectory_type"] != CODE_OTHER:
+        details["trajectory_type"] = _decode_code("trajectory_type", record["trajectory_type"])
+    if record["estimated_impact_zone"] != CODE_OTHER:
+        details["estimated_impact_zone"] = _decode_code("estimated_impact_zone", record["estimated_impact_zone"])
+    if record["maneuvering_capability"] >= 0:
+        details["maneuvering_capability"] = bool(record["maneuvering_capability"])
+    if not math.isnan(record["current_heading"]):
+        details["current_heading"] = float(record["current_heading"])
+    if record["swarm_size"] >= 0:
+        details["swarm_size"] = int(record["swarm_size"])
+    if not math.isnan(record["primary_axis_of_advance"]):
+        details["primary_axis_of_advance"] = float(record["primary_axis_of_advance"])
+    return details
+
+
+class TrackBatch:
+    # The reports of one frame as NumPy columns (views into the received buffer) plus a
+    # sequence of lazy TrackView reports, so a batch can go straight to
+    # Orchestrator.run_raid. to_threats() materializes plain dicts where they are needed
+    # (e.g. state that is checkpointed).
+    def __init__(self, records, sequence=0, sent_at=None):
+        self.records = records
+        self.sequence = sequence
+        self.sent_at = sent_at
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.records)
+        if not 0 <= index < len(self.records):
+            raise IndexError(index)
+        return TrackView(self.records, index)
+
+    def __iter__(self):
+        return (TrackView(self.records, i) for i in range(len(self.records)))
+
+    def column(self, name):
+        return self.records[name]
+
+    def category_mask(self, category):
+        return self.records["category"] == _CODES["category"].get(category, CODE_OTHER)
+
+    def to_threats(self):
+        return [dict(view) for view in self]
+
+
+class FrameReceiverMetrics:
+    # Latency percentiles are over the most recent latency_samples frames
+    def __init__(self, latency_samples=65536):
+        self.frames = 0
+        self.records = 0
+        self.bad_frames = 0
+        self.missing_frames = 0
+        self.dropped_frames = 0
+        self.decode_seconds = deque(maxlen=latency_samples)
+        self.transit_seconds = deque(maxlen=latency_samples)
+        self._last_sequence = None
+
+    def observe_sequence(self, sequence):
+        if self._last_sequence is not None and sequence > self._last_sequence + 1:
+            self.missing_frames += sequence - self._last_sequence - 1
+        self._last_sequence = sequence if self._last_sequence is None else max(sequence, self._last_sequence)
+
+    def snapshot(self):
+        decode = np.asarray(self.decode_seconds) if self.decode_seconds else np.zeros(1)
+        transit = np.asarray(self.transit_seconds) if self.transit_seconds else np.zeros(1)
+        return {
+            "frames": self.frames,
+            "records": self.records,
+            "bad_frames": self.bad_frames,
+            "missing_frames": self.missing_frames,
+            "dropped_frames": self.dropped_frames,
+            "decode_p50_us": float(np.percentile(decode, 50) * 1e6),
+            "decode_p99_us": float(np.percentile(decode, 99) * 1e6),
+            "transit_p50_ms": float(np.percentile(transit, 50) * 1e3),
+            "transit_p99_ms": float(np.percentile(transit, 99) * 1e3),
+        }
+
+
+class _FrameDatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, receiver):
+        self.receiver = receiver
+
+    def datagram_received(self, data, addr):
+        batch = self.receiver._decode(data)
+        if batch is None:
+            return
+        try:
+            self.receiver.queue.put_nowait(batch)
+        except asyncio.QueueFull:
+            self.receiver.metrics.dropped_frames += 1
+
+
+class SensorFrameReceiver:
+    # Async UDP/TCP receiver for sensor frames. Every frame is decoded zero-copy into a
+    # TrackBatch and put on a bounded queue; TCP stops reading while the queue is full,
+    # UDP frames that find it full are dropped (metrics.dropped_frames). Sequence gaps are
+    # counted as missing frames. close() never waits on the consumer: open connections are
+    # cancelled, and if the queue is full its oldest frame makes room for the end marker.
+    def __init__(self, max_queued_frames=256):
+        self.queue = asyncio.Queue(maxsize=max_queued_frames)
+        self.metrics = FrameReceiverMetrics()
+        self._servers = []
+        self._connections = set()
+
+    def _decode(self, data, payload=None):
+        started = time.perf_counter()
+        try:
+            batch = decode_frame(data, payload)
+        except ValueError:
+            self.metrics.bad_frames += 1
+            return None
+        self.metrics.decode_seconds.append(time.perf_counter() - started)
+        self.metrics.transit_seconds.append(time.time() - batch.sent_at)
+        self.metrics.frames += 1
+        self.metrics.records += len(batch)
+        self.metrics.observe_sequence(batch.sequence)
+        return batch
+
+    async def start_udp(self, host="127.0.0.1", port=5600, receive_buffer_bytes=32 << 20):
+        import socket
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer_bytes)
+        sock.bind((host, port))
+        transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: _FrameDatagramProtocol(self), sock=sock)
+        self._servers.append(transport)
+        return transport.get_extra_info("sockname")
+
+    async def start_tcp(self, host="127.0.0.1", port=5600):
+        server = await asyncio.start_server(self._handle_tcp, host, port, limit=1 << 20)
+        self._servers.append(server)
+        return server.sockets[0].getsockname()
+
+    async def _handle_tcp(self, reader, writer):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(FRAME_HEADER.size)
+                    _, _, _, payload_bytes, header_bytes = read_frame_header(header)
+                    rest = await reader.readexactly(header_bytes - FRAME_HEADER.size + payload_bytes)
+                except asyncio.IncompleteReadError:
+                    return
+                except ValueError:
+                    self.metrics.bad_frames += 1
+                    return  # the stream is out of sync; the sender must reconnect
+                batch = self._decode(header, rest)
+                if batch is not None:
+                    await self.queue.put(batch)
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+
+    async def batches(self):
+        # Async iterator over received TrackBatches; ends after close()
+        while True:
+            batch = await self.queue.get()
+            if batch is None:
+                return
+            yield batch
+
+    async def close(self):
+        for server in self._servers:
+            server.close()
+        connections = list(self._connections)
+        for connection in connections:
+            connection.cancel()
+        await asyncio.gather(*connections, return_exceptions=True)
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.metrics.dropped_frames += 1
+        self.queue.put_nowait(None)
+
+
+async def send_generated_frames(host="127.0.0.1", port=5600, protocol="udp", frames_per_second=1000,
+                                total_frames=5000, records_per_frame=256, pool_frames=32):
+    # SensorDataGenerator-driven load: pool_frames frames are encoded up front and cycled,
+    # each re-stamped with its sequence number and send time.
+    from .sensor_data_generator import SensorDataGenerator
+
+    generator = SensorDataGenerator()
+    pool = [encode_frame(generator.generate_multiple_threats(records_per_frame)) for _ in range(pool_frames)]
+    loop = asyncio.get_running_loop()
+    if protocol == "udp":
+        if len(pool[0]) > MAX_DATAGRAM_BYTES:
+            raise ValueError(f"UDP frames hold at most {MAX_RECORDS_PER_DATAGRAM} records")
+        transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+        writer = None
+    else:
+        _, writer = await asyncio.open_connection(host, port)
+    started = time.perf_counter()
+    try:
+        for sequence in range(total_frames):
+            frame = pool[sequence % pool_frames]
+            stamp_frame(frame, sequence)
+            if writer is None:
+                transport.sendto(frame)
+            else:
+                writer.write(bytes(frame))
+                if sequence % 16 == 15:
+                    await writer.drain()
+            ahead = started + (sequence + 1) / frames_per_second - time.perf_counter()
+            if ahead > 0 or sequence % 16 == 15:
+                await asyncio.sleep(max(ahead, 0))
+        if writer is not None:
+            await writer.drain()
+    finally:
+        if writer is None:
+            transport.close()
+        else:
+            writer.close()
+            await writer.wait_closed()
+    elapsed = time.perf_counter() - started
+    return {"frames": total_frames, "seconds": elapsed, "frames_per_second": total_frames / elapsed}
+
+
+if __name__ == "__main__":
+    # Decode cost per frame (zero-copy vs JSON of the same reports), then a loopback run
+    # of the sender and receiver, then one received frame through Orchestrator.run_raid
+    import contextlib
+    import io
+    import json
+
+    from data.sensor_data_generator import SensorDataGenerator
+
+    generator = SensorDataGenerator()
+    threats = generator.generate_multiple_threats(256)
+    frame = bytes(encode_frame(threats))
+    as_json = json.dumps(threats).encode()
+    for label, decode in (("binary frame -> TrackBatch", decode_frame),
+                          ("binary frame -> TrackBatch + columns", lambda data: decode_frame(data).column("speed").mean()),
+                          ("JSON -> list of dicts", json.loads)):
+        runs = 2000
+        started = time.perf_counter()
+        for _ in range(runs):
+            decode(frame if "binary" in label else as_json)
+        print(f"{label:<38} {(time.perf_counter() - started) / runs * 1e6:8.1f} us per 256-report frame")
+    print(f"frame {len(frame):,} bytes vs JSON {len(as_json):,} bytes")
+    round_trip = decode_frame(frame).to_threats()
+    assert [threat["id"] for threat in round_trip] == [threat["id"] for threat in threats]
+
+    async def load_test(protocol, frames_per_second, total_frames):
+        receiver = SensorFrameReceiver()
+        address = await (receiver.start_udp(port=0) if protocol == "udp" else receiver.start_tcp(port=0))
+        consumed = []
+
+        async def consume():
+            async for batch in receiver.batches():
+                consumed.append(len(batch))
+
+        consumer = asyncio.get_running_loop().create_task(consume())
+        sent = await send_generated_frames(address[0], address[1], protocol, frames_per_second, total_frames)
+        await asyncio.sleep(0.2)
+        await receiver.close()
+        await consumer
+        metrics = receiver.metrics.snapshot()
+        print(f"{protocol.upper()} {frames_per_second:,} frames/s target: sent {sent['frames']:,} in {sent['seconds']:.2f}s, "
+              f"received {metrics['frames']:,} ({metrics['frames'] / sent['seconds']:,.0f} frames/s, "
+              f"{metrics['records'] / sent['seconds']:,.0f} reports/s), missing {metrics['missing_frames']}, "
+              f"dropped {metrics['dropped_frames']}, decode p50 {metrics['decode_p50_us']:.1f} us "
+              f"p99 {metrics['decode_p99_us']:.1f} us, transit p99 {metrics['transit_p99_ms']:.1f} ms")
+
+    for protocol in ("tcp", "udp"):
+        for rate in (1000, 4000):
+            asyncio.run(load_test(protocol, rate, rate * 3))
+
+    from simulation import Orchestrator
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        orchestrator = Orchestrator()
+        final_state = orchestrator.run_raid(decode_frame(frame))
+        orchestrator.close()
+    print(f"run_raid on one decoded frame: {len(final_state['interceptor_plan']['element_plans'])} plans issued")
@@ -1 +1,57 @@
 # This is the main entry point for the CyberDome application.
+import argparse
+import json
+import sys
+
+from tools.benchmark_suite import (DEFAULT_SCALES, PIPELINES, compare_results, default_results_path, run_suite,
+                                   save_results)
+
+
+def _scales(text):
+    # "100,1e4,10**5" -> (100, 10000, 100000)
+    scales = []
+    for part in text.split(","):
+        part = part.strip()
+        base, _, exponent = part.partition("**")
+        scales.append(int(base) ** int(exponent) if exponent else int(float(part)))
+    return tuple(scales)
+
+
+def benchmark(args):
+    pipelines = PIPELINES if args.pipeline == "both" else (args.pipeline,)
+    batch_sizes = {pipeline: args.batch_size for pipeline in pipelines} if args.batch_size else None
+    print(f"Benchmarking {', '.join(pipelines)} at scales {', '.join(f'{scale:,}' for scale in args.scales)}")
+    report = run_suite(pipelines, args.scales, batch_sizes)
+    path = save_results(report, args.output or default_results_path(report))
+    print(f"Results written to {path}")
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        lines, regressions = compare_results(baseline, report, threshold=args.threshold)
+        print("\n".join(lines))
+        if args.fail_on_regression and regressions:
+            return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GoldenDome / CyberDome simulation tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("benchmark", help="end-to-end scale benchmarks for both pipelines")
+    bench.add_argument("--pipeline", choices=PIPELINES + ("both",), default="both")
+    bench.add_argument("--scales", type=_scales, default=DEFAULT_SCALES,
+                       help="comma-separated event counts, e.g. 100,1e4,10**6 (default 10^2..10^7)")
+    bench.add_argument("--batch-size", type=int, help="events per graph run (default 10000 raid / 5000 logs)")
+    bench.add_argument("--output", help="results JSON path (default benchmark_results/<time>-<commit>.json)")
+    bench.add_argument("--compare", help="baseline results JSON from the same machine")
+    bench.add_argument("--threshold", type=float, default=0.10, help="relative change reported as a regression")
+    bench.add_argument("--fail-on-regression", action="store_true", help="exit with status 1 on any regression")
+    bench.set_defaults(handler=benchmark)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
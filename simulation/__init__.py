@@ -1,3 +1,5 @@
 from .orchestrator import Orchestrator
+from .monte_carlo import EngagementMonteCarlo
+from .triage import AnytimeAssigner
 
-__all__ = ["Orchestrator"]
+__all__ = ["Orchestrator", "EngagementMonteCarlo", "AnytimeAssigner"]
@@ -0,0 +1,193 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+
+def _simulate_trials(leak_probability, unit_counts, trials, seed_sequence, chunk_elements):
+    # One worker's share of the trials, over groups of identical engagement units. Every
+    # unit leaks in a trial with probability (1 - pk) ** shots, independently. Single-unit
+    # groups are one Bernoulli draw per trial; the drones of a multi-unit group (e.g. one
+    # swarm element) are summed into one binomial draw, which has the same distribution
+    # and is several times cheaper than per-drone draws. -> (histogram, leaks per group)
+    rng = np.random.default_rng(seed_sequence)
+    single = np.flatnonzero(unit_counts == 1)
+    swarms = np.flatnonzero(unit_counts > 1)
+    single_probability = leak_probability[single].astype(np.float32)
+    total_units = int(unit_counts.sum())
+    histogram = np.zeros(total_units + 1, dtype=np.int64)
+    threat_leaks = np.zeros(len(unit_counts), dtype=np.int64)
+    chunk = max(1, chunk_elements // max(len(unit_counts), 1))
+    for start in range(0, trials, chunk):
+        size = min(chunk, trials - start)
+        leaks = np.zeros(size, dtype=np.int64)
+        if len(single):
+            leaked = rng.random((size, len(single)), dtype=np.float32) < single_probability
+            leaks += leaked.sum(axis=1)
+            threat_leaks[single] += leaked.sum(axis=0)
+        if len(swarms):
+            leaked = rng.binomial(unit_counts[swarms], leak_probability[swarms], size=(size, len(swarms)))
+            leaks += leaked.sum(axis=1)
+            threat_leaks[swarms] += leaked.sum(axis=0)
+        histogram += np.bincount(leaks, minlength=total_units + 1)
+    return histogram, threat_leaks
+
+
+class EngagementMonteCarlo:
+    # Leakage ("how many threats get through?") for a raid against the plans produced by
+    # InterceptorAssignmentAgent. A plan engages its threat with targeting_parameters
+    # ["estimated_pk"] per shot (targeting_parameters.get("shots", 1) shots); a drone swarm
+    # counts each of its swarm_size drones as a separate unit. A layered swarm plan engages
+    # each element's drone_count drones at that element's Pk (as triage.plan_quality
+    # weighs them); drones no element covers always leak, and a swarm plan without
+    # elements engages every drone at the plan's Pk. Leakage is counted in units (threats
+    # plus individual drones).
+    # Trials are split across a process pool, one SeedSequence child per task, so results
+    # are reproducible for a given seed and number of tasks.
+    def __init__(self, num_workers=None, chunk_elements=4000000):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.chunk_elements = chunk_elements
+        self._executor = None
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.num_workers)
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _leak(params):
+        return (1.0 - float(params.get("estimated_pk", 0.0))) ** int(params.get("shots", 1))
+
+    @classmethod
+    def engagement_units(cls, threats, plans):
+        # -> (per-unit leak probability, units, owning threat index) per group of identical
+        # units; a threat is one group, or one per distinct element leak probability of a
+        # layered plan (equal-probability drones sum into one binomial). Unplanned threats
+        # always leak.
+        plans_by_threat = {plan.get("threat_id"): plan for plan in plans if plan}
+        leak_probability, unit_counts, owners = [], [], []
+        for owner, threat in enumerate(threats):
+            plan = plans_by_threat.get(threat.get("id"))
+            units = int(threat.get("details", {}).get("swarm_size", 1)) if threat.get("category") == "DroneSwarm" else 1
+            groups = {}
+            if not plan:
+                groups[1.0] = units
+            elif plan.get("element_plans"):
+                for element in plan["element_plans"]:
+                    params = element.get("targeting_parameters", {})
+                    leak = cls._leak(params)
+                    groups[leak] = groups.get(leak, 0) + int(params.get("drone_count", 1))
+                    units -= int(params.get("drone_count", 1))
+                if units > 0:
+                    groups[1.0] = groups.get(1.0, 0) + units
+            else:
+                groups[cls._leak(plan.get("targeting_parameters", {}))] = units
+            for leak, count in groups.items():
+                leak_probability.append(leak)
+                unit_counts.append(count)
+                owners.append(owner)
+        return (np.array(leak_probability, dtype=np.float64), np.array(unit_counts, dtype=np.int64),
+                np.array(owners, dtype=np.int64))
+
+    def run(self, threats, plans, trials=100000, seed=None, confidence=0.95):
+        started = time.perf_counter()
+        leak_probability, unit_counts, owners = self.engagement_units(threats, plans)
+        tasks = min(self.num_workers, trials)
+        shares = [trials // tasks + (1 if i < trials % tasks else 0) for i in range(tasks)]
+        seeds = np.random.SeedSequence(seed).spawn(tasks)
+
+        if tasks == 1:
+            results = [_simulate_trials(leak_probability, unit_counts, trials, seeds[0], self.chunk_elements)]
+        else:
+            futures = [self._pool().submit(_simulate_trials, leak_probability, unit_counts, share, child, self.chunk_elements)
+                       for share, child in zip(shares, seeds)]
+            results = [future.result() for future in futures]
+        histogram = sum(result[0] for result in results)
+        threat_leaks = np.bincount(owners, weights=sum(result[1] for result in results), minlength=len(threats))
+        elapsed = time.perf_counter() - started
+        return self._summarize(threats, histogram, threat_leaks, leak_probability, unit_counts, trials, confidence, elapsed)
+
+    def _summarize(self, threats, histogram, threat_leaks, leak_probability, unit_counts, trials, confidence, elapsed):
+        leak_counts = np.arange(len(histogram))
+        mean = float((histogram * leak_counts).sum() / trials)
+        variance = float((histogram * (leak_counts - mean) ** 2).sum() / max(trials - 1, 1))
+        z = NormalDist().inv_cdf(0.5 + confidence / 2)
+        half_width = z * math.sqrt(variance / trials)
+        cumulative = np.cumsum(histogram) / trials
+
+        def quantile(q):
+            return int(np.searchsorted(cumulative, q))
+
+        any_leak = 1.0 - histogram[0] / trials
+        per_threat_leaks = threat_leaks / trials
+        by_category = {}
+        for threat, leaks in zip(threats, per_threat_leaks.tolist()):
+            by_category[threat.get("category")] = by_category.get(threat.get("category"), 0.0) + leaks
+        last = int(np.flatnonzero(histogram)[-1]) + 1 if histogram.any() else 1
+        return {
+            "trials": trials,
+            "threats": len(threats),
+            "engagement_units": int(unit_counts.sum()),
+            "expected_leakage": mean,
+            "expected_leakage_ci": (mean - half_width, mean + half_width),
+            # Exact mean for independent engagements; the simulated mean should fall inside the CI
+            "expected_leakage_analytic": float((leak_probability * unit_counts).sum()),
+            "leakage_std": math.sqrt(variance),
+            "probability_any_leak": any_leak,
+            "probability_any_leak_ci": _wilson_interval(any_leak, trials, z),
+            "leakage_quantiles": {"p50": quantile(0.5), "p90": quantile(0.9), "p99": quantile(0.99), "max": last - 1},
+            "leakage_distribution": (histogram[:last] / trials).tolist(),
+            "expected_leakage_by_category": by_category,
+            "threat_leak_expectation": {threat.get("id"): leaks for threat, leaks in zip(threats, per_threat_leaks.tolist())},
+            "confidence": confidence,
+            "elapsed_seconds": elapsed,
+            "trials_per_second": trials / elapsed if elapsed else float("inf"),
+        }
+
+
+def _wilson_interval(p, n, z):
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return (max(0.0, centre - half_width), min(1.0, centre + half_width))
+
+
+def plan_raid(threats, interceptor_agent=None):
+    # Runs InterceptorAssignmentAgent on every threat of a raid, without its per-threat console output
+    if interceptor_agent is None:
+        from agents import InterceptorAssignmentAgent
+        interceptor_agent = InterceptorAssignmentAgent()
+    return interceptor_agent.plan_many(threats)
+
+
+if __name__ == "__main__":
+    # Benchmark: trials per second against raid size
+    from data.sensor_data_generator import SensorDataGenerator
+
+    generator = SensorDataGenerator()
+    print(f"cpu_count={os.cpu_count()}")
+    print(f"{'threats':>8} {'units':>7} {'trials':>8} {'seconds':>8} {'trials/s':>12} {'E[leak]':>9} {'95% CI':>21} {'P(any)':>7}")
+    with EngagementMonteCarlo() as engine:
+        for threat_count in (1, 10, 100, 1000):
+            raid = generator.generate_multiple_threats(threat_count)
+            plans = plan_raid(raid)
+            for trials in (100000, 1000000):
+                result = engine.run(raid, plans, trials=trials, seed=42)
+                low, high = result["expected_leakage_ci"]
+                print(f"{threat_count:>8} {result['engagement_units']:>7} {trials:>8} {result['elapsed_seconds']:>8.2f} "
+                      f"{result['trials_per_second']:>12,.0f} {result['expected_leakage']:>9.3f} "
+                      f"({low:>8.3f}, {high:>8.3f}) {result['probability_any_leak']:>7.3f}")
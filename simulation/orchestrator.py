@@ -1,6 +1,7 @@
 from langgraph.graph import StateGraph, END
-from typing import TypedDict, Annotated, List
-import operator
+from langchain_core.runnables import RunnableConfig
+from typing import TypedDict
+import uuid
 
 from agents import (
     OrbitalThreatDetectionAgent,
@@ -8,44 +9,93 @@ from agents import (
     StrategicCommandAgent,
     HumanOversightCrew
 )
+from data.records import to_dicts
+from data.sensor_archive import open_sensor_archive
+from simulation.triage import AnytimeAssigner
 
 # Define the state for our graph
 class SimulationState(TypedDict):
     raw_sensor_data: any
-    detected_threats: Annotated[dict, operator.add]
-    interceptor_plan: Annotated[dict, operator.add]
-    coordinated_action: Annotated[dict, operator.add]
+    # Each of these is written once per run; operator.add cannot merge dicts
+    detected_threats: dict
+    interceptor_plan: dict
+    coordinated_action: dict
     human_review_needed: bool
     human_decision: dict
+    triage_report: dict
     final_outcome: str # To store the final result of the chain
 
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, checkpointer=None, tick_budget_seconds=0.05):
         self.orbital_agent = OrbitalThreatDetectionAgent()
         self.interceptor_agent = InterceptorAssignmentAgent()
         self.strategic_agent = StrategicCommandAgent()
         self.oversight_crew = HumanOversightCrew()
+        # Raids (run_raid) are triaged and assigned under a per-tick latency budget
+        self.tick_budget_seconds = tick_budget_seconds
+        self.assigner = AnytimeAssigner(self.interceptor_agent)
 
         self.workflow = StateGraph(SimulationState)
         self._build_graph()
-        self.app = self.workflow.compile()
+        # Pass a checkpointer (e.g. tools.checkpointing.SqliteCheckpointSaver) to make runs durable/resumable
+        self.checkpointer = checkpointer
+        self.app = self.workflow.compile(checkpointer=checkpointer)
+
+    def scenario_agents(self):
+        # Fresh instances of the agents that keep state across runs (scheduled engagements,
+        # triage queue), for scenarios that share this compiled graph (tools.ScenarioRunner)
+        return {"strategic_agent": StrategicCommandAgent(), "assigner": AnytimeAssigner(self.interceptor_agent)}
+
+    def _scenario_agent(self, config, name):
+        agents = ((config or {}).get("configurable") or {}).get("scenario_agents") or {}
+        return agents[name] if name in agents else getattr(self, name)
 
     def _detect_threats(self, state: SimulationState):
         print("\n--- Node: Detect Threats ---")
         raw_data = state.get("raw_sensor_data")
+        if isinstance(raw_data, dict) and isinstance(raw_data.get("raid"), list):
+            # Already-detected threat reports (e.g. SensorDataGenerator output) arriving as one tick
+            print(f"Raid tick with {len(raw_data['raid'])} threat reports")
+            return {"detected_threats": {"category": "Raid", "threats": raw_data["raid"]}, "human_review_needed": True}
         detected_threats = self.orbital_agent.run(raw_data)
         return {"detected_threats": detected_threats, "human_review_needed": True} # Assume review is always needed for now
 
+    def _triage_threats(self, state: SimulationState, config: RunnableConfig):
+        print("\n--- Node: Triage Threats ---")
+        threats = state.get("detected_threats") or {}
+        if threats.get("category") != "Raid":
+            print("Single threat, no triage needed")
+            return {}
+        assigner = self._scenario_agent(config, "assigner")
+        assigner.submit(threats["threats"])
+        result = assigner.tick(self.tick_budget_seconds)
+        report = result["report"]
+        print(f"Triage: {report['plans_issued']} plans issued ({report['revisions_issued']} revisions) in "
+              f"{report['latency_seconds'] * 1000:.1f} ms of a {self.tick_budget_seconds * 1000:.0f} ms budget; "
+              f"{report['awaiting_full_plan']} of {report['active_threats']} active threats still on quick plans, "
+              f"quality {report['quality']:.3f}")
+        raid_plan = {
+            "threat_id": f"raid-tick-{len(assigner.tick_reports)}",
+            "threat_category": "Raid",
+            "assigned_interceptor_type": "Triaged raid",
+            "element_plans": result["plans"],
+            "rationale": "Best plans found within the tick budget, in triage priority order.",
+        }
+        return {"interceptor_plan": raid_plan, "triage_report": report}
+
+    def _route_after_triage(self, state: SimulationState):
+        return "coordinate_strategy" if (state.get("detected_threats") or {}).get("category") == "Raid" else "assign_interceptors"
+
     def _assign_interceptors(self, state: SimulationState):
         print("\n--- Node: Assign Interceptors ---")
         threats = state.get("detected_threats")
         interceptor_plan = self.interceptor_agent.run(threats)
         return {"interceptor_plan": interceptor_plan}
 
-    def _coordinate_strategy(self, state: SimulationState):
+    def _coordinate_strategy(self, state: SimulationState, config: RunnableConfig):
         print("\n--- Node: Coordinate Strategy ---")
         plan = state.get("interceptor_plan")
-        coordinated_action = self.strategic_agent.run(plan)
+        coordinated_action = self._scenario_agent(config, "strategic_agent").run(plan)
         return {"coordinated_action": coordinated_action}
 
     def _request_human_review(self, state: SimulationState):
@@ -73,9 +123,12 @@ class Orchestrator:
         # In a real system, this would trigger actual interceptor launch, etc.
         return {"final_outcome": "Action Executed as per Human Approval"}
     
-    def _end_simulation_rejected(self, state: SimulationState):
+    def _end_simulation_rejected(self, state: SimulationState, config: RunnableConfig):
         print("\n--- Node: End Simulation (Rejected) ---")
         print(f"Action rejected by human oversight: {state.get('human_decision')}")
+        # Engagements were committed before review; give their launchers, targets and airspace back
+        released = self._scenario_agent(config, "strategic_agent").release_action(state.get("coordinated_action"))
+        print(f"Released {released} scheduled engagements.")
         return {"final_outcome": "Action Rejected by Human Oversight"}
 
     def _end_simulation_no_review(self, state: SimulationState):
@@ -86,6 +139,7 @@ class Orchestrator:
 
     def _build_graph(self):
         self.workflow.add_node("detect_threats", self._detect_threats)
+        self.workflow.add_node("triage_threats", self._triage_threats)
         self.workflow.add_node("assign_interceptors", self._assign_interceptors)
         self.workflow.add_node("coordinate_strategy", self._coordinate_strategy)
         self.workflow.add_node("request_human_review", self._request_human_review)
@@ -95,7 +149,12 @@ class Orchestrator:
 
 
         self.workflow.set_entry_point("detect_threats")
-        self.workflow.add_edge("detect_threats", "assign_interceptors")
+        self.workflow.add_edge("detect_threats", "triage_threats")
+        self.workflow.add_conditional_edges(
+            "triage_threats",
+            self._route_after_triage,
+            {"assign_interceptors": "assign_interceptors", "coordinate_strategy": "coordinate_strategy"}
+        )
         self.workflow.add_edge("assign_interceptors", "coordinate_strategy")
         self.workflow.add_edge("coordinate_strategy", "request_human_review")
         
@@ -113,14 +172,58 @@ class Orchestrator:
         self.workflow.add_edge("end_simulation_no_review", END)
 
 
-    def run_simulation(self, initial_sensor_data):
-        inputs = {"raw_sensor_data": initial_sensor_data}
+    def build_inputs(self, initial_sensor_data):
+        return {"raw_sensor_data": initial_sensor_data}
+
+    def run_simulation(self, initial_sensor_data, thread_id=None, durability=None):
+        # With a checkpointer, thread_id identifies the run for resume(); durability is LangGraph's
+        # checkpoint frequency knob ("sync" / "async" per superstep, "exit" only at the end).
+        inputs = self.build_inputs(initial_sensor_data)
+        config = None
+        if self.checkpointer is not None:
+            config = {"configurable": {"thread_id": thread_id or str(uuid.uuid4())}}
         print("\n--- Starting Simulation Run ---")
-        final_state = self.app.invoke(inputs)
+        if config:
+            print(f"Checkpointing under thread_id: {config['configurable']['thread_id']}")
+        final_state = self.app.invoke(inputs, config=config, durability=durability)
         print("\n--- Simulation Run Complete ---")
         print(f"Final State: {final_state}")
         return final_state
 
+    def resume(self, thread_id, durability=None):
+        # Continues a checkpointed run from the last completed node instead of starting over
+        if self.checkpointer is None:
+            raise ValueError("resume() requires the orchestrator to be built with a checkpointer.")
+        print(f"\n--- Resuming Simulation Run (thread_id: {thread_id}) ---")
+        final_state = self.app.invoke(None, config={"configurable": {"thread_id": thread_id}}, durability=durability)
+        print("\n--- Simulation Run Complete ---")
+        print(f"Final State: {final_state}")
+        return final_state
+
+    def run_raid(self, threats, thread_id=None, durability=None):
+        # One tick of a saturating raid: triage, anytime assignment within tick_budget_seconds,
+        # then deconfliction/review of the plans issued this tick. Threats stay with the
+        # assigner until their decision deadline, so later ticks re-issue improved plans.
+        # ThreatRecords become plain dicts here, at the graph boundary
+        return self.run_simulation({"raid": to_dicts(threats)}, thread_id=thread_id, durability=durability)
+
+    def triage_summary(self):
+        # Deadline adherence and quality-vs-time curve across all raid ticks so far
+        return self.assigner.summary()
+
+    def close(self):
+        self.assigner.close()
+
+    def run_archive(self, archive_path, replay_speed=None):
+        # Replays a binary sensor archive (see data/sensor_archive.py) one threat report per run.
+        # replay_speed=None replays as fast as possible; 1.0 keeps the recorded timing.
+        archive = open_sensor_archive(archive_path)
+        print(f"\n--- Replaying {len(archive)} archived sensor reports from {archive_path} ---")
+        final_states = []
+        for threats in archive.replay(batch_size=1, speed=replay_speed):
+            final_states.append(self.run_simulation(threats[0]))
+        return final_states
+
 if __name__ == '__main__':
     # Example Usage (for testing this module directly)
     orchestrator = Orchestrator()
@@ -0,0 +1,279 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+
+from tools.pk_tables import speed_km_per_second
+
+# Relative value of defeating each category, and a nominal remaining range (km) used to
+# turn reported speed into a time to impact
+CATEGORY_WEIGHTS = {"ICBM": 10.0, "Hypersonic": 8.0, "DroneSwarm": 3.0}
+NOMINAL_RANGE_KM = {"ICBM": 8000.0, "Hypersonic": 1500.0, "DroneSwarm": 60.0}
+# Seconds before impact by which an engagement decision must be final
+REACTION_SECONDS = {"ICBM": 120.0, "Hypersonic": 30.0, "DroneSwarm": 10.0}
+DEFAULT_WEIGHT, DEFAULT_RANGE_KM, DEFAULT_REACTION_SECONDS = 1.0, 500.0, 30.0
+# Alternative full plans searched per category, one per candidate (InterceptorAssignmentAgent.plan
+# options): swarm candidates re-cluster the same drone tracks at different radii, trading
+# area-effect engagements against point defense. Other categories have a single plan.
+CANDIDATE_OPTIONS = {"DroneSwarm": ({"eps_km": 0.3}, {"eps_km": 0.2}, {"eps_km": 0.45}, {"eps_km": 0.6})}
+SINGLE_CANDIDATE = ({},)
+
+
+def time_to_impact_seconds(threat, now=None):
+    now = time.time() if now is None else now
+    flight = NOMINAL_RANGE_KM.get(threat.get("category"), DEFAULT_RANGE_KM) / speed_km_per_second(threat)
+    reported = threat.get("timestamp")
+    elapsed = now - reported if isinstance(reported, (int, float)) else 0.0
+    return max(flight - elapsed, 0.0)
+
+
+def threat_importance(threat):
+    weight = CATEGORY_WEIGHTS.get(threat.get("category"), DEFAULT_WEIGHT)
+    if threat.get("category") == "DroneSwarm":
+        weight *= math.sqrt((threat.get("details") or {}).get("swarm_size", threat.get("swarm_size", 1)) / 25.0)
+    return weight * threat.get("confidence", 1.0)
+
+
+def triage_score(threat, now=None):
+    # Urgency: importance per second left, so a closer threat of the same kind goes first
+    return threat_importance(threat) / max(time_to_impact_seconds(threat, now), 1.0)
+
+
+def plan_quality(plan):
+    # Expected fraction of the threat defeated: the plan's Pk, or the drone-weighted Pk of its elements
+    elements = plan.get("element_plans")
+    if elements:
+        drones = sum(element["targeting_parameters"].get("drone_count", 1) for element in elements)
+        return sum(element["targeting_parameters"]["estimated_pk"] * element["targeting_parameters"].get("drone_count", 1)
+                   for element in elements) / max(drones, 1)
+    return plan.get("targeting_parameters", {}).get("estimated_pk", 0.0)
+
+
+class AnytimeAssigner:
+    # Time-budgeted triage in front of interceptor assignment. Every submitted threat gets
+    # an immediate quick_plan, then full assignments (InterceptorAssignmentAgent.plan) are
+    # evaluated from a heap ordered by (evaluations so far, -triage score): each threat gets
+    # one full plan in priority order before any gets a second candidate, and the best
+    # candidate (by plan_quality) is kept. Candidates are the category's CANDIDATE_OPTIONS,
+    # all planned against the same (seeded) swarm tracks, so the best is a real choice
+    # between plans rather than the luckiest random sample.
+    # tick() spends at most budget_seconds improving and returns the best plans found so
+    # far; between ticks a background thread keeps improving whatever is left, so later
+    # ticks can issue better plans as revisions.
+    #
+    # Quality is the importance-weighted mean plan_quality over active threats (quick
+    # plans count at their conservative Pk). A threat leaves when its decision deadline
+    # (time to impact minus the category's reaction time) passes; the deadline counts as
+    # met if the threat had a full plan by then.
+    def __init__(self, interceptor_agent, candidates_per_threat=4, background=True, curve_interval_seconds=0.005):
+        self.interceptor_agent = interceptor_agent
+        self.candidates_per_threat = candidates_per_threat
+        self.background = background
+        self.curve_interval_seconds = curve_interval_seconds
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._weighted_quality = 0.0
+        self._total_weight = 0.0
+        self._fully_planned = 0
+        self._worker = None
+        self._stop = threading.Event()
+        self.started_at = None
+        self.quality_curve = []  # (seconds since first submit, quality, fully planned fraction)
+        self.tick_reports = []
+        self.deadlines_met = 0
+        self.deadlines_missed = 0
+
+    def submit(self, threats, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.perf_counter()
+            for threat in threats:
+                threat_id = threat.get("id") or f"threat-{next(self._seq)}"
+                if threat_id in self._entries:
+                    continue
+                quick = self.interceptor_agent.quick_plan(threat)
+                importance = threat_importance(threat)
+                reaction = REACTION_SECONDS.get(threat.get("category"), DEFAULT_REACTION_SECONDS)
+                entry = {
+                    "threat_id": threat_id,
+                    "threat": threat,
+                    "score": triage_score(threat, now),
+                    "importance": importance,
+                    "deadline": now + max(time_to_impact_seconds(threat, now) - reaction, 0.0),
+                    "best_plan": quick,
+                    "best_quality": plan_quality(quick),
+                    "evaluations": 0,
+                    "revision": 0,
+                    "issued_revision": None,
+                    "full_at": None,
+                }
+                self._entries[threat_id] = entry
+                self._weighted_quality += importance * entry["best_quality"]
+                self._total_weight += importance
+                heapq.heappush(self._heap, (0, -entry["score"], next(self._seq), threat_id))
+
+    def _improve_one(self):
+        # One full candidate for the most deserving threat; False when nothing is left to do
+        with self._lock:
+            while self._heap:
+                evaluations, negative_score, _, threat_id = heapq.heappop(self._heap)
+                entry = self._entries.get(threat_id)
+                if entry is not None and entry["evaluations"] == evaluations:
+                    break
+            else:
+                return False
+        options = CANDIDATE_OPTIONS.get(entry["threat"].get("category"), SINGLE_CANDIDATE)
+        candidate = self.interceptor_agent.plan(entry["threat"], **options[evaluations % len(options)])
+        quality = plan_quality(candidate)
+        with self._lock:
+            if self._entries.get(threat_id) is not entry:
+                return True  # expired while being planned
+            entry["evaluations"] += 1
+            if entry["full_at"] is None:
+                entry["full_at"] = time.time()
+                self._fully_planned += 1
+            if quality > entry["best_quality"] or entry["best_plan"].get("planning_stage") == "quick":
+                self._weighted_quality += entry["importance"] * (quality - entry["best_quality"])
+                entry["best_plan"], entry["best_quality"] = candidate, quality
+                entry["revision"] += 1
+            if entry["evaluations"] < min(self.candidates_per_threat, len(options)):
+                heapq.heappush(self._heap, (entry["evaluations"], negative_score, next(self._seq), threat_id))
+            self._record_curve()
+        return True
+
+    def _record_curve(self, force=False):
+        elapsed = time.perf_counter() - self.started_at
+        if force or not self.quality_curve or elapsed - self.quality_curve[-1][0] >= self.curve_interval_seconds:
+            self.quality_curve.append((elapsed, self.quality, self.fully_planned_fraction))
+
+    @property
+    def quality(self):
+        return self._weighted_quality / self._total_weight if self._total_weight else 0.0
+
+    @property
+    def fully_planned_fraction(self):
+        return self._fully_planned / len(self._entries) if self._entries else 0.0
+
+    def expire(self, now=None):
+        # Drops threats whose decision deadline has passed and scores deadline adherence
+        now = time.time() if now is None else now
+        with self._lock:
+            for threat_id in [threat_id for threat_id, entry in self._entries.items() if entry["deadline"] <= now]:
+                entry = self._entries.pop(threat_id)
+                self._weighted_quality -= entry["importance"] * entry["best_quality"]
+                self._total_weight -= entry["importance"]
+                self._fully_planned -= entry["full_at"] is not None
+                if entry["full_at"] is not None and entry["full_at"] <= entry["deadline"]:
+                    self.deadlines_met += 1
+                else:
+                    self.deadlines_missed += 1
+            if not self._entries:
+                self._weighted_quality = self._total_weight = 0.0  # drop accumulated rounding
+
+    def _pause_background(self):
+        if self._worker is not None:
+            self._stop.set()
+            self._worker.join()
+            self._worker = None
+
+    def _background_loop(self):
+        while not self._stop.is_set() and self._improve_one():
+            pass
+
+    def tick(self, budget_seconds, now=None):
+        # -> {"plans": new or revised plans in priority order, "report": tick statistics}
+        started = time.perf_counter()
+        self._pause_background()
+        self.expire(now)
+        evaluations = 0
+        while time.perf_counter() - started < budget_seconds and self._improve_one():
+            evaluations += 1
+        with self._lock:
+            issued = []
+            for entry in sorted(self._entries.values(), key=lambda entry: -entry["score"]):
+                if entry["issued_revision"] != entry["revision"]:
+                    plan = dict(entry["best_plan"], triage_score=entry["score"], revision=entry["revision"])
+                    if entry["issued_revision"] is not None:
+                        plan["supersedes_revision"] = entry["issued_revision"]
+                    issued.append(plan)
+                    entry["issued_revision"] = entry["revision"]
+            self._record_curve(force=True)
+            pending = len(self._entries) - self._fully_planned
+            latency = time.perf_counter() - started
+            report = {
+                "budget_seconds": budget_seconds,
+                "latency_seconds": latency,
+                "within_budget": latency <= budget_seconds * 1.1,  # allows for the one evaluation in flight
+                "evaluations": evaluations,
+                "active_threats": len(self._entries),
+                "awaiting_full_plan": pending,
+                "plans_issued": len(issued),
+                "revisions_issued": sum(1 for plan in issued if "supersedes_revision" in plan),
+                "quality": self.quality,
+                "deadlines_met": self.deadlines_met,
+                "deadlines_missed": self.deadlines_missed,
+            }
+        self.tick_reports.append(report)
+        if self.background and self._heap:
+            self._stop.clear()
+            self._worker = threading.Thread(target=self._background_loop, name="anytime-assigner", daemon=True)
+            self._worker.start()
+        return {"plans": issued, "report": report}
+
+    def summary(self):
+        # Deadline adherence and the quality-vs-time curve over the whole run
+        ticks = len(self.tick_reports)
+        decided = self.deadlines_met + self.deadlines_missed
+        return {
+            "ticks": ticks,
+            "ticks_within_budget": sum(1 for report in self.tick_reports if report["within_budget"]) / ticks if ticks else None,
+            "max_tick_latency_seconds": max((report["latency_seconds"] for report in self.tick_reports), default=None),
+            "deadlines_met": self.deadlines_met,
+            "deadlines_missed": self.deadlines_missed,
+            "deadline_adherence": self.deadlines_met / decided if decided else None,
+            "quality_curve": list(self.quality_curve),
+        }
+
+    def close(self):
+        self._pause_background()
+
+
+if __name__ == "__main__":
+    # Saturation run: a raid whose deadlines fall within a few seconds, planned in 50 ms ticks
+    import random
+
+    from agents import InterceptorAssignmentAgent
+    from data.sensor_data_generator import SensorDataGenerator
+
+    generator = SensorDataGenerator()
+    raid = generator.generate_multiple_threats(2000)
+    for background in (False, True):
+        random.seed(5)
+        now = time.time()
+        for threat in raid:
+            # Backdate reports so each threat's decision deadline is 0.5-8 s away
+            flight = NOMINAL_RANGE_KM[threat["category"]] / speed_km_per_second(threat)
+            threat["timestamp"] = now - (flight - REACTION_SECONDS[threat["category"]] - random.uniform(0.5, 8.0))
+        assigner = AnytimeAssigner(InterceptorAssignmentAgent(), background=background)
+        assigner.submit(raid[:1000])
+        tick, budget, period = 0, 0.05, 0.1
+        while assigner._entries:
+            if tick == 10:
+                assigner.submit(raid[1000:])  # second wave arrives mid-run
+            result = assigner.tick(budget)
+            tick += 1
+            time.sleep(max(0.0, period - result["report"]["latency_seconds"]))
+        assigner.close()
+        summary = assigner.summary()
+        print(f"\nbackground={background}: {summary['ticks']} ticks, {summary['ticks_within_budget']:.0%} within the "
+              f"{budget * 1000:.0f} ms budget (max {summary['max_tick_latency_seconds'] * 1000:.1f} ms), "
+              f"deadline adherence {summary['deadline_adherence']:.1%} "
+              f"({summary['deadlines_met']} met, {summary['deadlines_missed']} missed)")
+        print("  seconds  quality  fully planned")
+        curve = summary["quality_curve"]
+        for elapsed, quality, planned in curve[::max(1, len(curve) // 12)]:
+            print(f"  {elapsed:7.2f}  {quality:7.3f}  {planned:13.1%}")
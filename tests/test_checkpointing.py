@@ -0,0 +1,46 @@
+import operator
+from typing import Annotated, List, TypedDict
+
+from langgraph.graph import END, StateGraph
+
+from tools.checkpointing import SqliteCheckpointSaver
+
+
+class CounterState(TypedDict):
+    steps: Annotated[List[str], operator.add]
+
+
+def build(saver):
+    graph = StateGraph(CounterState)
+    graph.add_node("first", lambda state: {"steps": ["first"]})
+    graph.add_node("second", lambda state: {"steps": ["second"]})
+    graph.set_entry_point("first")
+    graph.add_edge("first", "second")
+    graph.add_edge("second", END)
+    return graph.compile(checkpointer=saver)
+
+
+def config(thread_id):
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_threads_are_read_on_demand_and_evicted(tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    saver = SqliteCheckpointSaver(path)
+    saver.MAX_CACHED_THREADS = 2
+    app = build(saver)
+    for thread_id in ("a", "b", "c"):
+        app.invoke({"steps": []}, config=config(thread_id))
+    assert set(saver.storage) == {"b", "c"}
+    assert not any(key[0] == "a" for key in list(saver.blobs) + list(saver.writes))
+    # An evicted thread is read back from SQLite
+    assert app.get_state(config("a")).values["steps"] == ["first", "second"]
+    saver.close()
+
+    restarted = SqliteCheckpointSaver(path)
+    assert not restarted.storage  # nothing is loaded up front
+    app = build(restarted)
+    assert app.get_state(config("b")).values["steps"] == ["first", "second"]
+    assert {item.config["configurable"]["thread_id"] for item in restarted.list(None)} == {"a", "b", "c"}
+    assert len(list(restarted.list(None, limit=4))) == 4
+    restarted.close()
@@ -0,0 +1,23 @@
+import json
+
+from cyberdome.agents.containment_agent import ContainmentAgent
+from cyberdome.playbooks.engine import DEFAULT_PLAYBOOK_PATH
+
+
+def test_plan_without_matching_playbook_is_recorded_not_run(tmp_path):
+    with open(DEFAULT_PLAYBOOK_PATH) as handle:
+        playbooks = json.load(handle)
+    # Only the Critical playbook: no catch-all entry
+    playbooks["playbooks"] = [playbook for playbook in playbooks["playbooks"]
+                              if playbook["match"].get("severities") == ["Critical"]]
+    path = tmp_path / "playbooks.json"
+    path.write_text(json.dumps(playbooks))
+    plans = [
+        {"endpoint_id": "10.0.0.5", "reason": "critical", "exploit_id": "e1", "severity": "Critical",
+         "kill_chain": False, "source_ip": "10.0.0.5", "user_id": "alice"},
+        {"endpoint_id": "10.0.0.6", "reason": "low", "exploit_id": "e2", "severity": "Low",
+         "kill_chain": False, "source_ip": "10.0.0.6", "user_id": "bob"},
+    ]
+    actions = ContainmentAgent(playbook_path=str(path)).execute_plan(plans)
+    statuses = {action["endpoint_id"]: action["status"] for action in actions}
+    assert statuses == {"10.0.0.5": "isolated_simulated", "10.0.0.6": "no_playbook"}
@@ -0,0 +1,43 @@
+import numpy as np
+
+from cyberdome.data import LogGenerator
+from cyberdome.tools.exfiltration_detector import ExfiltrationDetector
+
+BASE = 1000000.0  # a multiple of the 300 s window
+
+
+def _batch(detector, flows):
+    # flows: [(seconds after BASE, source, destination, bytes)]
+    timestamps, sources, destinations, payload_bytes = zip(*flows)
+    return detector.process_arrays(np.array(timestamps) + BASE, np.array(sources), np.array(destinations),
+                                   np.array(payload_bytes, dtype=float), flush=True)
+
+
+def _background(count, offset=0):
+    return [(i % 300, offset + i, 0, 1000.0) for i in range(count)]
+
+
+def test_overlapping_flushed_batches_are_all_scored():
+    detector = ExfiltrationDetector()
+    for batch in range(3):
+        alerts = _batch(detector, _background(100, offset=batch * 1000) + [(10, 500 + batch, 9, 400000.0)])
+        assert [(alert["source_ip"], alert["destination_ip"]) for alert in alerts] == [(500 + batch, 9)]
+    assert detector.late_flows == 202
+
+
+def test_window_split_across_batches_alerts_once():
+    detector = ExfiltrationDetector()
+    assert _batch(detector, _background(100)) == []
+    assert _batch(detector, [(20, 5, 0, 30000.0)]) == []
+    alerts = _batch(detector, [(30, 5, 0, 30000.0)])
+    assert len(alerts) == 1 and alerts[0]["bytes"] == 61000.0
+    assert _batch(detector, [(40, 5, 0, 30000.0)]) == []
+
+
+def test_repeated_recon_scans_keep_alerting():
+    generator = LogGenerator()
+    detector = ExfiltrationDetector()
+    for _ in range(3):
+        traffic = [generator.generate_network_traffic_log() for _ in range(2000)]
+        traffic += [generator.generate_network_traffic_log(anomaly_type="data_exfiltration") for _ in range(3)]
+        assert detector.scan_flows(traffic)
@@ -0,0 +1,22 @@
+from cyberdome.agents.recon_agent import ReconAgent
+from cyberdome.tools.ioc_index import IOCStore
+
+
+def test_blank_observables_are_skipped():
+    index = IOCStore().index
+    assert index.match_values([" ", "\t", "", None]) == {}
+    assert index.match_logs([{"source_ip": "  ", "destination_ip": "\n"}]) == []
+
+
+def test_blank_endpoints_do_not_break_network_scan():
+    agent = ReconAgent()
+    anomalies = agent.scan_network_traffic([{"event_id": "blank", "source_ip": "  ", "destination_ip": " ",
+                                             "payload": "normal", "timestamp": "2024-07-31T08:00:00Z"}])
+    assert anomalies == []
+
+
+def test_sample_feed_spares_fixture_traffic():
+    index = IOCStore().index
+    # The coordinator demo's benign source, and the generator's exfiltration endpoint
+    assert index.match_values(["1.2.3.4"]) == {}
+    assert index.match_values(["exfil-drop.example.net"])
@@ -0,0 +1,22 @@
+import asyncio
+
+from cyberdome.data.log_ingest import LogIngestService, send_generated_logs
+
+
+def test_close_after_partial_feed_with_running_tcp_sender():
+    async def scenario():
+        service = LogIngestService(batch_size=100, batch_interval_seconds=0.05, max_queued_batches=2)
+        host, port = await service.start_tcp(port=0)
+        sender = asyncio.get_running_loop().create_task(
+            send_generated_logs(host, port, "tcp", events_per_second=50000, total_events=10 ** 7, pool_size=200))
+        results = await service.feed(lambda network, user: len(network) + len(user), max_batches=3)
+        # The sender is still writing and the queue is full: close() must not wait on a consumer
+        await asyncio.wait_for(service.close(), timeout=5)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        remaining = [batch async for batch in service.batches()]
+        return results, remaining
+
+    results, remaining = asyncio.run(scenario())
+    assert results == [100, 100, 100]
+    assert len(remaining) <= 2
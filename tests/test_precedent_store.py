@@ -0,0 +1,21 @@
+from cyberdome.agents.human_review_board_crew import HumanReviewBoardCrew
+from cyberdome.tools.precedent_store import PrecedentStore, endpoint_class
+
+
+def test_blank_endpoints_are_unknown():
+    assert endpoint_class("  ") == "unknown"
+    assert endpoint_class(None) == "unknown"
+    assert endpoint_class(" 10.0.0.5 (DB_SERVER)") == "internal_host"
+
+
+def test_fresh_board_keeps_precedents_to_itself():
+    store = PrecedentStore()
+    board = HumanReviewBoardCrew(precedent_store=store)
+    assert board.precedent_store is store  # an empty store is falsy but still used
+    action = {"action_summary": "Isolate compromised endpoint", "severity": "High",
+              "endpoint": "192.168.1.101", "signature": "CVE-2023-12345"}
+    board.review_proposed_action(action)
+    other = board.fresh()
+    assert other.precedent_store is not store and len(other.precedent_store) == 0
+    assert other.review_proposed_action(dict(action, endpoint="192.168.1.102"))["auto_decided"] is False
+    assert board.review_proposed_action(dict(action, endpoint="192.168.1.102"))["auto_decided"] is True
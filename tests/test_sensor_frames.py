@@ -0,0 +1,21 @@
+import asyncio
+
+from data.sensor_frames import SensorFrameReceiver, send_generated_frames
+
+
+def test_close_with_full_queue_and_running_tcp_sender():
+    async def scenario():
+        receiver = SensorFrameReceiver(max_queued_frames=2)
+        host, port = await receiver.start_tcp(port=0)
+        sender = asyncio.get_running_loop().create_task(
+            send_generated_frames(host, port, "tcp", frames_per_second=1000, total_frames=10 ** 6,
+                                  records_per_frame=8, pool_frames=2))
+        while not receiver.queue.full():
+            await asyncio.sleep(0.01)
+        # Nothing consumes the queue: close() must not wait on a consumer
+        await asyncio.wait_for(receiver.close(), timeout=5)
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        return [batch async for batch in receiver.batches()]
+
+    assert len(asyncio.run(scenario())) == 1
@@ -0,0 +1,24 @@
+from .record_archive import RecordArchive, RecordArchiveWriter, StringDictionary
+from .checkpointing import CompressedSerializer, SqliteCheckpointSaver
+from .interval_tree import IntervalTree
+from .spatial_grid import SpatialGrid
+from .track_clustering import cluster_summaries, grid_dbscan
+from .scenario_runner import ScenarioRunner
+from .pk_tables import PkTables, load_pk_tables
+from .coverage_grid import CoverageGrid
+
+__all__ = [
+    "RecordArchive",
+    "RecordArchiveWriter",
+    "StringDictionary",
+    "CompressedSerializer",
+    "SqliteCheckpointSaver",
+    "IntervalTree",
+    "SpatialGrid",
+    "grid_dbscan",
+    "cluster_summaries",
+    "ScenarioRunner",
+    "PkTables",
+    "load_pk_tables",
+    "CoverageGrid",
+]
@@ -0,0 +1,261 @@
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import subprocess
+import time
+
+import numpy as np
+
+# End-to-end scale benchmarks for both pipelines (run via `python main.py benchmark`).
+# Each (pipeline, scale) runs in a fresh spawned process, so peak RSS is per run. Events
+# are generated batch by batch outside the timed region and streamed through the
+# compiled graph; node latency is the time between a node's update and the previous one
+# in the graph's "updates" stream. Results go to a JSON file tagged with the git commit,
+# which compare_results() diffs against a baseline from the same machine. "events" counts
+# offered records; "admitted_events" counts what the SOC overload controller let through,
+# so a throughput gain that comes from shedding shows up as a gap between the two.
+
+PIPELINES = ("orchestrator", "soc")
+DEFAULT_SCALES = (10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+DEFAULT_BATCH_SIZES = {"orchestrator": 10000, "soc": 5000}
+# A child that has not reported after this long (or died without reporting, e.g. OOM
+# killed) is recorded as a failure instead of hanging the suite
+RUN_TIMEOUT_SECONDS = 6 * 3600
+POLL_SECONDS = 1.0
+PERCENTILES = (50, 95, 99)
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (2 ** 20 if platform.system() == "Darwin" else 2 ** 10)
+
+
+def _orchestrator_batches(scale, batch_size):
+    from data.sensor_data_generator import SensorDataGenerator
+    from simulation import Orchestrator
+
+    orchestrator = Orchestrator()
+    generator = SensorDataGenerator()
+
+    def batches():
+        remaining = scale
+        while remaining > 0:
+            count = min(batch_size, remaining)
+            remaining -= count
+            # A fresh triage queue / engagement book per tick keeps memory bounded by the batch
+            agents = orchestrator.scenario_agents()
+            inputs = orchestrator.build_inputs({"raid": generator.generate_multiple_threats(count)})
+            yield count, inputs, {"configurable": {"scenario_agents": agents}}, agents
+
+    return orchestrator, batches()
+
+
+def _soc_batches(scale, batch_size):
+    from cyberdome.data.log_archive import split_log_batch
+    from cyberdome.data.log_generator import LogGenerator
+    from cyberdome.simulation import AISocCoordinationNode
+
+    coordinator = AISocCoordinationNode()
+    generator = LogGenerator()
+
+    def batches():
+        remaining = scale
+        while remaining > 0:
+            count = min(batch_size, remaining)
+            remaining -= count
+            # generate_mock_logs always adds its 6 anomaly logs; size the normal ones around them
+            logs = generator.generate_mock_logs(max(count // 2, 3), max(count - count // 2, 3))[:count]
+            yield len(logs), coordinator.build_inputs(*split_log_batch(logs)), None, {}
+
+    return coordinator, batches()
+
+
+def run_benchmark(pipeline, scale, batch_size=None):
+    # One (pipeline, scale) run in the current process -> result dict
+    batch_size = batch_size or DEFAULT_BATCH_SIZES[pipeline]
+    build = _orchestrator_batches if pipeline == "orchestrator" else _soc_batches
+    with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+        coordinator, batches = build(scale, batch_size)
+        baseline_rss_mb = _peak_rss_mb()
+        node_seconds, batch_seconds = {}, []
+        events, admitted, timed = 0, 0, 0.0
+        for count, inputs, config, agents in batches:
+            kept = count
+            started = last = time.perf_counter()
+            for update in coordinator.app.stream(inputs, config, stream_mode="updates"):
+                now = time.perf_counter()
+                for node in update:
+                    node_seconds.setdefault(node, []).append(now - last)
+                shedding = (update.get("load_shedding") or {}).get("load_shedding")
+                if shedding:
+                    kept = shedding["admitted"]
+                last = now
+            elapsed = time.perf_counter() - started
+            for agent in agents.values():
+                close = getattr(agent, "close", None)
+                if close is not None:
+                    close()
+            batch_seconds.append(elapsed)
+            timed += elapsed
+            events += count
+            admitted += kept
+        close = getattr(coordinator, "close", None)
+        if close is not None:
+            close()
+    return {
+        "pipeline": pipeline,
+        "scale": scale,
+        "batch_size": batch_size,
+        "events": events,
+        "admitted_events": admitted,
+        "batches": len(batch_seconds),
+        "seconds": timed,
+        "events_per_second": events / timed if timed else None,
+        "batch_latency_ms": _percentiles(batch_seconds),
+        "node_latency_ms": {node: _percentiles(samples) for node, samples in node_seconds.items()},
+        "baseline_rss_mb": baseline_rss_mb,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def _percentiles(samples):
+    values = np.asarray(samples) * 1000.0
+    summary = {f"p{q}": float(np.percentile(values, q)) for q in PERCENTILES}
+    summary["count"] = len(samples)
+    summary["total"] = float(values.sum())
+    return summary
+
+
+def _run_in_child(pipeline, scale, batch_size, results):
+    try:
+        results.put(run_benchmark(pipeline, scale, batch_size))
+    except Exception as exc:  # reported in the results file instead of killing the suite
+        results.put({"pipeline": pipeline, "scale": scale, "error": f"{type(exc).__name__}: {exc}"})
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def _collect(child, results, pipeline, scale, timeout_seconds):
+    # -> the child's result, or a failure entry if it exited without one or timed out
+    waited = 0.0
+    while True:
+        try:
+            return results.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            waited += POLL_SECONDS
+        if not child.is_alive():
+            try:  # the result may have landed just before exit
+                return results.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                return {"pipeline": pipeline, "scale": scale,
+                        "error": f"benchmark process exited with code {child.exitcode} without a result"}
+        if waited >= timeout_seconds:
+            child.terminate()
+            return {"pipeline": pipeline, "scale": scale, "error": f"timed out after {timeout_seconds:.0f}s"}
+
+
+def run_suite(pipelines=PIPELINES, scales=DEFAULT_SCALES, batch_sizes=None, progress=print,
+              timeout_seconds=RUN_TIMEOUT_SECONDS):
+    commit, dirty = git_revision()
+    report = {
+        "git_commit": commit,
+        "git_dirty": dirty,
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": [],
+    }
+    context = multiprocessing.get_context("spawn")
+    for pipeline in pipelines:
+        for scale in scales:
+            results = context.Queue()
+            batch_size = (batch_sizes or {}).get(pipeline)
+            child = context.Process(target=_run_in_child, args=(pipeline, scale, batch_size, results))
+            child.start()
+            result = _collect(child, results, pipeline, scale, timeout_seconds)
+            child.join()
+            report["results"].append(result)
+            progress(format_result(result))
+    return report
+
+
+def format_result(result):
+    if "error" in result:
+        return f"{result['pipeline']:<12} {result['scale']:>10,}  FAILED: {result['error']}"
+    slowest = sorted(result["node_latency_ms"].items(), key=lambda item: -item[1]["total"])[:3]
+    nodes = ", ".join(f"{node} p50 {stats['p50']:.1f}/p99 {stats['p99']:.1f} ms" for node, stats in slowest)
+    # Results saved before admitted_events was recorded had no load shedding
+    admitted = result.get("admitted_events", result["events"])
+    shed = f"  admitted {admitted:,}/{result['events']:,}" if admitted != result["events"] else ""
+    return (f"{result['pipeline']:<12} {result['scale']:>10,}  {result['events_per_second']:>12,.0f} events/s{shed}  "
+            f"peak RSS {result['peak_rss_mb']:7.1f} MiB  [{nodes}]")
+
+
+def default_results_path(report, directory="benchmark_results"):
+    stamp = report["started_at"][:19].replace(":", "").replace("-", "")
+    commit = (report["git_commit"] or "nogit")[:10] + ("-dirty" if report["git_dirty"] else "")
+    return os.path.join(directory, f"{stamp}-{commit}.json")
+
+
+def save_results(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as handle:
+        json.dump(report, handle, indent=2)
+    return path
+
+
+def compare_results(baseline, current, threshold=0.10, min_node_delta_ms=1.0):
+    # -> (lines describing throughput and node p95 changes per (pipeline, scale), number of
+    # regressions); throughput drops and p95 increases beyond threshold are regressions.
+    # Node changes smaller than min_node_delta_ms are timer noise and are not reported.
+    previous = {(result["pipeline"], result["scale"]): result for result in baseline["results"] if "error" not in result}
+    lines = [f"Comparing {(current.get('git_commit') or 'working tree')[:10]} against "
+             f"{(baseline.get('git_commit') or 'unknown')[:10]} (threshold {threshold:.0%})"]
+    if baseline.get("machine") != current.get("machine"):
+        lines.append("  warning: results come from different machines")
+    regressions = 0
+    for result in current["results"]:
+        before = previous.get((result["pipeline"], result["scale"]))
+        if before is None:
+            continue
+        if "error" in result:
+            regressions += 1
+            lines.append(f"  {result['pipeline']:<12} {result['scale']:>10,}  FAILED: {result['error']}  REGRESSION")
+            continue
+        change = result["events_per_second"] / before["events_per_second"] - 1.0
+        flag = "REGRESSION" if change < -threshold else ""
+        regressions += bool(flag)
+        lines.append(f"  {result['pipeline']:<12} {result['scale']:>10,}  throughput {change:+7.1%}  {flag}")
+        kept = result.get("admitted_events", result["events"]) / result["events"]
+        kept_before = before.get("admitted_events", before["events"]) / before["events"]
+        if kept != kept_before:
+            lines.append(f"      admitted {kept:.1%} of offered records (was {kept_before:.1%})")
+        for node, stats in result["node_latency_ms"].items():
+            old = before["node_latency_ms"].get(node)
+            if old is None or old["p95"] <= 0:
+                continue
+            node_change = stats["p95"] / old["p95"] - 1.0
+            if abs(node_change) > threshold and abs(stats["p95"] - old["p95"]) >= min_node_delta_ms:
+                node_flag = "REGRESSION" if node_change > threshold else "improved"
+                regressions += node_flag == "REGRESSION"
+                lines.append(f"      {node:<28} p95 {old['p95']:8.2f} -> {stats['p95']:8.2f} ms ({node_change:+.0%}) {node_flag}")
+    lines.append(f"  {regressions} regression(s)")
+    return lines, regressions
@@ -0,0 +1,209 @@
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+
+class CompressedSerializer:
+    # Wraps the default LangGraph serializer and zlib-compresses payloads above a size
+    # threshold; the type tag records whether a payload was compressed.
+    PREFIX = "zlib+"
+
+    def __init__(self, serde=None, min_size=512, level=3):
+        self.serde = serde or JsonPlusSerializer()
+        self.min_size = min_size
+        self.level = level
+
+    def dumps_typed(self, obj):
+        type_, data = self.serde.dumps_typed(obj)
+        if len(data) >= self.min_size:
+            return self.PREFIX + type_, zlib.compress(data, self.level)
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.startswith(self.PREFIX):
+            return self.serde.loads_typed((type_[len(self.PREFIX):], zlib.decompress(payload)))
+        return self.serde.loads_typed(data)
+
+
+class SqliteCheckpointSaver(InMemorySaver):
+    # Durable checkpointer for both StateGraphs. The inherited in-memory maps are a cache
+    # of at most MAX_CACHED_THREADS threads: a thread is read from SQLite the first time it
+    # is used (so a crashed run can resume from its last completed node with
+    # invoke(None, config) on the same thread_id) and the least recently used threads are
+    # evicted, so memory does not grow with the durable history. Every put/put_writes is
+    # written through to SQLite in the same call. Channel values are stored as versioned
+    # blobs, so a channel that did not change in a superstep (e.g. the raw log lists) is
+    # not written again.
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS checkpoints (thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT,"
+        " parent_id TEXT, type TEXT, data BLOB, metadata_type TEXT, metadata BLOB,"
+        " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id))",
+        "CREATE TABLE IF NOT EXISTS blobs (thread_id TEXT, checkpoint_ns TEXT, channel TEXT, version TEXT,"
+        " type TEXT, data BLOB, PRIMARY KEY (thread_id, checkpoint_ns, channel, version))",
+        "CREATE TABLE IF NOT EXISTS writes (thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT,"
+        " task_id TEXT, idx INTEGER, channel TEXT, type TEXT, data BLOB, task_path TEXT,"
+        " PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx))",
+    )
+
+    MAX_TRACKED_THREADS = 1024
+    MAX_CACHED_THREADS = 256
+
+    def __init__(self, path="checkpoints.sqlite", serde=None):
+        super().__init__(serde=serde or CompressedSerializer())
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        self._cache_lock = threading.RLock()
+        self._cached_threads = OrderedDict()  # thread_id -> None, least recently used first
+        # (thread_id, checkpoint_ns) -> (latest checkpoint id, its step); writes only ever
+        # attach to a thread's latest checkpoint, so one entry per thread is enough. Only
+        # used to attribute overhead, so the least recently checkpointed threads (usually
+        # finished ones) are forgotten past MAX_TRACKED_THREADS.
+        self._checkpoint_steps = {}
+        # Per-superstep overhead: step -> {"seconds", "bytes", "puts", "write_batches"}
+        self.overhead = defaultdict(lambda: {"seconds": 0.0, "bytes": 0, "puts": 0, "write_batches": 0})
+
+    def _cache_thread(self, thread_id):
+        # Loads a thread's checkpoints, blobs and writes the first time it is used
+        with self._cache_lock:
+            if thread_id in self._cached_threads:
+                self._cached_threads.move_to_end(thread_id)
+                return
+            with self._lock:
+                checkpoints = self._conn.execute(
+                    "SELECT checkpoint_ns, checkpoint_id, parent_id, type, data, metadata_type, metadata"
+                    " FROM checkpoints WHERE thread_id = ?", (thread_id,)).fetchall()
+                blobs = self._conn.execute(
+                    "SELECT checkpoint_ns, channel, version, type, data FROM blobs WHERE thread_id = ?", (thread_id,)).fetchall()
+                writes = self._conn.execute(
+                    "SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, type, data, task_path"
+                    " FROM writes WHERE thread_id = ?", (thread_id,)).fetchall()
+            for ns, checkpoint_id, parent_id, type_, data, metadata_type, metadata in checkpoints:
+                self.storage[thread_id][ns][checkpoint_id] = ((type_, data), (metadata_type, metadata), parent_id)
+            for ns, channel, version, type_, data in blobs:
+                self.blobs[(thread_id, ns, channel, version)] = (type_, data)
+            for ns, checkpoint_id, task_id, idx, channel, type_, data, task_path in writes:
+                self.writes[(thread_id, ns, checkpoint_id)][(task_id, idx)] = (task_id, channel, (type_, data), task_path)
+            self._cached_threads[thread_id] = None
+            while len(self._cached_threads) > self.MAX_CACHED_THREADS:
+                self._evict(next(iter(self._cached_threads)))
+
+    def _evict(self, thread_id):
+        # Drops a thread from the in-memory maps only; SQLite keeps it
+        self._cached_threads.pop(thread_id, None)
+        self.storage.pop(thread_id, None)
+        for key in [key for key in self.blobs if key[0] == thread_id]:
+            del self.blobs[key]
+        for key in [key for key in self.writes if key[0] == thread_id]:
+            del self.writes[key]
+
+    def get_tuple(self, config):
+        self._cache_thread(config["configurable"]["thread_id"])
+        return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config:
+            self._cache_thread(config["configurable"]["thread_id"])
+            yield from super().list(config, filter=filter, before=before, limit=limit)
+            return
+        # Every stored thread, one at a time through the cache
+        with self._lock:
+            thread_ids = [row[0] for row in self._conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+        for thread_id in thread_ids:
+            if limit is not None and limit <= 0:
+                return
+            self._cache_thread(thread_id)
+            for checkpoint_tuple in super().list({"configurable": {"thread_id": thread_id}}, filter=filter,
+                                                 before=before, limit=limit):
+                if limit is not None:
+                    limit -= 1
+                yield checkpoint_tuple
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        started = time.perf_counter()
+        self._cache_thread(config["configurable"]["thread_id"])
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_id = checkpoint["id"]
+        (type_, data), (metadata_type, metadata_data), parent_id = self.storage[thread_id][ns][checkpoint_id]
+        blob_rows = []
+        for channel, version in new_versions.items():
+            blob_type, blob_data = self.blobs[(thread_id, ns, channel, version)]
+            blob_rows.append((thread_id, ns, channel, str(version), blob_type, blob_data))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, ns, checkpoint_id, parent_id, type_, data, metadata_type, metadata_data))
+            self._conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+            self._conn.commit()
+        self._checkpoint_steps.pop((thread_id, ns), None)
+        self._checkpoint_steps[(thread_id, ns)] = (checkpoint_id, metadata.get("step", -1))
+        if len(self._checkpoint_steps) > self.MAX_TRACKED_THREADS:
+            del self._checkpoint_steps[next(iter(self._checkpoint_steps))]
+        stats = self.overhead[metadata.get("step", -1)]
+        stats["seconds"] += time.perf_counter() - started
+        stats["bytes"] += len(data) + len(metadata_data) + sum(len(row[5]) for row in blob_rows)
+        stats["puts"] += 1
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        started = time.perf_counter()
+        self._cache_thread(config["configurable"]["thread_id"])
+        super().put_writes(config, writes, task_id, task_path)
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        stored = self.writes.get((thread_id, ns, checkpoint_id), {})
+        rows = [
+            (thread_id, ns, checkpoint_id, key[0], key[1], channel, value[0], value[1], path)
+            for key, (_, channel, value, path) in stored.items() if key[0] == task_id
+        ]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+        # Writes belong to the superstep following the checkpoint they are attached to
+        latest_id, step = self._checkpoint_steps.get((thread_id, ns), (None, -2))
+        stats = self.overhead[(step if latest_id == checkpoint_id else -2) + 1]
+        stats["seconds"] += time.perf_counter() - started
+        stats["bytes"] += sum(len(row[7]) for row in rows)
+        stats["write_batches"] += 1
+
+    def delete_thread(self, thread_id):
+        with self._cache_lock:
+            super().delete_thread(thread_id)
+            self._cached_threads.pop(thread_id, None)
+        with self._lock:
+            for table in ("checkpoints", "blobs", "writes"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+        for key in [key for key in self._checkpoint_steps if key[0] == thread_id]:
+            del self._checkpoint_steps[key]
+
+    def overhead_report(self):
+        steps = sorted(self.overhead)
+        total_seconds = sum(self.overhead[step]["seconds"] for step in steps)
+        total_bytes = sum(self.overhead[step]["bytes"] for step in steps)
+        return {
+            "per_superstep": [{"step": step, **self.overhead[step]} for step in steps],
+            "total_seconds": total_seconds,
+            "total_bytes": total_bytes,
+        }
+
+    def reset_overhead(self):
+        self.overhead.clear()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,288 @@
+import math
+
+import numpy as np
+
+from tools.pk_tables import CATEGORIES, NOMINAL_CROSSING_DEG, load_pk_tables
+from tools.spatial_grid import EARTH_RADIUS_KM
+
+# Defended-area coverage raster. The globe (or a latitude band of it) is divided into
+# cell_deg x cell_deg cells; each cell holds a bitmask of the launchers that can engage
+# over it and still have rounds, and the best Pk any of them achieves per threat
+# category. Coverage queries for any number of points are then two array gathers.
+#
+# A launcher covers the cells whose centre lies within its engagement range, plus the
+# cell it stands in. Its Pk per category is the tabulated Pk (tools/pk_tables.py) against
+# a nominal threat of that category, so a cell's best Pk only changes when a launcher
+# covering it gains or loses availability; reserve/unreserve/expend update just the
+# footprint of that launcher instead of rebuilding the raster.
+
+# Engagement range (km) per countermeasure; unknown countermeasures use DEFAULT_RANGE_KM
+ENGAGEMENT_RANGE_KM = {
+    "GBI Interceptor": 5000.0,
+    "AEGIS BMD": 1500.0,
+    "Next-Gen Hypersonic Interceptor": 800.0,
+    "Standard Kinetic Interceptor": 150.0,
+    "High-Energy Laser": 15.0,
+    "Directed Microwave System": 5.0,
+    "Electronic Warfare Suite": 20.0,
+    "Micro-Missile Swarm": 8.0,
+    "Anti-Drone Laser System": 5.0,
+}
+DEFAULT_RANGE_KM = 100.0
+# (speed km/s, altitude km) of the nominal threat a launcher's per-category Pk is rated against
+NOMINAL_THREATS = {"ICBM": (7.5, 1100.0), "Hypersonic": (5.1, 75.0), "DroneSwarm": (0.035, 2.5), "Unknown": (1.0, 10.0)}
+# A launcher only counts as covering a threat if its Pk against the category exceeds this
+MIN_EFFECTIVE_PK = 0.0
+
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    lat1, lon1 = math.radians(latitude), math.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class CoverageGrid:
+    # launchers: [{"asset_id", "countermeasure", "latitude", "longitude", "range_km"?, "rounds"?}]
+    def __init__(self, launchers, cell_deg=0.25, latitude_range=(-90.0, 90.0), pk_tables=None):
+        self.cell_deg = float(cell_deg)
+        self.latitude_min = float(latitude_range[0])
+        self.rows = int(math.ceil((latitude_range[1] - latitude_range[0]) / cell_deg))
+        self.cols = int(round(360.0 / cell_deg))
+        self.launchers = [dict(launcher) for launcher in launchers]
+        self.asset_ids = [launcher["asset_id"] for launcher in self.launchers]
+        self._launcher_index = {asset_id: index for index, asset_id in enumerate(self.asset_ids)}
+        self.words = max(1, (len(self.launchers) + 63) // 64)
+        self.rounds = np.array([launcher.get("rounds", 1) for launcher in self.launchers], dtype=np.int64)
+        self.reserved = np.zeros(len(self.launchers), dtype=np.int64)
+
+        tables = pk_tables or load_pk_tables()
+        speed = np.array([NOMINAL_THREATS[category][0] for category in CATEGORIES])
+        altitude = np.array([NOMINAL_THREATS[category][1] for category in CATEGORIES])
+        crossing = np.array([NOMINAL_CROSSING_DEG.get(category, 0.0) for category in CATEGORIES])
+        rows = tables.rows(CATEGORIES, [launcher["countermeasure"] for launcher in self.launchers])
+        # (launchers, categories) Pk against each category's nominal threat
+        self.launcher_pk = tables.lookup(rows, speed[:, None], altitude[:, None], crossing[:, None]).T.copy()
+        # Launchers with the same Pk row (in practice, the same countermeasure) as one bitmask
+        # each, so recomputing a cell's best Pk is one AND per distinct row, not per launcher
+        pk_rows, group = np.unique(self.launcher_pk, axis=0, return_inverse=True)
+        self._pk_groups = []
+        for row, pk in enumerate(pk_rows):
+            group_mask = np.zeros(self.words, dtype=np.uint64)
+            for index in np.flatnonzero(group.reshape(-1) == row):
+                word, bit = self._bit(index)
+                group_mask[word] |= bit
+            self._pk_groups.append((group_mask, pk.astype(np.float32)))
+
+        self.mask = np.zeros((self.rows * self.cols, self.words), dtype=np.uint64)
+        self.best_pk = np.zeros((self.rows * self.cols, len(CATEGORIES)), dtype=np.float32)
+        self.footprints = [self._footprint(launcher) for launcher in self.launchers]
+        for index in range(len(self.launchers)):
+            if self.available(index):
+                self._add(index)
+
+    # ---- geometry ----
+
+    def cells(self, latitudes, longitudes):
+        # -> flat cell index per point (points outside the latitude band clamp to its edge)
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        row = np.clip(((latitudes - self.latitude_min) / self.cell_deg).astype(np.intp), 0, self.rows - 1)
+        col = (np.floor((longitudes + 180.0) / self.cell_deg).astype(np.intp)) % self.cols
+        return row * self.cols + col
+
+    def _footprint(self, launcher):
+        range_km = launcher.get("range_km") or ENGAGEMENT_RANGE_KM.get(launcher["countermeasure"], DEFAULT_RANGE_KM)
+        latitude, longitude = launcher["latitude"], launcher["longitude"]
+        reach_deg = math.degrees(range_km / EARTH_RADIUS_KM)
+        row_lo = max(0, int((latitude - reach_deg - self.latitude_min) / self.cell_deg))
+        row_hi = min(self.rows - 1, int((latitude + reach_deg - self.latitude_min) / self.cell_deg))
+        rows = np.arange(row_lo, row_hi + 1)
+        centre_lat = self.latitude_min + (rows + 0.5) * self.cell_deg
+        # Longitude reach at the most poleward row of the box; all columns once it wraps
+        widest = max(abs(latitude) + reach_deg, 0.0)
+        if widest >= 90.0 or reach_deg / max(math.cos(math.radians(widest)), 1e-9) >= 180.0:
+            cols = np.arange(self.cols)
+        else:
+            lon_reach = reach_deg / math.cos(math.radians(widest))
+            first = int(math.floor((longitude - lon_reach + 180.0) / self.cell_deg))
+            cols = np.arange(first, int(math.floor((longitude + lon_reach + 180.0) / self.cell_deg)) + 1) % self.cols
+        centre_lon = -180.0 + (cols + 0.5) * self.cell_deg
+        distance = haversine_km(latitude, longitude, centre_lat[:, None], centre_lon[None, :])
+        inside_rows, inside_cols = np.nonzero(distance <= range_km)
+        cells = rows[inside_rows] * self.cols + cols[inside_cols]
+        return np.union1d(cells, self.cells(latitude, longitude).reshape(1))
+
+    # ---- availability ----
+
+    def _bit(self, index):
+        return index // 64, np.uint64(1 << (index % 64))
+
+    def available(self, index):
+        return self.rounds[index] - self.reserved[index] > 0
+
+    def _add(self, index):
+        word, bit = self._bit(index)
+        cells = self.footprints[index]
+        self.mask[cells, word] |= bit
+        self.best_pk[cells] = np.maximum(self.best_pk[cells], self.launcher_pk[index])
+
+    def _remove(self, index):
+        word, bit = self._bit(index)
+        cells = self.footprints[index]
+        self.mask[cells, word] &= ~bit
+        # Only cells where this launcher was (one of) the best need their Pk recomputed
+        pk = self.launcher_pk[index]
+        stale = cells[((self.best_pk[cells] <= pk) & (pk > 0)).any(axis=1)]
+        if len(stale):
+            self.best_pk[stale] = self._best_from_masks(self.mask[stale])
+
+    def _best_from_masks(self, masks):
+        # (N, words) masks -> (N, categories) best Pk over the launchers set in them
+        best = np.zeros((len(masks), len(CATEGORIES)), dtype=np.float32)
+        for group_mask, pk in self._pk_groups:
+            present = (masks & group_mask).any(axis=1)
+            best[present] = np.maximum(best[present], pk)
+        return best
+
+    def _update(self, index, change):
+        was_available = self.available(index)
+        change()
+        if was_available and not self.available(index):
+            self._remove(index)
+        elif not was_available and self.available(index):
+            self._add(index)
+
+    def reserve(self, asset_id):
+        # Holds one round of the launcher for a scheduled engagement; False if it has none free
+        index = self._launcher_index.get(asset_id)
+        if index is None or not self.available(index):
+            return False
+        self._update(index, lambda: self.reserved.__setitem__(index, self.reserved[index] + 1))
+        return True
+
+    def unreserve(self, asset_id):
+        # The engagement was cancelled: its round is free again
+        index = self._launcher_index.get(asset_id)
+        if index is None or self.reserved[index] == 0:
+            return False
+        self._update(index, lambda: self.reserved.__setitem__(index, self.reserved[index] - 1))
+        return True
+
+    def expend(self, asset_id):
+        # The engagement fired: its reserved round (or a free one) is gone for good
+        index = self._launcher_index.get(asset_id)
+        if index is None or self.rounds[index] == 0:
+            return False
+
+        def fire():
+            if self.reserved[index]:
+                self.reserved[index] -= 1
+            self.rounds[index] -= 1
+
+        self._update(index, fire)
+        return True
+
+    def launcher_index(self, asset_id):
+        return self._launcher_index.get(asset_id)
+
+    def covers(self, latitude, longitude, index):
+        # Whether launcher `index` is available and covers the point (one cell lookup)
+        word, bit = self._bit(index)
+        return bool(self.mask[self.cells(latitude, longitude), word] & bit)
+
+    # ---- queries ----
+
+    def query(self, latitudes, longitudes):
+        # -> (masks (N, words) uint64, best Pk (N, categories)) for the points' cells
+        cells = self.cells(latitudes, longitudes)
+        return self.mask[cells], self.best_pk[cells]
+
+    def best_pk_for(self, latitudes, longitudes, categories):
+        # -> (N,) best available Pk at each point against that point's threat category
+        category_index = np.array([CATEGORIES.index(category) if category in CATEGORIES else len(CATEGORIES) - 1
+                                   for category in categories], dtype=np.intp)
+        return self.best_pk[self.cells(latitudes, longitudes), category_index]
+
+    def best_launchers(self, latitudes, longitudes, categories, min_pk=MIN_EFFECTIVE_PK):
+        # -> (N,) index of the available covering launcher with the highest Pk against each
+        # point's category, -1 where no launcher with Pk above min_pk covers the point
+        masks, _ = self.query(latitudes, longitudes)
+        covering = np.unpackbits(masks.astype("<u8").view(np.uint8), axis=1, bitorder="little")[:, :len(self.launchers)]
+        category_index = np.array([CATEGORIES.index(category) if category in CATEGORIES else len(CATEGORIES) - 1
+                                   for category in categories], dtype=np.intp)
+        effective = covering.astype(bool) & (self.launcher_pk[:, category_index].T > min_pk)
+        pk = np.where(effective, self.launcher_pk[:, category_index].T, -1.0)
+        best = pk.argmax(axis=1) if len(self.launchers) else np.zeros(len(pk), dtype=np.intp)
+        return np.where(effective.any(axis=1), best, -1)
+
+    def covering_assets(self, latitude, longitude):
+        mask, _ = self.query([latitude], [longitude])
+        covering = np.unpackbits(mask.astype("<u8").view(np.uint8), axis=1, bitorder="little")[0, :len(self.launchers)]
+        return [self.asset_ids[index] for index in np.flatnonzero(covering)]
+
+    @property
+    def memory_bytes(self):
+        return self.mask.nbytes + self.best_pk.nbytes + sum(footprint.nbytes for footprint in self.footprints)
+
+
+if __name__ == "__main__":
+    # Coverage for thousands of predicted impact points: raster lookups versus checking
+    # every launcher per point in Python, and the cost of an incremental availability
+    # update versus rebuilding the raster.
+    import random
+    import time
+
+    from tools.pk_tables import COUNTERMEASURES
+
+    rng = random.Random(5)
+    launchers = [{"asset_id": f"launcher-{i}", "countermeasure": rng.choice(COUNTERMEASURES),
+                  "latitude": rng.uniform(20.0, 60.0), "longitude": rng.uniform(-130.0, -60.0),
+                  "rounds": rng.randint(1, 4)} for i in range(200)]
+    started = time.perf_counter()
+    grid = CoverageGrid(launchers)
+    build_seconds = time.perf_counter() - started
+    print(f"{len(launchers)} launchers, {grid.rows}x{grid.cols} cells: built in {build_seconds:.2f}s, "
+          f"{grid.memory_bytes / 2 ** 20:.0f} MiB")
+
+    for points in (1000, 10000, 100000):
+        latitudes = np.array([rng.uniform(15.0, 65.0) for _ in range(points)])
+        longitudes = np.array([rng.uniform(-135.0, -55.0) for _ in range(points)])
+        categories = [rng.choice(CATEGORIES[:3]) for _ in range(points)]
+        started = time.perf_counter()
+        best = grid.best_pk_for(latitudes, longitudes, categories)
+        raster = time.perf_counter() - started
+
+        sample = min(points, 1000)
+        agree = 0
+        started = time.perf_counter()
+        for n in range(sample):
+            category = CATEGORIES.index(categories[n])
+            naive = 0.0
+            for index, launcher in enumerate(launchers):
+                range_km = ENGAGEMENT_RANGE_KM.get(launcher["countermeasure"], DEFAULT_RANGE_KM)
+                lat1, lat2 = math.radians(launcher["latitude"]), math.radians(latitudes[n])
+                a = (math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2)
+                     * math.sin(math.radians(longitudes[n] - launcher["longitude"]) / 2) ** 2)
+                if grid.available(index) and 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a)) <= range_km:
+                    naive = max(naive, float(grid.launcher_pk[index, category]))
+            agree += abs(naive - best[n]) < 1e-6
+        scan = (time.perf_counter() - started) * points / sample
+        print(f"{points:>7} points: raster {raster * 1000:8.2f} ms, per-launcher scan {scan * 1000:10.1f} ms"
+              f"{' (extrapolated)' if sample < points else ''}, covered {np.mean(best > 0):.0%}, "
+              f"agrees with exact ranges at {agree / sample:.1%} of points (cell-centre quantization)")
+
+    started = time.perf_counter()
+    updates = 0
+    for launcher in launchers:
+        while grid.reserve(launcher["asset_id"]):
+            updates += 1
+    for launcher in launchers[:100]:
+        grid.expend(launcher["asset_id"])
+        updates += 1
+    for launcher in launchers[100:]:
+        grid.unreserve(launcher["asset_id"])
+        updates += 1
+    incremental = (time.perf_counter() - started) / updates
+    print(f"incremental reserve/expend/unreserve: {incremental * 1000:.2f} ms per update "
+          f"(full rebuild {build_seconds * 1000:.0f} ms)")
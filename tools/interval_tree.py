@@ -0,0 +1,147 @@
+class _Node:
+    __slots__ = ("start", "end", "key", "value", "max_end", "height", "left", "right")
+
+    def __init__(self, start, end, key, value):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.value = value
+        self.max_end = end
+        self.height = 1
+        self.left = None
+        self.right = None
+
+
+def _height(node):
+    return node.height if node else 0
+
+
+def _update(node):
+    node.height = 1 + max(_height(node.left), _height(node.right))
+    node.max_end = node.end
+    if node.left and node.left.max_end > node.max_end:
+        node.max_end = node.left.max_end
+    if node.right and node.right.max_end > node.max_end:
+        node.max_end = node.right.max_end
+
+
+def _rotate_right(node):
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rotate_left(node):
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    _update(node)
+    _update(pivot)
+    return pivot
+
+
+def _rebalance(node):
+    _update(node)
+    balance = _height(node.left) - _height(node.right)
+    if balance > 1:
+        if _height(node.left.left) < _height(node.left.right):
+            node.left = _rotate_left(node.left)
+        return _rotate_right(node)
+    if balance < -1:
+        if _height(node.right.right) < _height(node.right.left):
+            node.right = _rotate_right(node.right)
+        return _rotate_left(node)
+    return node
+
+
+class IntervalTree:
+    # Closed intervals [start, end] in an AVL tree ordered by (start, key) and augmented
+    # with the largest end in each subtree. Insert and remove are O(log n); overlap(start,
+    # end) is O(log n + k) for k hits because subtrees whose max_end is before the query
+    # start, or whose starts are all after the query end, are skipped. Keys must be
+    # unique and comparable; remove() needs the interval's start to find it.
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, start, end, key, value=None):
+        if end < start:
+            raise ValueError(f"Interval end {end} is before its start {start}.")
+        self._root = self._insert(self._root, _Node(start, end, key, value))
+        self._size += 1
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if (new.start, new.key) < (node.start, node.key):
+            node.left = self._insert(node.left, new)
+        else:
+            node.right = self._insert(node.right, new)
+        return _rebalance(node)
+
+    def remove(self, start, key):
+        # -> True if the interval was present
+        size = self._size
+        self._root = self._remove(self._root, start, key)
+        return self._size < size
+
+    def _remove(self, node, start, key):
+        if node is None:
+            return None
+        if (start, key) < (node.start, node.key):
+            node.left = self._remove(node.left, start, key)
+        elif (start, key) > (node.start, node.key):
+            node.right = self._remove(node.right, start, key)
+        else:
+            self._size -= 1
+            if node.left is None:
+                return node.right
+            if node.right is None:
+                return node.left
+            successor = node.right
+            while successor.left is not None:
+                successor = successor.left
+            node.right = self._detach_min(node.right)
+            successor.left, successor.right = node.left, node.right
+            node = successor
+        return _rebalance(node)
+
+    def _detach_min(self, node):
+        if node.left is None:
+            return node.right
+        node.left = self._detach_min(node.left)
+        return _rebalance(node)
+
+    def overlap(self, start, end):
+        # -> [(start, end, key, value)] for every stored interval intersecting [start, end]
+        hits = []
+        stack = [self._root] if self._root else []
+        while stack:
+            node = stack.pop()
+            if node.max_end < start:
+                continue
+            if node.left is not None:
+                stack.append(node.left)
+            if node.start <= end:
+                if node.end >= start:
+                    hits.append((node.start, node.end, node.key, node.value))
+                if node.right is not None:
+                    stack.append(node.right)
+        return hits
+
+    def __iter__(self):
+        # In (start, key) order
+        stack, node = [], self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.start, node.end, node.key, node.value
+            node = node.right
@@ -0,0 +1,237 @@
+import math
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# Kill-probability (Pk) lookup tables for countermeasure selection. Each (countermeasure,
+# threat category) pair has a Pk surface over threat speed, altitude and crossing angle,
+# evaluated offline from engagement_pk() onto a fixed grid and shipped as pk_tables.npz
+# (`python -m tools.pk_tables build` regenerates it). At runtime PkTables.lookup
+# trilinearly interpolates the surfaces for whole arrays of threat-asset pairs at once.
+#
+# Speed is km/s and altitude km (log-spaced axes, since threats span drones at tens of
+# m/s to ICBMs at 7+ km/s); the crossing angle is between the threat's heading and the
+# line from the threat to the engaging asset, 0 = flying straight at it (head-on).
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "pk_tables.npz")
+
+SPEED_AXIS_KM_S = np.geomspace(0.01, 10.0, 28)
+ALTITUDE_AXIS_KM = np.geomspace(0.05, 2500.0, 40)
+CROSSING_AXIS_DEG = np.linspace(0.0, 180.0, 13)
+
+CATEGORIES = ("ICBM", "Hypersonic", "DroneSwarm", "Unknown")
+
+# Engagement envelope per countermeasure: altitude band (km), the threat speed (km/s) at
+# which guidance/dwell error equals the lethal radius, the aspect it prefers
+# ("head_on" for hit-to-kill interceptors, "broadside" for beam weapons) and a base Pk
+COUNTERMEASURE_ENVELOPES = {
+    "GBI Interceptor": {"altitude_km": (100.0, 2000.0), "speed_km_s": 12.0, "aspect": "head_on", "pk": 0.92},
+    "AEGIS BMD": {"altitude_km": (70.0, 1200.0), "speed_km_s": 9.0, "aspect": "head_on", "pk": 0.88},
+    "Next-Gen Hypersonic Interceptor": {"altitude_km": (15.0, 150.0), "speed_km_s": 10.0, "aspect": "head_on", "pk": 0.9},
+    "High-Energy Laser": {"altitude_km": (0.05, 60.0), "speed_km_s": 3.0, "aspect": "broadside", "pk": 0.85},
+    "Directed Microwave System": {"altitude_km": (0.05, 30.0), "speed_km_s": 2.0, "aspect": "broadside", "pk": 0.8},
+    "Standard Kinetic Interceptor": {"altitude_km": (0.05, 40.0), "speed_km_s": 2.5, "aspect": "head_on", "pk": 0.85},
+    "Electronic Warfare Suite": {"altitude_km": (0.05, 10.0), "speed_km_s": 0.6, "aspect": "broadside", "pk": 0.97},
+    "Micro-Missile Swarm": {"altitude_km": (0.05, 8.0), "speed_km_s": 0.8, "aspect": "head_on", "pk": 0.95},
+    "Anti-Drone Laser System": {"altitude_km": (0.05, 6.0), "speed_km_s": 0.4, "aspect": "broadside", "pk": 0.96},
+}
+COUNTERMEASURES = tuple(COUNTERMEASURE_ENVELOPES)
+
+# How much of a countermeasure's effect a category is exposed to (missing pairs: 0.6).
+# EW only works on remotely piloted threats; beam weapons struggle against re-entry
+# vehicle heat shields; midcourse interceptors have nothing to hit inside a swarm.
+CATEGORY_SUSCEPTIBILITY = {
+    "ICBM": {"Electronic Warfare Suite": 0.02, "Anti-Drone Laser System": 0.05, "Micro-Missile Swarm": 0.1,
+             "High-Energy Laser": 0.3, "Directed Microwave System": 0.2, "Standard Kinetic Interceptor": 0.5,
+             "GBI Interceptor": 1.0, "AEGIS BMD": 1.0, "Next-Gen Hypersonic Interceptor": 0.8},
+    "Hypersonic": {"Electronic Warfare Suite": 0.05, "Anti-Drone Laser System": 0.1, "Micro-Missile Swarm": 0.3,
+                   "High-Energy Laser": 0.9, "Directed Microwave System": 0.85, "Standard Kinetic Interceptor": 0.6,
+                   "GBI Interceptor": 0.5, "AEGIS BMD": 0.8, "Next-Gen Hypersonic Interceptor": 1.0},
+    "DroneSwarm": {"Electronic Warfare Suite": 1.0, "Anti-Drone Laser System": 1.0, "Micro-Missile Swarm": 1.0,
+                   "High-Energy Laser": 0.9, "Directed Microwave System": 0.95, "Standard Kinetic Interceptor": 0.4,
+                   "GBI Interceptor": 0.05, "AEGIS BMD": 0.1, "Next-Gen Hypersonic Interceptor": 0.1},
+}
+DEFAULT_SUSCEPTIBILITY = 0.6
+
+# Report speed units differ per category: km/s for ICBMs, Mach for hypersonics, km/h for drones
+SPEED_UNITS_KM_S = {"Hypersonic": 0.343, "DroneSwarm": 1.0 / 3600.0}
+# Crossing angle assumed when a threat has no heading or the asset has no position:
+# ballistic and swarm threats close on the defended area, hypersonics glide in obliquely
+NOMINAL_CROSSING_DEG = {"ICBM": 0.0, "Hypersonic": 30.0, "DroneSwarm": 0.0}
+
+
+def _band(value, low, high, softness=0.25):
+    # Smooth 0..1 membership of a log-scale band; edges fall off over ~softness decades
+    log_value = math.log10(value)
+    rise = 1.0 / (1.0 + math.exp(-(log_value - math.log10(low)) / (softness / 4.0)))
+    fall = 1.0 / (1.0 + math.exp(-(math.log10(high) - log_value) / (softness / 4.0)))
+    return rise * fall
+
+
+def engagement_pk(countermeasure, category, speed_km_s, altitude_km, crossing_deg):
+    # Reference single-shot Pk model the tables are built from. A Gaussian lethality
+    # against a Rayleigh miss distance gives Pk = L^2 / (L^2 + sigma^2); the miss sigma
+    # (in lethal radii) grows with the threat's speed relative to the countermeasure's
+    # limit and with how far the geometry is from the preferred aspect.
+    envelope = COUNTERMEASURE_ENVELOPES[countermeasure]
+    susceptibility = CATEGORY_SUSCEPTIBILITY.get(category, {}).get(countermeasure, DEFAULT_SUSCEPTIBILITY)
+    low, high = envelope["altitude_km"]
+    crossing = math.radians(crossing_deg)
+    if envelope["aspect"] == "head_on":
+        geometry = 1.0 + 3.0 * math.sin(crossing / 2.0) ** 2  # tail chase is 4x harder than head-on
+    else:
+        geometry = 1.0 + 1.5 * math.cos(crossing) ** 2  # beam dwell is longest side-on
+    sigma = geometry * speed_km_s / envelope["speed_km_s"]
+    return envelope["pk"] * susceptibility * _band(altitude_km, low, high) / (1.0 + sigma * sigma)
+
+
+def speed_km_per_second(threat):
+    # One threat report's speed in km/s; a missing speed counts as 1 km/s
+    speed = threat.get("speed")
+    return float(speed) * SPEED_UNITS_KM_S.get(threat.get("category"), 1.0) if speed else 1.0
+
+
+def speeds_km_per_second(categories, speeds):
+    # Vectorized speed_km_per_second over many reports
+    factors = np.array([SPEED_UNITS_KM_S.get(category, 1.0) for category in categories])
+    values = np.array([float(speed) if speed else np.nan for speed in speeds])
+    return np.where(np.isnan(values), 1.0, values * factors)
+
+
+def crossing_angles(latitudes, longitudes, headings, asset_latitudes, asset_longitudes):
+    # (N,) threats x (M,) assets -> (N, M) degrees between each threat's heading and the
+    # initial great-circle bearing from the threat to the asset
+    lat1 = np.radians(np.asarray(latitudes, dtype=float))[:, None]
+    lon1 = np.radians(np.asarray(longitudes, dtype=float))[:, None]
+    lat2 = np.radians(np.asarray(asset_latitudes, dtype=float))[None, :]
+    lon2 = np.radians(np.asarray(asset_longitudes, dtype=float))[None, :]
+    d_lon = lon2 - lon1
+    bearing = np.degrees(np.arctan2(np.sin(d_lon) * np.cos(lat2),
+                                    np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(d_lon)))
+    difference = np.abs((np.asarray(headings, dtype=float)[:, None] - bearing + 180.0) % 360.0 - 180.0)
+    return difference
+
+
+class PkTables:
+    # surfaces[row] is the (speed, altitude, crossing) grid for pairs[row]; rows() maps
+    # countermeasure/category names to row indices for lookup()
+    def __init__(self, pairs, surfaces, speed_axis=SPEED_AXIS_KM_S, altitude_axis=ALTITUDE_AXIS_KM,
+                 crossing_axis=CROSSING_AXIS_DEG):
+        self.pairs = [tuple(pair) for pair in pairs]
+        self.surfaces = np.ascontiguousarray(surfaces, dtype=np.float32)
+        self.speed_axis = np.asarray(speed_axis, dtype=float)
+        self.altitude_axis = np.asarray(altitude_axis, dtype=float)
+        self.crossing_axis = np.asarray(crossing_axis, dtype=float)
+        self._category_index = {category: n for n, category in enumerate(dict.fromkeys(c for _, c in self.pairs))}
+        self._countermeasure_index = {name: n for n, name in enumerate(dict.fromkeys(c for c, _ in self.pairs))}
+        # category x countermeasure -> row; the extra last column (index -1) is "no surface"
+        self._row_grid = np.full((len(self._category_index), len(self._countermeasure_index) + 1), -1, dtype=np.intp)
+        for row, (countermeasure, category) in enumerate(self.pairs):
+            self._row_grid[self._category_index[category], self._countermeasure_index[countermeasure]] = row
+        self._log_speed = np.log(self.speed_axis)
+        self._log_altitude = np.log(self.altitude_axis)
+
+    @classmethod
+    def build(cls, model=engagement_pk, countermeasures=COUNTERMEASURES, categories=CATEGORIES):
+        pairs = [(countermeasure, category) for countermeasure in countermeasures for category in categories]
+        surfaces = np.empty((len(pairs), len(SPEED_AXIS_KM_S), len(ALTITUDE_AXIS_KM), len(CROSSING_AXIS_DEG)))
+        for row, (countermeasure, category) in enumerate(pairs):
+            for i, speed in enumerate(SPEED_AXIS_KM_S):
+                for j, altitude in enumerate(ALTITUDE_AXIS_KM):
+                    for k, crossing in enumerate(CROSSING_AXIS_DEG):
+                        surfaces[row, i, j, k] = model(countermeasure, category, speed, altitude, crossing)
+        return cls(pairs, surfaces)
+
+    def save(self, path=DEFAULT_PATH):
+        # Pk is stored as uint16 (resolution 1.5e-5), which compresses well
+        np.savez_compressed(path, pairs=np.array(self.pairs), speed_axis=self.speed_axis,
+                            altitude_axis=self.altitude_axis, crossing_axis=self.crossing_axis,
+                            surfaces=np.round(np.clip(self.surfaces, 0.0, 1.0) * 65535).astype(np.uint16))
+        return path
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH):
+        with np.load(path) as archive:
+            return cls(archive["pairs"].tolist(), archive["surfaces"].astype(np.float32) / 65535.0,
+                       archive["speed_axis"], archive["altitude_axis"], archive["crossing_axis"])
+
+    def rows(self, categories, countermeasures):
+        # -> (len(categories), len(countermeasures)) row indices for lookup(); categories
+        # without surfaces use "Unknown", countermeasures without surfaces get -1 (Pk 0)
+        fallback = self._category_index.get("Unknown", 0)
+        category_index = np.array([self._category_index.get(category, fallback) for category in categories], dtype=np.intp)
+        countermeasure_index = np.array([self._countermeasure_index.get(countermeasure, -1)
+                                         for countermeasure in countermeasures], dtype=np.intp)
+        return self._row_grid[category_index[:, None], countermeasure_index[None, :]]
+
+    @staticmethod
+    def _cell(values, axis):
+        # -> (lower grid index, fraction towards the next one), clamped to the grid edges
+        position = np.interp(values, axis, np.arange(len(axis), dtype=float))
+        lower = np.minimum(position.astype(np.intp), len(axis) - 2)
+        return lower, (position - lower).astype(np.float32)
+
+    def lookup(self, rows, speed_km_s, altitude_km, crossing_deg):
+        # Trilinear interpolation; all arguments broadcast together (e.g. (N, 1) threats
+        # against (1, M) assets) and the result has the broadcast shape. Grid cells are
+        # located on each argument's own shape; only the corner gathers run per pair.
+        rows = np.asarray(rows, dtype=np.intp)
+        i, fi = self._cell(np.log(np.maximum(speed_km_s, 1e-6)), self._log_speed)
+        j, fj = self._cell(np.log(np.maximum(altitude_km, 1e-6)), self._log_altitude)
+        k, fk = self._cell(np.asarray(crossing_deg, dtype=float), self.crossing_axis)
+        _, n_speed, n_altitude, n_crossing = self.surfaces.shape
+        base = ((np.maximum(rows, 0) * n_speed + i) * n_altitude + j) * n_crossing + k
+        flat = self.surfaces.ravel()
+        pk = np.zeros(base.shape, dtype=np.float32)
+        for di, wi in ((0, 1.0 - fi), (1, fi)):
+            for dj, wj in ((0, 1.0 - fj), (1, fj)):
+                corner = base + (di * n_altitude + dj) * n_crossing
+                pk += (wi * wj) * ((1.0 - fk) * flat.take(corner) + fk * flat.take(corner + 1))
+        return np.where(rows >= 0, pk, np.float32(0.0))
+
+
+@lru_cache(maxsize=None)
+def load_pk_tables(path=DEFAULT_PATH):
+    # Shipped tables, or tables built from engagement_pk() when the file is missing
+    if os.path.exists(path):
+        return PkTables.load(path)
+    return PkTables.build()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if sys.argv[1:] == ["build"]:
+        started = time.perf_counter()
+        tables = PkTables.build()
+        print(f"Built {len(tables.pairs)} surfaces of {tables.surfaces.shape[1:]} in "
+              f"{time.perf_counter() - started:.1f}s -> {tables.save()} ({os.path.getsize(DEFAULT_PATH) / 1024:.0f} KiB)")
+        sys.exit(0)
+
+    # Scoring every threat against every asset: one batched table lookup versus calling
+    # the reference model per pair from Python
+    tables = load_pk_tables()
+    rng = np.random.default_rng(7)
+    for threats, assets in ((100, 9), (1000, 50), (10000, 200)):
+        categories = rng.choice(CATEGORIES[:3], threats)
+        speed = rng.uniform(0.02, 9.0, threats)
+        altitude = rng.uniform(0.1, 1200.0, threats)
+        asset_countermeasures = rng.choice(COUNTERMEASURES, assets)
+        crossing = rng.uniform(0.0, 180.0, (threats, assets))
+        rows = tables.rows(categories, asset_countermeasures)
+
+        started = time.perf_counter()
+        batched = tables.lookup(rows, speed[:, None], altitude[:, None], crossing)
+        batched_seconds = time.perf_counter() - started
+
+        sample = min(threats, 1000)
+        started = time.perf_counter()
+        reference = np.array([[engagement_pk(asset_countermeasures[m], categories[n], speed[n], altitude[n], crossing[n, m])
+                               for m in range(assets)] for n in range(sample)])
+        per_pair_seconds = (time.perf_counter() - started) * threats / sample
+        error = np.abs(batched[:sample] - reference)
+        print(f"{threats:>6} threats x {assets:>3} assets: batched {batched_seconds * 1000:8.2f} ms, "
+              f"per-pair Python {per_pair_seconds * 1000:10.1f} ms{' (extrapolated)' if sample < threats else ''}, "
+              f"{per_pair_seconds / batched_seconds:6.0f}x; interpolation error mean {error.mean():.4f} max {error.max():.4f}")
@@ -0,0 +1,155 @@
+import json
+import os
+import struct
+import time
+import uuid
+
+import numpy as np
+
+# On-disk layout (little endian):
+#   [0:64)   fixed header: magic, version, record offset, record count, footer offset
+#   [64:..)  fixed-width records of the schema's NumPy structured dtype
+#   footer   JSON: schema name, dtype description and the string dictionaries
+# The footer goes last so writers can stream records without knowing the
+# dictionaries up front; readers memory-map the record region directly.
+MAGIC = b"GDARCH01"
+VERSION = 1
+HEADER = struct.Struct("<8sIQQQ")
+RECORD_OFFSET = 64
+MISSING = -1
+
+
+class StringDictionary:
+    # Dictionary encoding for categorical string fields; MISSING (-1) encodes None
+    def __init__(self, values=None):
+        self.values = list(values or [])
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value):
+        if value is None:
+            return MISSING
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, code):
+        return self.values[code] if code >= 0 else None
+
+    def decode_column(self, codes):
+        values = self.values
+        return [values[code] if code >= 0 else None for code in codes.tolist()]
+
+
+def uuid_bytes(value):
+    # Returns the 16 raw bytes for canonical UUID strings, or None for any other id
+    try:
+        parsed = uuid.UUID(value)
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return parsed.bytes if str(parsed) == value else None
+
+
+def encode_records(schema, items, dictionaries):
+    # Encodes dicts into a structured array, growing `dictionaries` ({field: StringDictionary}) as needed
+    records = np.zeros(len(items), dtype=schema.dtype)
+    for i, item in enumerate(items):
+        records[i] = schema.encode(item, dictionaries)
+    return records
+
+
+class RecordArchiveWriter:
+    def __init__(self, path, schema, metadata=None):
+        self.path = path
+        self.schema = schema
+        self.metadata = metadata or {}
+        self.dictionaries = {name: StringDictionary() for name in schema.dictionary_fields}
+        self.count = 0
+        self._file = open(path, "wb")
+        self._file.write(b"\0" * RECORD_OFFSET)
+
+    def write(self, items):
+        self.write_records(encode_records(self.schema, items, self.dictionaries))
+
+    def write_records(self, records):
+        self._file.write(np.ascontiguousarray(records, dtype=self.schema.dtype).tobytes())
+        self.count += len(records)
+
+    def close(self):
+        if self._file is None:
+            return
+        footer_offset = RECORD_OFFSET + self.count * self.schema.dtype.itemsize
+        footer = {
+            "schema": self.schema.name,
+            "dtype": self.schema.dtype.descr,
+            "dictionaries": {name: dictionary.values for name, dictionary in self.dictionaries.items()},
+            "metadata": self.metadata,
+        }
+        self._file.write(json.dumps(footer).encode("utf-8"))
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD_OFFSET, self.count, footer_offset))
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class RecordArchive:
+    # Read side: the record region is a read-only np.memmap, so slicing it for
+    # batches never copies; dicts are only built when a batch is decoded.
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        with open(path, "rb") as f:
+            magic, version, record_offset, count, footer_offset = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} record archive.")
+            f.seek(footer_offset)
+            footer = json.loads(f.read().decode("utf-8"))
+        if footer["schema"] != schema.name:
+            raise ValueError(f"{path} holds '{footer['schema']}' records, expected '{schema.name}'.")
+        self.count = count
+        self.metadata = footer.get("metadata", {})
+        self.dictionaries = {name: StringDictionary(values) for name, values in footer["dictionaries"].items()}
+        if count:
+            self.records = np.memmap(path, dtype=schema.dtype, mode="r", offset=record_offset, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=schema.dtype)
+
+    def __len__(self):
+        return self.count
+
+    def batches(self, batch_size=1000):
+        for start in range(0, self.count, batch_size):
+            yield self.records[start:start + batch_size]
+
+    def decode(self, records):
+        return self.schema.decode(records, self.dictionaries)
+
+    def replay(self, batch_size=1000, speed=None, decode=True):
+        # speed=None replays as fast as possible; speed=1.0 reproduces the original
+        # inter-event timing, speed=10.0 replays ten times faster, and so on. Each batch is
+        # released at its earliest event time, so archives need not be sorted by time.
+        time_field = self.schema.time_field
+        started = time.perf_counter()
+        first_event_time = None
+        for batch in self.batches(batch_size):
+            times = batch[time_field][batch[time_field] != MISSING] if speed else ()
+            if len(times):
+                batch_time = float(times.min()) / self.schema.time_units_per_second
+                if first_event_time is None:
+                    first_event_time = batch_time
+                delay = (batch_time - first_event_time) / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            yield self.decode(batch) if decode else batch
+
+    @property
+    def size_bytes(self):
+        return os.path.getsize(self.path)
@@ -0,0 +1,119 @@
+import contextlib
+import os
+import time
+import uuid
+
+
+class ScenarioRunner:
+    # Runs many independent scenarios through one coordinator (Orchestrator or
+    # AISocCoordinationNode) whose agents and graph are built and compiled once. Scenarios
+    # go through the compiled graph's batch()/abatch(), which fans them out over a thread
+    # pool of max_concurrency. Each scenario has its own graph state, its own thread_id
+    # when the coordinator checkpoints, and fresh copies of the coordinator's stateful
+    # agents (coordinator.scenario_agents(), handed to the nodes through the run config),
+    # so concurrent scenarios never see each other's baselines, engagements or queues.
+    #
+    # A scenario is the argument tuple for coordinator.build_inputs(), e.g.
+    # (sensor_data,) for the Orchestrator or (traffic_logs, user_logs) for the SOC graph;
+    # a bare value is treated as a one-element tuple.
+    def __init__(self, coordinator, max_concurrency=8, quiet=True):
+        self.coordinator = coordinator
+        self.max_concurrency = max_concurrency
+        # Node output from concurrent scenarios interleaves, so it is discarded by default
+        self.quiet = quiet
+        self.last_run = None
+
+    def _prepare(self, scenarios):
+        inputs, configs, scenario_agents = [], [], []
+        for scenario in scenarios:
+            args = scenario if isinstance(scenario, tuple) else (scenario,)
+            inputs.append(self.coordinator.build_inputs(*args))
+            agents = self.coordinator.scenario_agents()
+            configurable = {"scenario_agents": agents}
+            if self.coordinator.checkpointer is not None:
+                configurable["thread_id"] = str(uuid.uuid4())
+            configs.append({"configurable": configurable, "max_concurrency": self.max_concurrency})
+            scenario_agents.append(agents)
+        return inputs, configs, scenario_agents
+
+    @contextlib.contextmanager
+    def _output(self):
+        if not self.quiet:
+            yield
+            return
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            yield
+
+    def _finish(self, results, scenario_agents, started):
+        for agents in scenario_agents:
+            for agent in agents.values():
+                close = getattr(agent, "close", None)
+                if close is not None:
+                    close()
+        elapsed = time.perf_counter() - started
+        failures = sum(1 for result in results if isinstance(result, Exception))
+        self.last_run = {
+            "scenarios": len(results),
+            "failures": failures,
+            "seconds": elapsed,
+            "scenarios_per_second": len(results) / elapsed if elapsed else float("inf"),
+            "max_concurrency": self.max_concurrency,
+        }
+        return results
+
+    def run(self, scenarios):
+        # -> final state per scenario, in order (the exception instead, for a scenario that failed)
+        started = time.perf_counter()
+        inputs, configs, scenario_agents = self._prepare(scenarios)
+        with self._output():
+            results = self.coordinator.app.batch(inputs, configs, return_exceptions=True)
+        return self._finish(results, scenario_agents, started)
+
+    async def arun(self, scenarios):
+        started = time.perf_counter()
+        inputs, configs, scenario_agents = self._prepare(scenarios)
+        with self._output():
+            results = await self.coordinator.app.abatch(inputs, configs, return_exceptions=True)
+        return self._finish(results, scenario_agents, started)
+
+
+if __name__ == "__main__":
+    # Scenarios per second: rebuilding the coordinator for every scenario (the previous
+    # pattern) versus one compiled graph, sequential and through batch/abatch
+    import asyncio
+
+    from cyberdome.data.log_archive import split_log_batch
+    from cyberdome.data.log_generator import LogGenerator
+    from cyberdome.simulation import AISocCoordinationNode
+    from data.sensor_data_generator import SensorDataGenerator
+    from simulation import Orchestrator
+
+    def rebuild_each_time(factory, scenarios):
+        started = time.perf_counter()
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            for scenario in scenarios:
+                factory().run_simulation(*scenario)
+        return len(scenarios) / (time.perf_counter() - started)
+
+    sensor_generator = SensorDataGenerator()
+    log_generator = LogGenerator()
+    suites = [
+        ("Orchestrator", Orchestrator, [(sensor_generator.generate_random_threat(),) for _ in range(200)]),
+        ("AISocCoordinationNode", AISocCoordinationNode,
+         [split_log_batch(log_generator.generate_mock_logs(100, 100)) for _ in range(40)]),
+    ]
+    print(f"cpu_count={os.cpu_count()}")
+    for name, factory, scenarios in suites:
+        print(f"\n{name}: {len(scenarios)} scenarios")
+        print(f"  {'rebuild + invoke per scenario':<32} {rebuild_each_time(factory, scenarios):8.1f} scenarios/s")
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            coordinator = factory()
+        for concurrency in (1, 4, 16):
+            runner = ScenarioRunner(coordinator, max_concurrency=concurrency)
+            runner.run(scenarios)
+            print(f"  {f'compiled once, batch x{concurrency}':<32} {runner.last_run['scenarios_per_second']:8.1f} scenarios/s"
+                  f" ({runner.last_run['failures']} failed)")
+        runner = ScenarioRunner(coordinator, max_concurrency=16)
+        asyncio.run(runner.arun(scenarios))
+        print(f"  {'compiled once, abatch x16':<32} {runner.last_run['scenarios_per_second']:8.1f} scenarios/s"
+              f" ({runner.last_run['failures']} failed)")
@@ -0,0 +1,64 @@
+import math
+from collections import defaultdict
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def to_ecef_km(latitude, longitude, altitude_km=0.0):
+    # Spherical-earth Cartesian coordinates; straight-line distances between them are
+    # what matters for separation, and there are no seams at the poles or the date line.
+    radius = EARTH_RADIUS_KM + (altitude_km or 0.0)
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    return (radius * math.cos(lat) * math.cos(lon),
+            radius * math.cos(lat) * math.sin(lon),
+            radius * math.sin(lat))
+
+
+class SpatialGrid:
+    # Uniform hash grid over ECEF points with cubic cells of cell_km. A radius query with
+    # radius <= cell_km only has to look at the 27 cells around the query point, so it
+    # costs O(1 + k) regardless of how many points are stored.
+    def __init__(self, cell_km=50.0):
+        self.cell_km = float(cell_km)
+        self._cells = defaultdict(dict)  # cell -> key -> (point, value)
+        self._cell_of = {}
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def _cell(self, point):
+        return tuple(int(math.floor(coordinate / self.cell_km)) for coordinate in point)
+
+    def insert(self, key, point, value=None):
+        if key in self._cell_of:
+            self.remove(key)
+        cell = self._cell(point)
+        self._cells[cell][key] = (point, value)
+        self._cell_of[key] = cell
+
+    def remove(self, key):
+        cell = self._cell_of.pop(key, None)
+        if cell is None:
+            return False
+        bucket = self._cells[cell]
+        del bucket[key]
+        if not bucket:
+            del self._cells[cell]
+        return True
+
+    def within(self, point, radius_km):
+        # -> [(distance_km, key, value)] for stored points within radius_km of point
+        reach = max(1, int(math.ceil(radius_km / self.cell_km)))
+        cx, cy, cz = self._cell(point)
+        hits = []
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                for dz in range(-reach, reach + 1):
+                    bucket = self._cells.get((cx + dx, cy + dy, cz + dz))
+                    if not bucket:
+                        continue
+                    for key, (other, value) in bucket.items():
+                        distance = math.dist(point, other)
+                        if distance <= radius_km:
+                            hits.append((distance, key, value))
+        return hits